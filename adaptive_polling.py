@@ -0,0 +1,245 @@
+import bisect
+import logging
+import math
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # pragma: no cover - Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = Exception
+
+from history_store import STATUS_UPDATED
+
+DEFAULT_TIMEZONE = 'Europe/Brussels'
+HOURS_PER_WEEK = 7 * 24
+WEEKDAYS = range(0, 5)
+WEEKEND = range(5, 7)
+# Share of the smoothing prior spread evenly over the week
+BACKGROUND_SHARE = 0.1
+
+
+def load_timezone(name: str = DEFAULT_TIMEZONE) -> tzinfo:
+    """Return the named zone, falling back to fixed CET if no tz database is installed."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, TypeError, ValueError):
+        logging.warning(f"Time zone {name} not available, using fixed UTC+1")
+        return timezone(timedelta(hours=1), 'CET')
+
+
+class AdaptivePollingPolicy:
+    """
+    Chooses the next polling interval from the observed SB change history.
+
+    Changes are modelled as a Poisson process whose hourly rate depends on the
+    hour of the week in the local time zone (EC updates cluster in weekday
+    business hours). Each bucket's rate is the observed change count smoothed
+    towards the same hour on similar days. Polls are then spaced by the
+    predicted rate, clamped to [min_interval, max_interval]: busy windows are
+    polled often, quiet ones rarely.
+    """
+
+    def __init__(self, change_timestamps: Iterable[float], min_interval: float = 900,
+                 max_interval: float = 24 * 3600, base_interval: float = 6 * 3600,
+                 tz: Optional[tzinfo] = None, smoothing: float = 1.0,
+                 observed_since: Optional[float] = None, now: Optional[float] = None):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Require 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = base_interval
+        self.tz = tz or load_timezone()
+        self.changes = sorted(change_timestamps)
+
+        counts = [0] * HOURS_PER_WEEK
+        for ts in self.changes:
+            counts[self._bucket(ts)] += 1
+
+        start = observed_since if observed_since is not None else (self.changes[0] if self.changes else None)
+        end = now if now is not None else (self.changes[-1] if self.changes else None)
+        weeks = max((end - start) / (7 * 86400), 1.0) if start is not None and end is not None else 1.0
+
+        if self.changes:
+            # Hour-of-week buckets are sparse, so each one is smoothed towards the
+            # same hour on the same kind of day (weekday or weekend), plus a small
+            # share of the overall mean so that no hour is ever ruled out entirely
+            overall = len(self.changes) / HOURS_PER_WEEK
+            prior = []
+            for bucket in range(HOURS_PER_WEEK):
+                day, hour = divmod(bucket, 24)
+                days = WEEKDAYS if day in WEEKDAYS else WEEKEND
+                same_hour = sum(counts[d * 24 + hour] for d in days) / len(days)
+                prior.append((1 - BACKGROUND_SHARE) * same_hour + BACKGROUND_SHARE * overall)
+        else:
+            # Without history every bucket gets the same weak prior rate (one change per 4 weeks)
+            prior = [weeks / 4 / HOURS_PER_WEEK] * HOURS_PER_WEEK
+        self.hourly_rates = [(c + smoothing * p) / (weeks + smoothing) for c, p in zip(counts, prior)]
+        self.mean_rate = sum(self.hourly_rates) / HOURS_PER_WEEK
+
+    def _bucket(self, ts: float) -> int:
+        local = datetime.fromtimestamp(ts, self.tz)
+        return local.weekday() * 24 + local.hour
+
+    def rate_at(self, ts: float) -> float:
+        """Expected changes per hour at a point in time."""
+        return self.hourly_rates[self._bucket(ts)]
+
+    def _integrate(self, start: float, limit: float, weight: Callable[[float], float],
+                   stop_at: Optional[float] = None) -> Tuple[float, float]:
+        """Integrate weight(rate) per second from start for up to limit seconds, or until it reaches stop_at."""
+        elapsed = 0.0
+        total = 0.0
+        while elapsed < limit:
+            ts = start + elapsed
+            # Advance to the next hour boundary in local time (handles DST offsets)
+            local = datetime.fromtimestamp(ts, self.tz)
+            step = min(3600 - (local.minute * 60 + local.second + local.microsecond / 1e6), limit - elapsed)
+            density = weight(self.rate_at(ts))
+            if stop_at is not None and density > 0 and total + density * step >= stop_at:
+                return elapsed + (stop_at - total) / density, stop_at
+            total += density * step
+            elapsed += step
+        return elapsed, total
+
+    def change_probability(self, start: float, horizon: float = 24 * 3600) -> float:
+        """
+        Predicted probability of at least one change within horizon seconds of start.
+
+        Args:
+            start (float): Unix time the window starts
+            horizon (float): Window length in seconds
+
+        Returns:
+            float: Probability between 0 and 1
+        """
+        _, hazard = self._integrate(start, horizon, lambda rate: rate / 3600)
+        return 1 - math.exp(-hazard)
+
+    def next_interval(self, now: float) -> float:
+        """
+        Seconds to wait before the next poll.
+
+        Polls are spread in proportion to the square root of the change rate,
+        which minimizes the expected detection delay for a given number of
+        requests. Where the rate equals the weekly mean the interval is
+        base_interval; busier hours are polled more often, quieter ones less.
+        """
+        if self.mean_rate <= 0:
+            return self.max_interval
+        elapsed, _ = self._integrate(now, self.max_interval, lambda rate: math.sqrt(rate / self.mean_rate),
+                                     stop_at=self.base_interval)
+        return min(max(elapsed, self.min_interval), self.max_interval)
+
+
+class AdaptiveTrigger:
+    """
+    Scheduler trigger that asks an AdaptivePollingPolicy for every interval.
+
+    The change history is reloaded on each call, so newly detected changes
+    shape the next interval straight away.
+    """
+
+    def __init__(self, load_changes: Callable[[], List[float]], **policy_options):
+        self.load_changes = load_changes
+        self.policy_options = policy_options
+        self.last_policy: Optional[AdaptivePollingPolicy] = None
+
+    def policy(self, now: float) -> AdaptivePollingPolicy:
+        try:
+            changes = self.load_changes()
+        except Exception as e:
+            logging.error(f"Could not load change history for adaptive polling: {e}")
+            changes = self.last_policy.changes if self.last_policy else []
+        self.last_policy = AdaptivePollingPolicy(changes, now=now, **self.policy_options)
+        return self.last_policy
+
+    def next_run(self, after: float) -> float:
+        return after + self.policy(after).next_interval(after)
+
+    def __repr__(self) -> str:
+        return "adaptive interval"
+
+
+def estimate_change_time(previous_check: Optional[float], detected_at: float) -> float:
+    """Best guess for when a change happened: midway between the check that missed it and the one that saw it."""
+    if previous_check is None or previous_check >= detected_at:
+        return detected_at
+    return (previous_check + detected_at) / 2
+
+
+def load_change_times(history, targets: Iterable[str]) -> List[float]:
+    """
+    Estimate when each recorded SB number update happened.
+
+    Args:
+        history (HistoryStore): Check log to read from
+        targets (Iterable[str]): Target names to include
+
+    Returns:
+        List[float]: Estimated unix times of all updates, oldest first
+    """
+    times = []
+    for target in targets:
+        for change in history.changes(target):
+            if change['status'] != STATUS_UPDATED:
+                continue
+            # The newest check up to the update is the update itself; the one before it missed the change
+            recent = history.checks(target, end=change['timestamp'], limit=2)
+            previous = recent[1]['timestamp'] if len(recent) > 1 else None
+            times.append(estimate_change_time(previous, change['timestamp']))
+    return sorted(times)
+
+
+def simulate(change_times: Sequence[float], start: float, end: float,
+             next_interval: Callable[[float, List[float]], float]) -> Dict[str, float]:
+    """
+    Replay a change history against a polling strategy.
+
+    A change counts as detected at the first poll at or after it. The strategy
+    only sees changes detected so far, as it would in production.
+
+    Args:
+        change_times (Sequence[float]): Unix times the page changed
+        start (float): Time of the first poll
+        end (float): End of the replay
+        next_interval (Callable): (now, detected change times) -> seconds until the next poll
+
+    Returns:
+        Dict[str, float]: requests, detected, mean/p95/max detection delay in seconds
+    """
+    changes = sorted(t for t in change_times if start <= t <= end)
+    detected: List[float] = []
+    delays: List[float] = []
+    polls = 0
+    now = previous = start
+    next_change = 0
+    while now <= end:
+        polls += 1
+        while next_change < len(changes) and changes[next_change] <= now:
+            delays.append(now - changes[next_change])
+            # Production only knows the change happened between two polls
+            detected.append(estimate_change_time(previous, now))
+            next_change += 1
+        previous = now
+        now += next_interval(now, detected)
+
+    delays.sort()
+    return {
+        'requests': polls,
+        'changes': len(changes),
+        'detected': len(delays),
+        'mean_delay': sum(delays) / len(delays) if delays else 0.0,
+        'p95_delay': delays[min(int(len(delays) * 0.95), len(delays) - 1)] if delays else 0.0,
+        'max_delay': delays[-1] if delays else 0.0,
+    }
+
+
+def adaptive_strategy(observed_since: float, **policy_options) -> Callable[[float, List[float]], float]:
+    """Build a simulate() strategy that refits the adaptive policy before every poll."""
+    def strategy(now: float, detected: List[float]) -> float:
+        index = bisect.bisect_right(detected, now)
+        policy = AdaptivePollingPolicy(detected[:index], observed_since=observed_since, now=now, **policy_options)
+        return policy.next_interval(now)
+    return strategy
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the selector, streaming lxml and BeautifulSoup extraction paths.
+
+Runs each path (parse + extract) over the saved PMSV page fixture and
+synthetically enlarged variants of it, reporting median latency and peak
+traced memory. The selector path is timed with a warm selector cache, as in
+a long-running monitor.
+
+Usage:
+    python benchmarks/bench_extraction.py [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from extraction import compile_selector, iter_chunks, selector_extract, soup_extract, stream_extract
+from scraper import MIR_PATTERN, MIR_SELECTOR
+
+FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'pmsv_page.html')
+MIR = re.compile(MIR_PATTERN, re.IGNORECASE)
+MIR_XPATH = "//div[@id='section-manufacturer-incident-report']//a"
+
+FILLER_SECTION = b"""
+<div class="ecl"><h2>Archived guidance</h2><ul>
+<li><a href="https://health.ec.europa.eu/document/download/archived_en?filename=md_archived_form_en.pdf">Archived reporting form (superseded, PDF)</a></li>
+<li><a href="https://health.ec.europa.eu/document/download/archived_en?filename=md_archived_help_en.pdf">Archived help text for superseded reporting forms (PDF)</a></li>
+</ul><p>These documents are kept for reference only and must not be used for new reports.</p></div>
+"""
+
+
+def enlarge(page: bytes, sections: int, before_target: bool = False) -> bytes:
+    """
+    Pad the page with filler sections.
+
+    Args:
+        page (bytes): The original page
+        sections (int): Number of filler sections to insert
+        before_target (bool): Insert before the MIR section (worst case for early exit)
+    """
+    marker = b'<div class="ecl" id="section-manufacturer-incident-report">'
+    filler = FILLER_SECTION * sections
+    if before_target:
+        return page.replace(marker, filler + marker, 1)
+    return page.replace(b'</article>', filler + b'</article>', 1)
+
+
+def measure(func, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(FIXTURE, 'rb') as f:
+        page = f.read()
+
+    cases = [
+        ('recorded page', page),
+        ('enlarged x200, target first', enlarge(page, 200)),
+        ('enlarged x200, target last', enlarge(page, 200, before_target=True)),
+    ]
+
+    compile_selector(MIR_SELECTOR)
+    compile_selector(MIR_XPATH)
+
+    print(f"{'case':<30} {'size':>9} {'extractor':<10} {'median ms':>10} {'peak KiB':>10}")
+    for name, body in cases:
+        for label, func in (
+            ('css', lambda: selector_extract(iter_chunks(body), MIR_SELECTOR, MIR)),
+            ('xpath', lambda: selector_extract(iter_chunks(body), MIR_XPATH, MIR)),
+            ('stream', lambda: stream_extract(iter_chunks(body), MIR)),
+            ('soup', lambda: soup_extract(body, MIR)),
+        ):
+            result, median, peak = measure(func, args.repeat)
+            assert result == '10573', f"{label} extractor returned {result!r} for {name}"
+            print(f"{name:<30} {len(body):>9} {label:<10} {median * 1000:>10.2f} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
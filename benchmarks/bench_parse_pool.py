@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-target check throughput with and without the parse process pool.
+
+Runs AsyncMonitorEngine over many targets served by the fake EC server, once
+with parsing on the fetch threads (PARSE_WORKERS=0) and once per parse worker
+count, and reports pages per second and the speedup over one worker. The
+pages are enlarged with the MIR section last, so every check parses the
+whole body. The page server runs in its own process, so it does not compete
+with the fetch threads for the GIL. The first round of each configuration
+starts the workers and connections and is not timed; HTTP caches are removed
+before every round so each check downloads and parses its page.
+
+Usage:
+    python benchmarks/bench_parse_pool.py [--targets N] [--sections N] [--rounds N] [--workers 1,2,4]
+"""
+
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.bench_extraction import enlarge
+from benchmarks.fake_ec_server import PAGE_PATH, FakeECServer, load_fixture
+
+
+def _serve(connection, page: bytes) -> None:
+    server = FakeECServer({PAGE_PATH: page}).start()
+    connection.send(server.url())
+    # Serve until the benchmark is done
+    connection.recv()
+    server.stop()
+
+
+def measure(url: str, targets: int, workers: int, rounds: int, concurrency: int) -> float:
+    """
+    Check all targets rounds + 1 times and return the median pages per second of the timed rounds.
+    """
+    from monitor_engine import AsyncMonitorEngine, MonitorTarget
+    from state_store import DURABILITY_NONE
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        engine = AsyncMonitorEngine([MonitorTarget(f'target-{i}', url) for i in range(targets)], data_dir,
+                                    max_per_host=concurrency, max_concurrency=concurrency,
+                                    state_durability=DURABILITY_NONE, parse_workers=workers)
+        timings = []
+        try:
+            for round_number in range(rounds + 1):
+                for cache_file in glob.glob(os.path.join(data_dir, '*_http_cache.json')):
+                    os.remove(cache_file)
+                start = time.perf_counter()
+                results = engine.run_check()
+                elapsed = time.perf_counter() - start
+                assert all(result.current == '10573' for result in results), results
+                if round_number:
+                    timings.append(elapsed)
+        finally:
+            engine.close()
+    return targets / statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', type=int, default=64)
+    parser.add_argument('--sections', type=int, default=500, help="Filler sections before the MIR section")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=16, help="Fetch threads (MAX_CONCURRENT_CHECKS)")
+    parser.add_argument('--workers', default=None,
+                        help="Comma-separated parse worker counts (default: powers of two up to the CPU count)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        worker_counts: List[int] = [int(count) for count in args.workers.split(',')]
+    else:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpus:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cpus:
+            worker_counts.append(cpus)
+
+    # Per-check INFO logging to the console would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    page = enlarge(load_fixture(), args.sections, before_target=True)
+    context = multiprocessing.get_context('spawn')
+    connection, child_connection = context.Pipe()
+    server = context.Process(target=_serve, args=(child_connection, page), daemon=True)
+    server.start()
+    try:
+        url = connection.recv()
+        print(f"{args.targets} targets, {len(page)} byte page, {args.concurrency} fetch threads, {cpus} CPUs")
+        print(f"{'parse workers':<20} {'pages/sec':>10} {'speedup':>8}")
+        in_thread = measure(url, args.targets, 0, args.rounds, args.concurrency)
+        print(f"{'0 (fetch threads)':<20} {in_thread:>10.1f} {'':>8}")
+        single = None
+        for workers in worker_counts:
+            rate = measure(url, args.targets, workers, args.rounds, args.concurrency)
+            single = single or rate
+            print(f"{workers:<20} {rate:>10.1f} {rate / single:>7.2f}x")
+    finally:
+        connection.send('stop')
+        server.join(5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark state file write latency under each durability mode.
+
+Writes the SB number record repeatedly with no fsync, fsync and journal
+durability and reports median, p99 and max latency per mode.
+
+Usage:
+    python benchmarks/bench_state_writes.py [--writes N] [--dir PATH]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from state_store import DURABILITY_MODES, StateFile
+
+
+def bench_mode(directory: str, durability: str, writes: int):
+    state = StateFile(os.path.join(directory, f"state_{durability}.json"), durability=durability)
+    timings = []
+    for i in range(writes):
+        record = {
+            'sb_number': str(10573 + i),
+            'last_updated': datetime.now().isoformat(),
+            'timestamp': datetime.now().timestamp()
+        }
+        start = time.perf_counter()
+        state.write(record)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1], timings[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--dir', help="Directory to write in (defaults to a temp dir; use the data volume for realistic numbers)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"{'durability':<10} {'median ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for durability in DURABILITY_MODES:
+            median, p99, worst = bench_mode(directory, durability, args.writes)
+            print(f"{durability:<10} {median * 1000:>10.3f} {p99 * 1000:>10.3f} {worst * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the scraper, with JSON results for comparing commits.
+
+Serves the recorded PMSV page and enlarged variants of it from a local fake
+EC server and measures, per page variant:
+
+    check_cold         end-to-end check_for_updates with no HTTP cache (fetch, parse, state and history writes)
+    check_conditional  check_for_updates when the server answers 304 Not Modified
+    parse              extract_value throughput on the page body (pages/sec, MB/s)
+
+Every benchmark runs in a fresh process so its peak RSS is its own. No
+network access is needed.
+
+Usage:
+    python benchmarks/bench_suite.py run [--iterations N] [--quick] [--output PATH]
+    python benchmarks/bench_suite.py compare BASELINE.json CURRENT.json [--threshold PCT]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.bench_extraction import enlarge
+from benchmarks.fake_ec_server import PAGE_PATH, FakeECServer, load_fixture
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Page variants: the recorded page, a larger page with the MIR line early, and
+# one with the MIR line at the very end (worst case for early exit)
+PAGES: Dict[str, Callable[[bytes], bytes]] = {
+    'recorded': lambda page: page,
+    'enlarged_x50': lambda page: enlarge(page, 50),
+    'enlarged_x500_target_last': lambda page: enlarge(page, 500, before_target=True),
+}
+BENCHMARKS = ('check_cold', 'check_conditional', 'parse')
+
+# Direction of each reported metric, for compare
+LOWER_IS_BETTER = ('median_ms', 'p95_ms', 'peak_rss_kib', 'rss_growth_kib')
+HIGHER_IS_BETTER = ('pages_per_sec', 'mb_per_sec')
+
+
+def _max_rss_kib() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / 1024 if sys.platform == 'darwin' else float(rss)
+
+
+def _latency_stats(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'p95_ms': timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000,
+    }
+
+
+def run_benchmark(benchmark: str, page_name: str, iterations: int) -> Dict[str, float]:
+    """
+    Run one benchmark on one page variant in the current process.
+
+    Returns:
+        Dict[str, float]: The measured metrics
+    """
+    import logging
+
+    root = logging.getLogger()
+    level = root.level
+    # Per-check INFO logging to the console would dominate the timings
+    root.setLevel(logging.WARNING)
+    try:
+        return _measure(benchmark, page_name, iterations)
+    finally:
+        root.setLevel(level)
+
+
+def _measure(benchmark: str, page_name: str, iterations: int) -> Dict[str, float]:
+    from scraper import PMSVScraper
+    from state_store import DURABILITY_NONE
+
+    body = PAGES[page_name](load_fixture())
+    baseline_rss = _max_rss_kib()
+    timings = []
+
+    with tempfile.TemporaryDirectory() as data_dir, FakeECServer({PAGE_PATH: body}) as server:
+        def new_scraper(index: int) -> PMSVScraper:
+            return PMSVScraper(data_file=os.path.join(data_dir, f'sb_{index}.json'), url=server.url(),
+                               state_durability=DURABILITY_NONE)
+
+        if benchmark == 'check_cold':
+            for i in range(iterations):
+                scraper = new_scraper(i)
+                start = time.perf_counter()
+                result = scraper.check_for_updates()
+                timings.append(time.perf_counter() - start)
+                scraper.session.close()
+                assert result[1] == '10573', result
+        elif benchmark == 'check_conditional':
+            scraper = new_scraper(0)
+            scraper.check_for_updates()
+            for _ in range(iterations):
+                start = time.perf_counter()
+                result = scraper.check_for_updates()
+                timings.append(time.perf_counter() - start)
+                assert result[1] == '10573', result
+            assert server.not_modified >= iterations
+        elif benchmark == 'parse':
+            scraper = new_scraper(0)
+            for _ in range(iterations):
+                start = time.perf_counter()
+                value = scraper.extract_value(body, 'utf-8')
+                timings.append(time.perf_counter() - start)
+                assert value == '10573', value
+        else:
+            raise ValueError(f"Unknown benchmark: {benchmark}")
+
+    result = _latency_stats(timings)
+    if benchmark == 'parse':
+        total = sum(timings)
+        result['pages_per_sec'] = iterations / total
+        result['mb_per_sec'] = iterations * len(body) / total / 1e6
+    peak = _max_rss_kib()
+    result.update({'body_bytes': len(body), 'iterations': iterations,
+                   'peak_rss_kib': peak, 'rss_growth_kib': peak - baseline_rss})
+    return result
+
+
+def _child(queue, benchmark: str, page_name: str, iterations: int) -> None:
+    try:
+        queue.put(('ok', run_benchmark(benchmark, page_name, iterations)))
+    except BaseException as e:
+        queue.put(('error', f"{type(e).__name__}: {e}"))
+
+
+def run_isolated(benchmark: str, page_name: str, iterations: int) -> Dict[str, float]:
+    """Run one benchmark in a fresh interpreter so peak RSS is not shared between benchmarks."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, benchmark, page_name, iterations))
+    process.start()
+    status, payload = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError(f"{benchmark}/{page_name} failed: {payload}")
+    return payload
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(iterations: int = 50, pages: Optional[List[str]] = None,
+              benchmarks: Optional[List[str]] = None, isolate: bool = True) -> Dict:
+    """
+    Run the selected benchmarks and return the results document.
+
+    Args:
+        iterations (int): Measured repetitions per benchmark
+        pages (Optional[List[str]]): Page variants to use, all by default
+        benchmarks (Optional[List[str]]): Benchmarks to run, all by default
+        isolate (bool): Run each benchmark in its own process
+
+    Returns:
+        Dict: {'meta': {...}, 'results': {'<benchmark>/<page>': {metric: value}}}
+    """
+    runner = run_isolated if isolate else run_benchmark
+    results = {}
+    for benchmark in benchmarks or BENCHMARKS:
+        for page_name in pages or PAGES:
+            results[f"{benchmark}/{page_name}"] = runner(benchmark, page_name, iterations)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 10.0) -> List[Dict]:
+    """
+    Compare two results documents.
+
+    Args:
+        baseline (Dict): Results of the reference commit
+        current (Dict): Results to check
+        threshold (float): Percentage change in the bad direction that counts as a regression
+
+    Returns:
+        List[Dict]: One row per metric with name, metric, baseline, current, change_pct and regression
+    """
+    rows = []
+    for name, base_metrics in baseline['results'].items():
+        metrics = current['results'].get(name)
+        if metrics is None:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metric not in base_metrics or metric not in metrics or not base_metrics[metric]:
+                continue
+            change = (metrics[metric] - base_metrics[metric]) / base_metrics[metric] * 100
+            worse = change if metric in LOWER_IS_BETTER else -change
+            rows.append({'name': name, 'metric': metric, 'baseline': base_metrics[metric],
+                         'current': metrics[metric], 'change_pct': change, 'regression': worse > threshold})
+    return rows
+
+
+def print_results(document: Dict) -> None:
+    print(f"{'benchmark':<44} {'median ms':>10} {'p95 ms':>10} {'pages/s':>9} {'peak RSS MiB':>13}")
+    for name, metrics in document['results'].items():
+        pages_per_sec = f"{metrics['pages_per_sec']:.1f}" if 'pages_per_sec' in metrics else '-'
+        print(f"{name:<44} {metrics['median_ms']:>10.2f} {metrics['p95_ms']:>10.2f} "
+              f"{pages_per_sec:>9} {metrics['peak_rss_kib'] / 1024:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the suite and save the results as JSON")
+    run_parser.add_argument('--iterations', type=int, default=50)
+    run_parser.add_argument('--quick', action='store_true', help="Few iterations on the recorded page only")
+    run_parser.add_argument('--page', action='append', choices=list(PAGES), help="Page variant (repeatable)")
+    run_parser.add_argument('--benchmark', action='append', choices=BENCHMARKS, help="Benchmark (repeatable)")
+    run_parser.add_argument('--output', help="Results file (default: benchmarks/results/<commit>.json)")
+
+    compare_parser = commands.add_parser('compare', help="Compare two results files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help="Regression threshold in percent (default 10)")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        iterations = 5 if args.quick else args.iterations
+        pages = ['recorded'] if args.quick and not args.page else args.page
+        document = run_suite(iterations, pages, args.benchmark)
+        print_results(document)
+        output = args.output or os.path.join(RESULTS_DIR, f"{document['meta']['commit'] or 'local'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<44} {'metric':<15} {'baseline':>11} {'current':>11} {'change':>8}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<44} {row['metric']:<15} {row['baseline']:>11.2f} {row['current']:>11.2f} "
+              f"{row['change_pct']:>+7.1f}%{flag}")
+    if any(row['regression'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
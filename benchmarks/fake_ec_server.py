@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the EC PMSV reporting forms page.
+
+Serves recorded or generated page bodies over HTTP with ETag / Last-Modified
+validators, answering conditional requests with 304, and can add a fixed
+delay per request to mimic a remote server. Used by the benchmark suite so
+benchmarks run without network access; it can also be run on its own to
+point a monitor at it (e.g. through a TARGETS_FILE entry).
+
+Usage:
+    python benchmarks/fake_ec_server.py [--port 8000] [--sections N] [--latency-ms MS]
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'pmsv_page.html')
+PAGE_PATH = '/pmsv-reporting-forms_en'
+
+
+def load_fixture(path: str = FIXTURE) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class FakeECServer:
+    """
+    Threaded HTTP server for a fixed set of pages.
+
+    Args:
+        pages (Dict[str, bytes]): Response body per request path
+        latency (float): Seconds to wait before answering each request
+        host (str): Address to bind; port 0 picks a free port
+    """
+
+    def __init__(self, pages: Dict[str, bytes], latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self._pages: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        for path, body in pages.items():
+            self.set_page(path, body)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def set_page(self, path: str, body: bytes) -> None:
+        """Replace a page; its ETag and Last-Modified change with it."""
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        with self._lock:
+            self._pages[path] = (body, etag, formatdate(time.time(), usegmt=True))
+
+    def url(self, path: str = PAGE_PATH) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                    page = fake._pages.get(self.path)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if page is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body, etag, last_modified = page
+                if self.headers.get('If-None-Match') == etag:
+                    with fake._lock:
+                        fake.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeECServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='fake-ec-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def __enter__(self) -> 'FakeECServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    import sys
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from bench_extraction import enlarge
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--sections', type=int, default=0, help="Filler sections to add to the recorded page")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    page = enlarge(load_fixture(), args.sections) if args.sections else load_fixture()
+    server = FakeECServer({PAGE_PATH: page}, latency=args.latency_ms / 1000, host=args.host, port=args.port)
+    print(f"Serving {len(page)} byte page at {server.url()}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
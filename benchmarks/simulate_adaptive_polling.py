@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Replay SB change history against fixed and adaptive polling schedules.
+
+Change times come from a history database (--db) or, without one, from a
+synthetic history of updates on weekday business hours in CET. Every
+strategy is replayed over the same period and reports the number of
+requests and the mean, p95 and max time to detection. Each adaptive run is
+also compared with a fixed interval that makes the same number of requests.
+
+Usage:
+    python benchmarks/simulate_adaptive_polling.py [--db PATH] [--target NAME] [--weeks N]
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from adaptive_polling import adaptive_strategy, load_change_times, load_timezone, simulate
+from history_store import DEFAULT_TARGET, HistoryStore
+
+
+def synthetic_changes(weeks: int, mean_gap_days: float, tz, seed: int = 7):
+    """Roughly one change every mean_gap_days, always on a weekday between 09:00 and 17:00."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=tz).timestamp()
+    end = start + weeks * 7 * 86400
+    changes = []
+    ts = start
+    while True:
+        ts += rng.expovariate(1 / (mean_gap_days * 86400))
+        if ts > end:
+            break
+        local = datetime.fromtimestamp(ts, tz)
+        while local.weekday() >= 5:
+            local += timedelta(days=1)
+        changes.append(local.replace(hour=rng.randint(9, 16), minute=rng.randint(0, 59)).timestamp())
+    return start, end, sorted(c for c in changes if c <= end)
+
+
+def report(name: str, result) -> None:
+    print(f"{name:<24} {result['requests']:>9} {result['detected']:>4}/{result['changes']:<4} "
+          f"{result['mean_delay'] / 3600:>9.2f} {result['p95_delay'] / 3600:>9.2f} {result['max_delay'] / 3600:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help="History database to replay (defaults to a synthetic history)")
+    parser.add_argument('--target', default=DEFAULT_TARGET)
+    parser.add_argument('--weeks', type=int, default=104, help="Length of the synthetic history")
+    parser.add_argument('--mean-gap-days', type=float, default=14, help="Mean days between synthetic changes")
+    parser.add_argument('--fixed-hours', type=float, nargs='+', default=[1, 6, 24])
+    parser.add_argument('--base-hours', type=float, nargs='+', default=[1, 3, 6, 12])
+    parser.add_argument('--min-minutes', type=float, default=15)
+    parser.add_argument('--max-hours', type=float, default=24)
+    parser.add_argument('--timezone', default='Europe/Brussels')
+    args = parser.parse_args()
+
+    tz = load_timezone(args.timezone)
+    if args.db:
+        history = HistoryStore(args.db)
+        changes = load_change_times(history, [args.target])
+        checks = history.checks(args.target)
+        if not checks:
+            sys.exit(f"No checks recorded for {args.target} in {args.db}")
+        start, end = checks[-1]['timestamp'], checks[0]['timestamp']
+    else:
+        start, end, changes = synthetic_changes(args.weeks, args.mean_gap_days, tz)
+    print(f"Replaying {len(changes)} change(s) over {(end - start) / 86400:.0f} days\n")
+
+    print(f"{'strategy':<24} {'requests':>9} {'detected':>9} {'mean h':>9} {'p95 h':>9} {'max h':>9}")
+    for hours in args.fixed_hours:
+        report(f"fixed {hours:g}h", simulate(changes, start, end, lambda now, detected, s=hours * 3600: s))
+    for hours in args.base_hours:
+        adaptive = simulate(changes, start, end, adaptive_strategy(
+            start, min_interval=args.min_minutes * 60, max_interval=args.max_hours * 3600,
+            base_interval=hours * 3600, tz=tz))
+        report(f"adaptive base {hours:g}h", adaptive)
+        same_budget = (end - start) / max(adaptive['requests'], 1)
+        report(f"  fixed {same_budget / 3600:.1f}h (same req.)",
+               simulate(changes, start, end, lambda now, detected, s=same_budget: s))
+
+
+if __name__ == '__main__':
+    main()
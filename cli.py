@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for the PMSV monitor.
+
+    pmsv check --once      run one check, send notifications and exit (for cron / CI)
+    pmsv check             run the monitoring service (same as python main.py)
+    pmsv archive list      list the archived page versions (see snapshot_archive.py)
+    pmsv archive show      write the page as it was at --as-of
+    pmsv archive compact   drop versions older than the retention window and unused blobs
+    pmsv --importtime ...  run the command and report where start-up time went
+
+Only the modules the selected command needs are imported. A one-shot check
+of the default target uses the stdlib HTTP client in lite_http.py; requests,
+lxml and the email stack are imported only when a body has to be parsed or a
+notification has to be sent, so a check answered with 304 Not Modified
+starts, fetches and exits in well under the cost of importing requests.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from history_store import DEFAULT_TARGET
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (module, self microseconds, cumulative microseconds, nesting depth)
+ImportTiming = Tuple[str, int, int, int]
+
+PROXY_VARIABLES = ('HTTPS_PROXY', 'https_proxy', 'HTTP_PROXY', 'http_proxy', 'ALL_PROXY', 'all_proxy')
+
+
+def load_env() -> None:
+    """Load .env from the working directory or next to this file; dotenv is only imported if one exists."""
+    for path in ('.env', os.path.join(ROOT, '.env')):
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+
+            load_dotenv(path)
+            return
+
+
+def make_session(http_client: str):
+    """
+    Create the HTTP session for a one-shot check.
+
+    Args:
+        http_client (str): 'lite', 'requests' or 'auto' (lite unless a proxy is configured)
+
+    Returns:
+        The session, or None to let PMSVScraper create its requests.Session
+    """
+    if http_client == 'requests' or (http_client == 'auto' and any(os.getenv(v) for v in PROXY_VARIABLES)):
+        return None
+    from lite_http import LiteSession
+    from scraper import USER_AGENT
+
+    timeout = (float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')), float(os.getenv('HTTP_READ_TIMEOUT', '30')))
+    return LiteSession(headers={'User-Agent': USER_AGENT}, timeout=timeout)
+
+
+def spool_has_pending(spool_dir: str) -> bool:
+    try:
+        return any(entry.name.endswith('.json') for entry in os.scandir(spool_dir))
+    except OSError:
+        return False
+
+
+def deliver_notifications(notifications: List[Tuple[str, tuple, dict]], timeout: float) -> bool:
+    """
+    Send notifications through the spool and wait for them to be delivered.
+
+    Notifications left in the spool by earlier runs are retried as well. What
+    cannot be delivered within the timeout stays spooled for the next run.
+
+    Args:
+        notifications (List[Tuple[str, tuple, dict]]): (notifier method, args, kwargs) per notification
+        timeout (float): Seconds to wait for delivery
+
+    Returns:
+        bool: True if the spool drained
+    """
+    spool_dir = os.getenv('NOTIFY_SPOOL_DIR', 'notification_spool')
+    if not notifications and not spool_has_pending(spool_dir):
+        return True
+
+    from email_notifier import EmailNotifier
+    from notification_queue import NotificationDispatcher
+
+    notifier = EmailNotifier()
+    dispatcher = NotificationDispatcher(
+        notifier,
+        spool_dir=spool_dir,
+        maxsize=int(os.getenv('NOTIFY_QUEUE_SIZE', '100')),
+        max_retries=int(os.getenv('NOTIFY_MAX_RETRIES', '5'))
+    )
+    dispatcher.start()
+    try:
+        for method, args, kwargs in notifications:
+            dispatcher.submit(method, *args, **kwargs)
+        drained = dispatcher.join(timeout)
+        if not drained:
+            logging.warning(f"{dispatcher.pending} notification(s) not delivered yet; they stay spooled")
+        return drained
+    finally:
+        dispatcher.stop()
+        notifier.close()
+
+
+def check_default_target(args: argparse.Namespace) -> Tuple[int, List[Tuple[str, tuple, dict]]]:
+    """Check the PMSV page once. Returns the exit code and the notifications to send."""
+    from scraper import PMSVScraper
+
+    scraper = PMSVScraper(data_file=args.data_file, url=args.url,
+                          state_durability=os.getenv('STATE_DURABILITY', 'fsync'),
+                          session=make_session(args.http_client))
+    try:
+        updated, current, previous = scraper.check_for_updates()
+    except Exception as e:
+        current, previous, updated = None, None, False
+        error = f"Error during PMSV check: {e}"
+    else:
+        error = "Failed to retrieve current SB number from webpage"
+    finally:
+        scraper.session.close()
+
+    if current is None:
+        print(f"error: {error}")
+        return 1, ([('send_error_notification', (error,), {})] if args.notify_errors else [])
+    changes = scraper.change_summary()
+    if updated and previous is not None:
+        print(f"updated: {previous} -> {current}")
+        return 0, [('send_notification', (previous, current), {'changes': changes} if changes else {})]
+    print(f"{'unchanged' if previous else 'initial'}: {current}")
+    if changes:
+        print('\n'.join(f"  {line}" for line in changes))
+        return 0, [('send_page_change_notification', (changes,), {})]
+    return 0, []
+
+
+def check_targets(args: argparse.Namespace, targets_file: str) -> Tuple[int, List[Tuple[str, tuple, dict]]]:
+    """Check every target in TARGETS_FILE once. Returns the exit code and the notifications to send."""
+    from monitor_engine import AsyncMonitorEngine
+
+    engine = AsyncMonitorEngine.from_config(
+        targets_file,
+        data_dir=os.getenv('DATA_DIR', 'data'),
+        max_per_host=int(os.getenv('MAX_REQUESTS_PER_HOST', '4')),
+        max_concurrency=int(os.getenv('MAX_CONCURRENT_CHECKS', '16')),
+        state_durability=os.getenv('STATE_DURABILITY', 'fsync'),
+        parse_workers=int(os.getenv('PARSE_WORKERS', '0'))
+    )
+    try:
+        results = engine.run_check()
+    finally:
+        engine.close()
+
+    notifications = []
+    exit_code = 0
+    for result in results:
+        name = result.target.name
+        if result.current is None:
+            exit_code = 1
+            print(f"{name}: error: {result.error}")
+            if args.notify_errors:
+                message = f"[{name}] {result.error} ({result.target.url})"
+                notifications.append(('send_error_notification', (message,), {}))
+        elif result.updated and result.previous is not None:
+            print(f"{name}: updated: {result.previous} -> {result.current}")
+            notifications.append(('send_notification', (result.previous, result.current),
+                                  {'target_name': name, 'url': result.target.url,
+                                   **({'changes': result.changes} if result.changes else {})}))
+        else:
+            print(f"{name}: {'unchanged' if result.previous else 'initial'}: {result.current}")
+            if result.changes:
+                print('\n'.join(f"  {line}" for line in result.changes))
+                notifications.append(('send_page_change_notification', (result.changes,),
+                                      {'target_name': name, 'url': result.target.url}))
+    return exit_code, notifications
+
+
+def command_check(args: argparse.Namespace) -> int:
+    load_env()
+    if not args.once:
+        from main import main as run_service
+
+        run_service()
+        return 0
+
+    targets_file = os.getenv('TARGETS_FILE')
+    if targets_file:
+        exit_code, notifications = check_targets(args, targets_file)
+    else:
+        exit_code, notifications = check_default_target(args)
+    if not deliver_notifications(notifications, args.notify_timeout):
+        exit_code = exit_code or 2
+    return exit_code
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='seconds')
+
+
+def parse_as_of(value: str) -> float:
+    """
+    Unix time of an --as-of argument.
+
+    A date without a time means the end of that day, so the page shown is the
+    last one served on it.
+
+    Raises:
+        ValueError: If value is not an ISO 8601 date or date and time
+    """
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    return datetime.combine(day, datetime.max.time()).timestamp()
+
+
+def command_archive(args: argparse.Namespace) -> int:
+    load_env()
+    directory = args.dir or os.getenv('SNAPSHOT_ARCHIVE_DIR')
+    if not directory or not os.path.isdir(directory):
+        print(f"error: no snapshot archive at {directory!r}; set SNAPSHOT_ARCHIVE_DIR or pass --dir")
+        return 1
+    from snapshot_archive import SnapshotArchive
+
+    archive = SnapshotArchive(directory)
+    if args.archive_command == 'list':
+        for row in archive.versions(args.target):
+            print(f"{row['target']:<24} {format_time(row['first_seen'])} .. {format_time(row['last_seen'])} "
+                  f"{row['checks']:>7} checks  {row['content_hash'][:12]}")
+        stats = archive.stats()
+        print(f"{stats['snapshots']} version(s) of {stats['checks']} checks in {stats['blobs']} blob(s), "
+              f"{stats['bytes']} bytes stored as {stats['stored_bytes']}")
+        return 0
+
+    if args.archive_command == 'show':
+        try:
+            when = parse_as_of(args.as_of) if args.as_of else time.time()
+        except ValueError as e:
+            print(f"error: invalid --as-of {args.as_of!r}: {e}")
+            return 1
+        snapshot = archive.snapshot_as_of(args.target, when)
+        if snapshot is None:
+            print(f"error: no archived page of {args.target} as of {format_time(when)}")
+            return 1
+        body = archive.read_blob(snapshot['content_hash'])
+        print(f"{snapshot['url']}: version {snapshot['content_hash'][:12]}, seen "
+              f"{format_time(snapshot['first_seen'])} .. {format_time(snapshot['last_seen'])}", file=sys.stderr)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(body)
+        else:
+            sys.stdout.buffer.write(body)
+            sys.stdout.flush()
+        return 0
+
+    keep_days = args.keep_days if args.keep_days is not None else float(os.getenv('SNAPSHOT_RETENTION_DAYS', '365'))
+    result = archive.compact(keep_days * 86400)
+    print(f"removed {result['snapshots_removed']} version(s) and {result['blobs_removed']} blob(s), "
+          f"{result['bytes_freed']} bytes freed")
+    return 0
+
+
+def parse_importtime(stderr: str) -> Tuple[List[ImportTiming], List[str]]:
+    """
+    Split `python -X importtime` output from the rest of stderr.
+
+    Returns:
+        Tuple[List[ImportTiming], List[str]]: Import timings in report order, and the other lines
+    """
+    timings = []
+    other = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            other.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return timings, other
+
+
+def format_importtime(timings: List[ImportTiming], wall_seconds: float, top: int = 15) -> str:
+    """Render the top-level imports and the slowest modules by self time."""
+    top_level = sorted((t for t in timings if t[3] == 0), key=lambda t: t[2], reverse=True)
+    total_ms = sum(t[2] for t in top_level) / 1000
+    lines = [f"Wall time {wall_seconds * 1000:.1f} ms, of which imports {total_ms:.1f} ms "
+             f"({len(timings)} modules)", "",
+             f"{'top-level import':<40} {'cumulative ms':>14}"]
+    lines += [f"{name:<40} {cumulative / 1000:>14.1f}" for name, _, cumulative, _ in top_level[:top]]
+    lines += ["", f"{'module':<40} {'self ms':>14}"]
+    slowest = sorted(timings, key=lambda t: t[1], reverse=True)[:top]
+    lines += [f"{name:<40} {self_us / 1000:>14.1f}" for name, self_us, _, _ in slowest]
+    return '\n'.join(lines)
+
+
+def run_with_importtime(argv: List[str], top: int) -> int:
+    """Re-run this CLI under -X importtime and print the breakdown to stderr."""
+    import subprocess
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv],
+                             stderr=subprocess.PIPE, text=True)
+    wall_seconds = time.perf_counter() - start
+    timings, other = parse_importtime(process.stderr)
+    if other:
+        print('\n'.join(other), file=sys.stderr)
+    print(format_importtime(timings, wall_seconds, top), file=sys.stderr)
+    return process.returncode
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='pmsv', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--importtime', action='store_true',
+                        help="Run the command under -X importtime and print the slowest imports")
+    parser.add_argument('--importtime-top', type=int, default=15, help="Rows per importtime table (default 15)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help="Check for SB number changes")
+    check.add_argument('--once', action='store_true', help="Run a single check and exit instead of monitoring")
+    check.add_argument('--http-client', choices=('auto', 'lite', 'requests'), default='auto',
+                       help="HTTP client for --once; auto uses requests only if a proxy is configured")
+    check.add_argument('--url', help="Page to check with --once (default: the PMSV reporting forms page)")
+    check.add_argument('--data-file', default='sb_number_data.json',
+                       help="State file for --once; the history database sits next to it")
+    check.add_argument('--notify-errors', action='store_true',
+                       help="Email failed checks too (the long-running monitor coalesces these instead)")
+    check.add_argument('--notify-timeout', type=float, default=30.0,
+                       help="Seconds to wait for notifications to be delivered (default 30)")
+    check.set_defaults(handler=command_check)
+
+    archive = commands.add_parser('archive', help="Read and compact the snapshot archive of page versions")
+    archive.add_argument('--dir', help="Archive directory (default: SNAPSHOT_ARCHIVE_DIR)")
+    archive_commands = archive.add_subparsers(dest='archive_command', required=True)
+    archive_list = archive_commands.add_parser('list', help="List the archived versions")
+    archive_list.add_argument('--target', help="Only list this target")
+    show = archive_commands.add_parser('show', help="Write the page a target served at a point in time")
+    show.add_argument('--target', default=DEFAULT_TARGET, help=f"Target name (default {DEFAULT_TARGET})")
+    show.add_argument('--as-of', help="ISO 8601 date or date and time, local unless an offset is given; "
+                                      "a date alone means the end of that day (default now)")
+    show.add_argument('--output', '-o', help="File to write the page to (default stdout)")
+    compact = archive_commands.add_parser('compact', help="Apply retention and delete unused blobs")
+    compact.add_argument('--keep-days', type=float,
+                         help="Keep versions seen in the last N days (default SNAPSHOT_RETENTION_DAYS or 365); "
+                              "the latest version of each target is always kept")
+    archive.set_defaults(handler=command_archive)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv)
+    if args.importtime:
+        child_argv = [a for a in argv if a != '--importtime']
+        return run_with_importtime(child_argv, args.importtime_top)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
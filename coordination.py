@@ -0,0 +1,398 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import quote
+
+from metrics import COORDINATION_LEASES
+from state_store import DURABILITY_NONE, StateFile
+
+BACKENDS = ('none', 'sqlite', 'file')
+
+
+class LeaseBackend(ABC):
+    """
+    Shared store for replica leases and membership heartbeats.
+
+    A lease is held by one owner until it expires or is released; acquire()
+    both takes a free or expired lease and renews a lease the owner already
+    holds. Implementations must make acquire() atomic across processes.
+    """
+
+    @abstractmethod
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease for ttl seconds; False if another owner holds it."""
+
+    @abstractmethod
+    def release(self, name: str, owner: str) -> None:
+        """Give up a lease, if owner holds it."""
+
+    @abstractmethod
+    def holder(self, name: str) -> Optional[str]:
+        """The current, unexpired owner of a lease."""
+
+    @abstractmethod
+    def heartbeat(self, member: str, ttl: float) -> None:
+        """Register a replica as alive for ttl seconds."""
+
+    @abstractmethod
+    def leave(self, member: str) -> None:
+        """Remove a replica from the members at once."""
+
+    @abstractmethod
+    def members(self) -> List[str]:
+        """The replicas whose heartbeat has not expired, sorted."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    member TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """
+    Leases in an SQLite database on a volume shared by the replicas.
+
+    Each acquire is a single conditional UPSERT, so SQLite's write lock makes
+    it atomic. Expiry uses the wall clock, which the replicas must share
+    (the same host, or NTP-synchronized hosts).
+    """
+
+    def __init__(self, db_path: str, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.clock = clock
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = self.clock()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.owner = excluded.owner OR leases.expires <= ?",
+                (name, owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, name: str, owner: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def holder(self, name: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT owner FROM leases WHERE name = ? AND expires > ?",
+                               (name, self.clock())).fetchone()
+        return row[0] if row else None
+
+    def heartbeat(self, member: str, ttl: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO members (member, expires) VALUES (?, ?) "
+                "ON CONFLICT(member) DO UPDATE SET expires = excluded.expires",
+                (member, self.clock() + ttl)
+            )
+
+    def leave(self, member: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM members WHERE member = ?", (member,))
+
+    def members(self) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT member FROM members WHERE expires > ? ORDER BY member",
+                                (self.clock(),)).fetchall()
+        return [row[0] for row in rows]
+
+
+class FileLeaseBackend(LeaseBackend):
+    """
+    Leases as JSON files in a shared directory, for volumes where SQLite
+    locking is unreliable (e.g. some network file systems).
+
+    Every read-modify-write holds an exclusive flock on the directory's lock file.
+    """
+
+    def __init__(self, directory: str, clock: Callable[[], float] = time.time):
+        import fcntl
+
+        self._fcntl = fcntl
+        self.directory = directory
+        self.clock = clock
+        os.makedirs(os.path.join(directory, 'leases'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'members'), exist_ok=True)
+        self._lock_path = os.path.join(directory, '.lock')
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock, open(self._lock_path, 'a') as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+    def _file(self, kind: str, name: str) -> StateFile:
+        return StateFile(os.path.join(self.directory, kind, f"{quote(name, safe='')}.json"),
+                         durability=DURABILITY_NONE)
+
+    def _read(self, state: StateFile) -> Optional[Dict]:
+        try:
+            return state.read()
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        with self._locked():
+            now = self.clock()
+            state = self._file('leases', name)
+            lease = self._read(state)
+            if lease and lease['owner'] != owner and lease['expires'] > now:
+                return False
+            state.write({'owner': owner, 'expires': now + ttl})
+            return True
+
+    def release(self, name: str, owner: str) -> None:
+        with self._locked():
+            state = self._file('leases', name)
+            lease = self._read(state)
+            if lease and lease['owner'] == owner:
+                os.remove(state.path)
+
+    def holder(self, name: str) -> Optional[str]:
+        with self._locked():
+            lease = self._read(self._file('leases', name))
+        return lease['owner'] if lease and lease['expires'] > self.clock() else None
+
+    def heartbeat(self, member: str, ttl: float) -> None:
+        with self._locked():
+            self._file('members', member).write({'member': member, 'expires': self.clock() + ttl})
+
+    def leave(self, member: str) -> None:
+        with self._locked():
+            try:
+                os.remove(self._file('members', member).path)
+            except FileNotFoundError:
+                pass
+
+    def members(self) -> List[str]:
+        now = self.clock()
+        members = []
+        with self._locked():
+            for entry in os.scandir(os.path.join(self.directory, 'members')):
+                if entry.name.endswith('.json'):
+                    record = self._read(StateFile(entry.path, durability=DURABILITY_NONE))
+                    if record and record['expires'] > now:
+                        members.append(record['member'])
+        return sorted(members)
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring assigning targets to replicas.
+
+    Each member is placed at vnodes points on the ring; a target belongs to the
+    first member point after its own hash. When a member joins or leaves, only
+    the targets next to its points move.
+    """
+
+    def __init__(self, members: Iterable[str], vnodes: int = 64):
+        self.members = sorted(set(members))
+        points = sorted((_ring_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class Coordinator:
+    """
+    Decides which replica runs each target's check.
+
+    Live replicas (those with an unexpired heartbeat) form a hash ring. A
+    replica runs a target only if it is the target's ring owner and holds the
+    target's lease, so two replicas never check the same target even while
+    their views of the membership differ. A background thread renews the
+    heartbeat and held leases every lease_ttl / 3 seconds and releases the
+    leases of targets that moved to a replica that joined. When a replica
+    dies, its heartbeat and leases expire within lease_ttl and the next check
+    on the new ring owner takes over; a replica that stops cleanly releases
+    them at once.
+
+    Args:
+        backend (LeaseBackend): Shared lease store
+        member_id (Optional[str]): Unique replica name, hostname-pid by default
+        lease_ttl (float): Seconds until the leases of a silent replica expire
+        vnodes (int): Ring points per replica
+    """
+
+    def __init__(self, backend: LeaseBackend, member_id: Optional[str] = None,
+                 lease_ttl: float = 30.0, vnodes: int = 64):
+        self.backend = backend
+        self.member_id = member_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self.vnodes = vnodes
+        self.held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _set_held(self, held: Set[str]) -> None:
+        self.held = held
+        COORDINATION_LEASES.set(len(held), member=self.member_id)
+
+    def heartbeat(self) -> None:
+        """
+        Announce this replica and renew its leases.
+
+        Leases of targets whose ring owner is now another replica are released, so
+        a joining replica can take them at once; leases lost meanwhile are dropped.
+        """
+        with self._lock:
+            self.backend.heartbeat(self.member_id, self.lease_ttl)
+            ring = self.ring()
+            kept = set()
+            for name in self.held:
+                owner = ring.owner(name)
+                if owner != self.member_id:
+                    logging.info(f"{name} moved to {owner}, releasing its lease")
+                    self.backend.release(name, self.member_id)
+                elif self.backend.acquire(name, self.member_id, self.lease_ttl):
+                    kept.add(name)
+                else:
+                    logging.warning(f"Lost the lease for {name}")
+            self._set_held(kept)
+
+    def ring(self) -> HashRing:
+        return HashRing(set(self.backend.members()) | {self.member_id}, self.vnodes)
+
+    def owned(self, names: Iterable[str]) -> List[str]:
+        """
+        Claim the targets this replica should check now.
+
+        Args:
+            names (Iterable[str]): All target names
+
+        Returns:
+            List[str]: The names this replica owns and holds the lease for, in order
+        """
+        self.heartbeat()
+        ring = self.ring()
+        owned = []
+        with self._lock:
+            held = set(self.held)
+            for name in names:
+                if ring.owner(name) != self.member_id:
+                    if name in held:
+                        # Hand over right away instead of letting the lease run out
+                        logging.info(f"{name} moved to {ring.owner(name)}, releasing its lease")
+                        self.backend.release(name, self.member_id)
+                        held.discard(name)
+                    continue
+                if self.backend.acquire(name, self.member_id, self.lease_ttl):
+                    held.add(name)
+                    owned.append(name)
+                else:
+                    logging.info(f"{name} is still leased by {self.backend.holder(name)}")
+            self._set_held(held)
+        return owned
+
+    def owns(self, name: str) -> bool:
+        return bool(self.owned([name]))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease_ttl / 3):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logging.error(f"Coordination heartbeat failed: {e}")
+
+    def start(self) -> None:
+        """Join the ring and keep the heartbeat and leases alive in the background."""
+        if self._thread is not None:
+            return
+        self.heartbeat()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='pmsv-coordination', daemon=True)
+        self._thread.start()
+        logging.info(f"Joined replica ring as {self.member_id} (members: {', '.join(self.backend.members())})")
+
+    def stop(self) -> None:
+        """Release all leases and leave the ring, so other replicas take over at once."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for name in self.held:
+                self.backend.release(name, self.member_id)
+            self._set_held(set())
+            self.backend.leave(self.member_id)
+
+
+def create_coordinator(backend: Optional[str] = None, path: Optional[str] = None,
+                       member_id: Optional[str] = None,
+                       lease_ttl: Optional[float] = None) -> Optional[Coordinator]:
+    """
+    Create a coordinator from arguments or the COORDINATION_* environment variables.
+
+    Args:
+        backend (Optional[str]): none, sqlite or file (COORDINATION_BACKEND, default none)
+        path (Optional[str]): Database file or directory on a volume shared by all replicas
+            (COORDINATION_PATH, default data/coordination.db or data/coordination)
+        member_id (Optional[str]): Replica name (REPLICA_ID, default hostname-pid)
+        lease_ttl (Optional[float]): Lease and heartbeat lifetime (COORDINATION_LEASE_SECONDS, default 30)
+
+    Returns:
+        Optional[Coordinator]: None if coordination is disabled
+    """
+    backend = (backend or os.getenv('COORDINATION_BACKEND', 'none')).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown COORDINATION_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == 'none':
+        return None
+    default_path = 'data/coordination.db' if backend == 'sqlite' else 'data/coordination'
+    path = path or os.getenv('COORDINATION_PATH', default_path)
+    lease_backend = SQLiteLeaseBackend(path) if backend == 'sqlite' else FileLeaseBackend(path)
+    return Coordinator(
+        lease_backend,
+        member_id=member_id or os.getenv('REPLICA_ID') or None,
+        lease_ttl=lease_ttl or float(os.getenv('COORDINATION_LEASE_SECONDS', '30'))
+    )
@@ -1,10 +1,36 @@
-import smtplib
 import os
+import threading
+import time
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.message import Message
 from datetime import datetime
 import logging
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from smtp_pool import SMTPConnectionManager
+from metrics import EMAIL_SEND_SECONDS
+
+PMSV_PAGE_URL = "https://health.ec.europa.eu/medical-devices-sector/new-regulations/guidance-mdcg-endorsed-documents-and-other-guidance/pmsv-reporting-forms_en"
+
+
+def _format_changes(changes: Optional[List[str]]) -> str:
+    """The "what changed" block of a notification body, empty without changes."""
+    if not changes:
+        return ""
+    lines = "\n            ".join(changes)
+    return f"""
+            Changes on the page:
+            {lines}
+            """
+
+class BatchOutcome:
+    """Messages queued inside EmailNotifier.batch(), and how many of them (in order) were sent."""
+
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+
 
 class EmailNotifier:
     def __init__(self):
@@ -14,19 +40,97 @@ class EmailNotifier:
         self.sender_password = os.getenv('SENDER_PASSWORD')
         self.recipient_email = os.getenv('RECIPIENT_EMAIL')
         
+        self.smtp_use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Error storm handling, applied by NotificationCoalescer
+        self.dedup_window_minutes = float(os.getenv('NOTIFY_DEDUP_WINDOW_MINUTES', '60'))
+        self.rate_limit_per_hour = int(os.getenv('NOTIFY_RATE_LIMIT_PER_HOUR', '6'))
+        self.digest_interval_minutes = float(os.getenv('NOTIFY_DIGEST_INTERVAL_MINUTES', '360'))
+        
         if not all([self.sender_email, self.sender_password, self.recipient_email]):
             logging.warning("Email configuration incomplete. Email notifications will be disabled.")
             self.enabled = False
         else:
             self.enabled = True
+        
+        # One authenticated session is kept alive and shared by all notifications
+        self.smtp = SMTPConnectionManager(
+            self.smtp_server, self.smtp_port,
+            username=self.sender_email, password=self.sender_password,
+            use_tls=self.smtp_use_tls,
+            keepalive_interval=float(os.getenv('SMTP_KEEPALIVE_SECONDS', '60')),
+            max_idle=float(os.getenv('SMTP_MAX_IDLE_SECONDS', '300'))
+        )
+        # The batch of the current thread; batches share the SMTP queue, so they take turns
+        self._local = threading.local()
+        self._batch_lock = threading.Lock()
+
+    @property
+    def _batch(self) -> Optional[BatchOutcome]:
+        return getattr(self._local, 'batch', None)
+
+    def _deliver(self, msg: Message, kind: str) -> None:
+        """Send a message now, or queue it while inside batch()."""
+        if self._batch is not None:
+            self.smtp.queue(msg)
+            self._batch.queued += 1
+            return
+        self._timed_send(self.smtp.send, kind, msg)
+
+    def _timed_send(self, send, kind: str, *args: Any,
+                    succeeded: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Call an SMTP send function and record its duration and outcome (error unless succeeded(value))."""
+        start = time.perf_counter()
+        result = 'error'
+        try:
+            value = send(*args)
+            if succeeded(value):
+                result = 'ok'
+            return value
+        finally:
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - start, kind=kind, result=result)
+
+    @contextmanager
+    def batch(self) -> Iterator[BatchOutcome]:
+        """
+        Queue all notifications sent inside the block and deliver them together
+        over a single SMTP session when the block exits.
+
+        Yields:
+            BatchOutcome: Filled in on exit; the first `sent` of the `queued`
+                messages were delivered, the rest were dropped (see SMTPConnectionManager.flush)
+        """
+        if self._batch is not None:
+            yield self._batch
+            return
+        with self._batch_lock:
+            outcome = self._local.batch = BatchOutcome()
+            try:
+                yield outcome
+            finally:
+                self._local.batch = None
+                if self.smtp.pending:
+                    # A flush that dropped messages counts as an error
+                    outcome.sent = self._timed_send(self.smtp.flush, 'batch',
+                                                    succeeded=lambda sent: sent >= outcome.queued)
+                    logging.info(f"Sent {outcome.sent} of {outcome.queued} batched email notification(s)")
+
+    def close(self) -> None:
+        """Close the pooled SMTP session."""
+        self.smtp.close()
 
-    def send_notification(self, previous_sb: str, current_sb: str) -> bool:
+    def send_notification(self, previous_sb: str, current_sb: str,
+                          target_name: Optional[str] = None, url: Optional[str] = None,
+                          changes: Optional[List[str]] = None) -> bool:
         """
         Send email notification about SB number change.
         
         Args:
             previous_sb (str): Previous SB number
             current_sb (str): Current SB number
+            target_name (Optional[str]): Name of the monitored target, if not the default PMSV page
+            url (Optional[str]): URL of the monitored page, defaults to the PMSV reporting forms page
+            changes (Optional[List[str]]): Other changes on the page, from PageDiff.summary_lines()
             
         Returns:
             bool: True if email sent successfully, False otherwise
@@ -40,37 +144,78 @@ class EmailNotifier:
             msg = MIMEMultipart()
             msg['From'] = self.sender_email
             msg['To'] = self.recipient_email
-            msg['Subject'] = f"PMSV SB Number Update Alert - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            label = f" [{target_name}]" if target_name else ""
+            msg['Subject'] = f"PMSV SB Number Update Alert{label} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            page_url = url or PMSV_PAGE_URL
             
             # Email body
             body = f"""
-            PMSV SB Number Update Detected!
+            PMSV SB Number Update Detected!{label}
             
             The SB number on the PMSV reporting forms page has been updated.
             
             Previous SB Number: {previous_sb}
             Current SB Number: {current_sb}
-            
-            Check the page at: https://health.ec.europa.eu/medical-devices-sector/new-regulations/guidance-mdcg-endorsed-documents-and-other-guidance/pmsv-reporting-forms_en
+            {_format_changes(changes)}
+            Check the page at: {page_url}
             
             This notification was sent automatically by the PMSV monitoring system.
             """
             
             msg.attach(MIMEText(body, 'plain'))
             
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
+            # Send email over the pooled session
+            self._deliver(msg, 'change')
             
-            logging.info(f"Email notification sent successfully to {self.recipient_email}")
+            logging.info(f"Email notification {'queued' if self._batch is not None else 'sent successfully'} to {self.recipient_email}")
             return True
             
         except Exception as e:
             logging.error(f"Failed to send email notification: {e}")
             return False
 
+    def send_page_change_notification(self, changes: List[str], target_name: Optional[str] = None,
+                                      url: Optional[str] = None) -> bool:
+        """
+        Send email notification about changed form records while the SB number stayed the same.
+        
+        Args:
+            changes (List[str]): The changes, from PageDiff.summary_lines()
+            target_name (Optional[str]): Name of the monitored target, if not the default PMSV page
+            url (Optional[str]): URL of the monitored page, defaults to the PMSV reporting forms page
+            
+        Returns:
+            bool: True if email sent successfully, False otherwise
+        """
+        if not self.enabled:
+            return False
+            
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = self.sender_email
+            msg['To'] = self.recipient_email
+            label = f" [{target_name}]" if target_name else ""
+            msg['Subject'] = f"PMSV Page Change Alert{label} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            
+            body = f"""
+            PMSV Reporting Forms Page Changed{label}
+            {_format_changes(changes)}
+            Check the page at: {url or PMSV_PAGE_URL}
+            
+            This notification was sent automatically by the PMSV monitoring system.
+            """
+            
+            msg.attach(MIMEText(body, 'plain'))
+            
+            self._deliver(msg, 'page_change')
+            
+            logging.info(f"Page change notification {'queued' if self._batch is not None else 'sent successfully'} to {self.recipient_email}")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Failed to send page change notification: {e}")
+            return False
+
     def send_error_notification(self, error_message: str) -> bool:
         """
         Send email notification about system errors.
@@ -102,14 +247,60 @@ class EmailNotifier:
             
             msg.attach(MIMEText(body, 'plain'))
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
+            self._deliver(msg, 'error')
             
-            logging.info(f"Error notification sent successfully to {self.recipient_email}")
+            logging.info(f"Error notification {'queued' if self._batch is not None else 'sent successfully'} to {self.recipient_email}")
             return True
             
         except Exception as e:
             logging.error(f"Failed to send error notification: {e}")
             return False
+
+    def send_digest(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        Send one email summarizing error notifications that were suppressed.
+        
+        Args:
+            events (List[Dict[str, Any]]): Suppressed errors with message, count,
+                first_seen and last_seen (unix time)
+            
+        Returns:
+            bool: True if email sent successfully, False otherwise
+        """
+        if not self.enabled:
+            return False
+            
+        try:
+            total = sum(event['count'] for event in events)
+            msg = MIMEMultipart()
+            msg['From'] = self.sender_email
+            msg['To'] = self.recipient_email
+            msg['Subject'] = f"PMSV Monitor Error Digest ({total} suppressed) - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            
+            lines = []
+            for event in events:
+                first = datetime.fromtimestamp(event['first_seen']).strftime('%Y-%m-%d %H:%M')
+                last = datetime.fromtimestamp(event['last_seen']).strftime('%Y-%m-%d %H:%M')
+                lines.append(f"- {event['count']}x between {first} and {last}: {event['message']}")
+            summary = "\n            ".join(lines)
+            
+            body = f"""
+            PMSV Monitoring System Error Digest
+            
+            The following errors were repeated and not emailed individually:
+            
+            {summary}
+            
+            Please check the system logs for more details.
+            """
+            
+            msg.attach(MIMEText(body, 'plain'))
+            
+            self._deliver(msg, 'digest')
+            
+            logging.info(f"Error digest {'queued' if self._batch is not None else 'sent successfully'} to {self.recipient_email}")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Failed to send error digest: {e}")
+            return False
@@ -0,0 +1,450 @@
+import functools
+import logging
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Type, Union
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is a declared dependency
+    etree = None
+
+# How many characters of trailing text are kept between regex searches. A match
+# must fit inside this window; the MIR line is well under 100 characters.
+DEFAULT_WINDOW = 4096
+DEFAULT_CHUNK_SIZE = 16 * 1024
+
+# Part of the parse cache key (see parse_cache.py). Bump it when a change here
+# can change what is extracted from the same page, so cached results are not reused.
+EXTRACTOR_VERSION = '1'
+
+# Selectors starting like this are XPath, anything else is CSS
+XPATH_PREFIXES = ('/', './', '(')
+
+# The CSS subset translated without cssselect: type, universal, #id, .class and
+# [attr], [attr=v], [attr~=v], [attr*=v], [attr^=v], [attr$=v] with descendant
+# and child combinators and comma-separated groups
+_CSS_TOKEN = re.compile(r'''
+    \s*(?P<combinator>[>,])\s*
+  | (?P<space>\s+)
+  | (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[~*^$]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+))\s*)?\]
+''', re.VERBOSE)
+
+
+class _MatchFound(Exception):
+    """Raised from the parser target to abort parsing once the pattern matched."""
+
+
+class _TextCollector:
+    """
+    lxml parser target that only collects text nodes.
+
+    Using a target means lxml tokenizes the document and calls back into Python
+    for each event without ever building an element tree.
+    """
+
+    def __init__(self):
+        self.pending = []
+
+    def start(self, tag, attrib):
+        pass
+
+    def end(self, tag):
+        pass
+
+    def data(self, data):
+        self.pending.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+class StreamingTextMatcher:
+    """
+    Incrementally runs a regex over the text content of an HTML byte stream.
+
+    Text is searched once per fed chunk and only a bounded window of trailing
+    text is retained, so neither the DOM nor the full page text is materialized.
+    """
+
+    def __init__(self, pattern: Pattern, window: int = DEFAULT_WINDOW,
+                 encoding: Optional[str] = None):
+        if etree is None:
+            raise RuntimeError("lxml is required for streaming extraction")
+        self.pattern = pattern
+        self.window = window
+        self.buffer = ''
+        self.match: Optional[re.Match] = None
+        # Time spent in regex searches, so parsing and matching can be told apart
+        self.search_seconds = 0.0
+        self._collector = _TextCollector()
+        self._parser = etree.HTMLParser(target=self._collector, encoding=encoding)
+
+    def _search(self, final: bool) -> Optional[re.Match]:
+        self.buffer += ''.join(self._collector.pending)
+        self._collector.pending.clear()
+        start = time.perf_counter()
+        match = self.pattern.search(self.buffer)
+        self.search_seconds += time.perf_counter() - start
+        # A match touching the end of the buffer may still grow (e.g. more digits)
+        if match and (final or match.end() < len(self.buffer)):
+            self.match = match
+            return match
+        if len(self.buffer) > self.window:
+            self.buffer = self.buffer[-self.window:]
+        return None
+
+    def feed(self, chunk: bytes) -> Optional[re.Match]:
+        """
+        Feed the next chunk of the HTML body.
+
+        Returns:
+            Optional[re.Match]: The match once found, otherwise None
+        """
+        if self.match is None:
+            self._parser.feed(chunk)
+            self._search(final=False)
+        return self.match
+
+    def close(self) -> Optional[re.Match]:
+        """Signal the end of the stream and return the final match, if any."""
+        if self.match is None:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            self._search(final=True)
+        return self.match
+
+
+def _xpath_literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise ValueError(f"Attribute value with both quote characters is not supported: {value}")
+
+
+def _css_predicate(match: re.Match) -> str:
+    if match.group('id') is not None:
+        return f"[@id={_xpath_literal(match.group('id'))}]"
+    if match.group('cls') is not None:
+        return f"[contains(concat(' ', normalize-space(@class), ' '), {_xpath_literal(' ' + match.group('cls') + ' ')})]"
+    attr = f"@{match.group('attr')}"
+    op = match.group('op')
+    if op is None:
+        return f"[{attr}]"
+    value = next(v for v in (match.group('dq'), match.group('sq'), match.group('bare')) if v is not None)
+    literal = _xpath_literal(value)
+    if op == '=':
+        return f"[{attr}={literal}]"
+    if op == '~=':
+        return f"[contains(concat(' ', normalize-space({attr}), ' '), {_xpath_literal(' ' + value + ' ')})]"
+    if op == '*=':
+        return f"[contains({attr}, {literal})]"
+    if op == '^=':
+        return f"[starts-with({attr}, {literal})]"
+    return f"[substring({attr}, string-length({attr}) - {len(value) - 1})={literal}]"
+
+
+def css_to_xpath(selector: str) -> str:
+    """
+    Translate a CSS selector to XPath.
+
+    Uses cssselect when it is installed; otherwise a small built-in translator
+    handles the subset described at _CSS_TOKEN.
+
+    Args:
+        selector (str): CSS selector, e.g. "#section-trend-report a"
+
+    Returns:
+        str: An equivalent XPath expression
+
+    Raises:
+        ValueError: If the selector uses syntax outside the supported subset
+    """
+    try:
+        from cssselect import HTMLTranslator, SelectorError
+    except ImportError:
+        pass
+    else:
+        try:
+            return HTMLTranslator().css_to_xpath(selector)
+        except SelectorError as e:
+            raise ValueError(f"Invalid CSS selector {selector!r}: {e}") from e
+
+    groups: List[str] = []
+    path, axis, tag, predicates = '', 'descendant-or-self::', None, []
+    position = 0
+    selector = selector.strip()
+    while True:
+        match = _CSS_TOKEN.match(selector, position) if position < len(selector) else None
+        if position < len(selector) and match is None:
+            raise ValueError(f"Unsupported CSS selector (install cssselect or use XPath): {selector}")
+        kind = match.lastgroup if match else ','
+        if kind in ('tag', 'id', 'cls') or (match and match.group('attr')):
+            if kind == 'tag':
+                if tag is not None or predicates:
+                    raise ValueError(f"Misplaced type selector in: {selector}")
+                tag = match.group('tag')
+            else:
+                predicates.append(_css_predicate(match))
+        else:
+            # A combinator or the end of a group closes the current compound selector
+            if tag is None and not predicates:
+                raise ValueError(f"Empty compound selector in: {selector}")
+            path += axis + (tag or '*') + ''.join(predicates)
+            tag, predicates = None, []
+            combinator = match.group('combinator') if match and kind == 'combinator' else None
+            if match is None or combinator == ',':
+                groups.append(path)
+                path, axis = '', 'descendant-or-self::'
+            else:
+                axis = '/' if combinator == '>' else '/descendant-or-self::*/'
+        if match is None:
+            break
+        position = match.end()
+    return ' | '.join(groups)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_selector(selector: str) -> 'etree.XPath':
+    """
+    Compile a CSS or XPath selector, once per process.
+
+    Args:
+        selector (str): XPath if it starts with "/", "./" or "(", otherwise CSS
+
+    Returns:
+        etree.XPath: The compiled expression
+
+    Raises:
+        ValueError: If the selector is not valid
+    """
+    if etree is None:
+        raise RuntimeError("lxml is required for selector extraction")
+    expression = selector if selector.startswith(XPATH_PREFIXES) else css_to_xpath(selector)
+    try:
+        return etree.XPath(expression)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"Invalid selector {selector!r}: {e}") from e
+
+
+class SelectorMatcher:
+    """
+    Runs a regex over the elements a selector picks out of a streamed HTML body.
+
+    lxml builds the tree incrementally; the selector is evaluated as the body
+    grows (each time its size doubles, and at the end) and the regex only sees
+    the text of selected elements that are complete, in document order. Text
+    outside the selected block is never searched.
+    """
+
+    def __init__(self, selector: str, pattern: Pattern, encoding: Optional[str] = None):
+        self.xpath = compile_selector(selector)
+        self.pattern = pattern
+        self.match: Optional[re.Match] = None
+        self.search_seconds = 0.0
+        self.elements_searched = 0
+        # Only the root's start event is needed; the tree itself is walked with XPath
+        self._parser = etree.HTMLPullParser(events=('start',), tag='html', encoding=encoding)
+        self._root = None
+        self._searched = set()
+        self._fed = 0
+        self._next_scan = 0
+
+    @staticmethod
+    def _is_complete(element) -> bool:
+        # The parser has moved past an element once it or an ancestor has a following sibling
+        while element is not None:
+            if element.getnext() is not None:
+                return True
+            element = element.getparent()
+        return False
+
+    def _scan(self, final: bool) -> Optional[re.Match]:
+        for _, element in self._parser.read_events():
+            self._root = element
+        if self._root is None:
+            return None
+        for result in self.xpath(self._root):
+            if isinstance(result, str):
+                # Text and attribute results are only known to be complete at the end
+                if not final:
+                    return None
+                text = str(result)
+            elif not final and not self._is_complete(result):
+                # Everything after an unfinished element in document order is inside it
+                return None
+            elif result in self._searched:
+                continue
+            else:
+                self._searched.add(result)
+                text = ''.join(result.itertext())
+            self.elements_searched += 1
+            start = time.perf_counter()
+            match = self.pattern.search(text)
+            self.search_seconds += time.perf_counter() - start
+            if match:
+                self.match = match
+                return match
+        return None
+
+    def feed(self, chunk: bytes) -> Optional[re.Match]:
+        """Feed the next chunk of the HTML body; returns the match once found."""
+        if self.match is None:
+            self._parser.feed(chunk)
+            self._fed += len(chunk)
+            if self._fed >= self._next_scan:
+                # Doubling keeps the repeated evaluations linear in the body size
+                self._next_scan = self._fed * 2
+                self._scan(final=False)
+        return self.match
+
+    def close(self) -> Optional[re.Match]:
+        """Signal the end of the stream and return the final match, if any."""
+        if self.match is None:
+            try:
+                self._root = self._parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            self._scan(final=True)
+        return self.match
+
+
+def selector_extract(chunks: Iterable[bytes], selector: str, pattern: Pattern,
+                     encoding: Optional[str] = None,
+                     timings: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """
+    Extract the first capture group of pattern from the elements matched by a selector.
+
+    Stops consuming chunks once a complete selected element matched.
+
+    Args:
+        chunks (Iterable[bytes]): The HTML body, in order
+        selector (str): CSS or XPath selector for the block holding the value
+        pattern (Pattern): Compiled regex whose first group is the wanted value
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+        timings (Optional[Dict[str, float]]): If given, seconds spent in regex searches are added under 'regex'
+
+    Returns:
+        Optional[str]: The extracted value or None if no selected element matched
+    """
+    matcher = SelectorMatcher(selector, pattern, encoding=encoding)
+    try:
+        for chunk in chunks:
+            if matcher.feed(chunk):
+                break
+        match = matcher.close()
+        logging.debug(f"Selector {selector!r} searched {matcher.elements_searched} element(s)")
+        return match.group(1) if match else None
+    finally:
+        if timings is not None:
+            timings['regex'] = timings.get('regex', 0.0) + matcher.search_seconds
+
+
+def iter_chunks(data: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Split an in-memory body into chunks for the streaming matcher."""
+    view = memoryview(data)
+    for offset in range(0, len(data), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+def stream_extract(chunks: Iterable[bytes], pattern: Pattern, encoding: Optional[str] = None,
+                   timings: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """
+    Extract the first capture group of pattern from a stream of HTML chunks.
+
+    Stops consuming chunks as soon as the pattern has matched.
+
+    Args:
+        chunks (Iterable[bytes]): The HTML body, in order
+        pattern (Pattern): Compiled regex whose first group is the wanted value
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+        timings (Optional[Dict[str, float]]): If given, seconds spent in regex searches are added under 'regex'
+
+    Returns:
+        Optional[str]: The extracted value or None if the pattern never matched
+    """
+    matcher = StreamingTextMatcher(pattern, encoding=encoding)
+    try:
+        for chunk in chunks:
+            match = matcher.feed(chunk)
+            if match:
+                logging.debug(f"Streaming extraction matched at text offset {match.start()}")
+                return match.group(1)
+        match = matcher.close()
+        return match.group(1) if match else None
+    finally:
+        if timings is not None:
+            timings['regex'] = timings.get('regex', 0.0) + matcher.search_seconds
+
+
+def soup_extract(content: bytes, pattern: Pattern,
+                 timings: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """Extract the first capture group of pattern from the full BeautifulSoup page text."""
+    from bs4 import BeautifulSoup
+
+    text = BeautifulSoup(content, 'html.parser').get_text()
+    start = time.perf_counter()
+    match = pattern.search(text)
+    if timings is not None:
+        timings['regex'] = timings.get('regex', 0.0) + time.perf_counter() - start
+    return match.group(1) if match else None
+
+
+def extract(content: Union[bytes, Iterable[bytes]], pattern: Pattern, selector: Optional[str] = None,
+            encoding: Optional[str] = None, timings: Optional[Dict[str, float]] = None,
+            reraise: Tuple[Type[Exception], ...] = ()) -> Optional[str]:
+    """
+    Extract the first capture group of pattern with the selector, streaming and BeautifulSoup paths in turn.
+
+    With a selector, only the text of the selected elements is searched. Otherwise,
+    or if no selected element matches, the whole page text is streamed through the
+    pattern, with the full BeautifulSoup page text as the last resort.
+
+    Args:
+        content (Union[bytes, Iterable[bytes]]): The HTML body, or a re-iterable chunk
+            source (e.g. scraper.StreamedBody) that is only read as far as the match
+        pattern (Pattern): Compiled regex whose first group is the wanted value
+        selector (Optional[str]): CSS or XPath selector for the block holding the value, if any
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+        timings (Optional[Dict[str, float]]): If given, seconds spent in regex searches are added under 'regex'
+        reraise (Tuple[Type[Exception], ...]): Errors of the chunk source that must not trigger a fallback
+
+    Returns:
+        Optional[str]: The extracted value or None if the pattern never matched
+    """
+    in_memory = isinstance(content, (bytes, bytearray))
+
+    def chunks() -> Iterable[bytes]:
+        return iter_chunks(content) if in_memory else content
+
+    value = None
+    if selector:
+        try:
+            value = selector_extract(chunks(), selector, pattern, encoding, timings)
+            if value is None:
+                logging.warning(f"Selector {selector!r} matched nothing, searching the whole page")
+        except reraise:
+            raise
+        except Exception as e:
+            logging.warning(f"Selector extraction failed, searching the whole page: {e}")
+    try:
+        if value is None:
+            value = stream_extract(chunks(), pattern, encoding, timings)
+        if value is None:
+            logging.debug("Streaming extraction found no match, falling back to BeautifulSoup")
+    except reraise:
+        raise
+    except Exception as e:
+        logging.warning(f"Streaming extraction failed, falling back to BeautifulSoup: {e}")
+    if value is None:
+        value = soup_extract(content if in_memory else b''.join(content), pattern, timings)
+    return value
@@ -0,0 +1,270 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Statuses recorded for each check
+STATUS_INITIAL = 'initial'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_UPDATED = 'updated'
+STATUS_ERROR = 'error'
+CHANGE_STATUSES = (STATUS_INITIAL, STATUS_UPDATED)
+
+DEFAULT_TARGET = 'pmsv-mir'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    status TEXT NOT NULL,
+    sb_number TEXT,
+    previous_sb TEXT,
+    latency_ms REAL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_checks_target_timestamp ON checks(target, timestamp);
+CREATE INDEX IF NOT EXISTS idx_checks_timestamp ON checks(timestamp);
+CREATE INDEX IF NOT EXISTS idx_checks_changes ON checks(target, timestamp)
+    WHERE status IN ('initial', 'updated');
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    url TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    status TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_length INTEGER,
+    sha256 TEXT,
+    bytes_read INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_documents_target_url_timestamp ON documents(target, url, timestamp);
+"""
+
+_COLUMNS = "id, target, timestamp, status, sb_number, previous_sb, latency_ms, content_hash"
+_DOCUMENT_COLUMNS = "id, target, url, timestamp, status, etag, last_modified, content_length, sha256, bytes_read"
+
+
+class HistoryStore:
+    """
+    Append-only SQLite log of every check.
+
+    Rows are never updated or deleted. Lookups go through the (target, timestamp)
+    index, and a partial index over change rows keeps "changes in a time range"
+    independent of how many unchanged checks have been recorded.
+    """
+
+    def __init__(self, db_path: str = 'sb_history.db'):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL lets the dashboard read while the monitor appends
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_check(self, target: str, status: str, sb_number: Optional[str] = None,
+                     previous_sb: Optional[str] = None, latency_ms: Optional[float] = None,
+                     content_hash: Optional[str] = None, timestamp: Optional[float] = None) -> int:
+        """
+        Append one check to the log.
+
+        Args:
+            target (str): Name of the monitored target
+            status (str): One of initial, unchanged, updated or error
+            sb_number (Optional[str]): Value found by the check
+            previous_sb (Optional[str]): Value known before the check
+            latency_ms (Optional[float]): Duration of the check in milliseconds
+            content_hash (Optional[str]): Hash of the page body the value came from
+            timestamp (Optional[float]): Unix time of the check, defaults to now
+
+        Returns:
+            int: The row id of the new record
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO checks (target, timestamp, status, sb_number, previous_sb, latency_ms, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (target, timestamp if timestamp is not None else time.time(), status,
+                 sb_number, previous_sb, latency_ms, content_hash)
+            )
+            return cursor.lastrowid
+
+    def latest(self, target: str = DEFAULT_TARGET) -> Optional[Dict]:
+        """Return the most recent check for a target, whatever its status."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM checks WHERE target = ? ORDER BY timestamp DESC LIMIT 1",
+                (target,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest_value(self, target: str = DEFAULT_TARGET) -> Optional[str]:
+        """Return the most recently observed SB number for a target."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sb_number FROM checks WHERE target = ? AND sb_number IS NOT NULL "
+                "ORDER BY timestamp DESC LIMIT 1",
+                (target,)
+            ).fetchone()
+        return row['sb_number'] if row else None
+
+    def changes(self, target: str = DEFAULT_TARGET, start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Dict]:
+        """
+        Return the initial and updated checks of a target, oldest first.
+
+        Args:
+            target (str): Name of the monitored target
+            start (Optional[float]): Inclusive lower bound as unix time
+            end (Optional[float]): Inclusive upper bound as unix time
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM checks "
+                "WHERE target = ? AND status IN ('initial', 'updated') AND timestamp BETWEEN ? AND ? "
+                "ORDER BY timestamp",
+                (target, start if start is not None else float('-inf'),
+                 end if end is not None else float('inf'))
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def changes_since(self, target: str = DEFAULT_TARGET, after_id: int = 0) -> List[Dict]:
+        """
+        Return the initial and updated checks of a target recorded after a given row, oldest first.
+
+        Args:
+            target (str): Name of the monitored target
+            after_id (int): Row id of the last change already seen
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM checks "
+                "WHERE target = ? AND status IN ('initial', 'updated') AND id > ? ORDER BY id",
+                (target, after_id)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def data_version(self) -> float:
+        """
+        Return the latest modification time of the database and its WAL file.
+
+        Writes in WAL mode land in the -wal file until a checkpoint, so both
+        are needed to notice new rows without querying.
+        """
+        mtimes = [os.path.getmtime(path) for path in (self.db_path, f"{self.db_path}-wal") if os.path.exists(path)]
+        return max(mtimes, default=0.0)
+
+    def checks(self, target: str = DEFAULT_TARGET, start: Optional[float] = None,
+               end: Optional[float] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Return the checks of a target in a time range, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM checks WHERE target = ? AND timestamp BETWEEN ? AND ? "
+                "ORDER BY timestamp DESC LIMIT ?",
+                (target, start if start is not None else float('-inf'),
+                 end if end is not None else float('inf'), limit if limit is not None else -1)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def record_document(self, target: str, url: str, status: str, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None, content_length: Optional[int] = None,
+                        sha256: Optional[str] = None, bytes_read: int = 0,
+                        timestamp: Optional[float] = None) -> int:
+        """
+        Append one check of a linked document (e.g. a PDF form) to the log.
+
+        Args:
+            target (str): Name of the monitored target linking to the document
+            url (str): URL of the document
+            status (str): One of initial, unchanged, updated or error
+            etag (Optional[str]): ETag response header
+            last_modified (Optional[str]): Last-Modified response header
+            content_length (Optional[int]): Size of the document as reported by the server
+            sha256 (Optional[str]): SHA-256 hex digest of the document
+            bytes_read (int): Bytes downloaded by this check; 0 if the validators were unchanged
+            timestamp (Optional[float]): Unix time of the check, defaults to now
+
+        Returns:
+            int: The row id of the new record
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO documents (target, url, timestamp, status, etag, last_modified, content_length, "
+                "sha256, bytes_read) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (target, url, timestamp if timestamp is not None else time.time(), status,
+                 etag, last_modified, content_length, sha256, bytes_read)
+            )
+            return cursor.lastrowid
+
+    def latest_document(self, target: str, url: str) -> Optional[Dict]:
+        """Return the most recent successful check of a linked document."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_DOCUMENT_COLUMNS} FROM documents WHERE target = ? AND url = ? AND sha256 IS NOT NULL "
+                "ORDER BY timestamp DESC LIMIT 1",
+                (target, url)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def document_changes(self, target: str = DEFAULT_TARGET, url: Optional[str] = None) -> List[Dict]:
+        """Return the initial and updated checks of a target's linked documents, oldest first."""
+        query = (f"SELECT {_DOCUMENT_COLUMNS} FROM documents "
+                 "WHERE target = ? AND status IN ('initial', 'updated')")
+        params: tuple = (target,)
+        if url is not None:
+            query += " AND url = ?"
+            params += (url,)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY timestamp", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def targets(self) -> List[str]:
+        """Return the names of all targets with recorded checks."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT target FROM checks ORDER BY target").fetchall()
+        return [row['target'] for row in rows]
+
+
+class ChangeFeed:
+    """
+    In-memory copy of one target's change rows, kept current incrementally.
+
+    refresh() only fetches rows added since the last seen row id, so its
+    cost does not grow with the size of the history.
+    """
+
+    def __init__(self, store: HistoryStore, target: str = DEFAULT_TARGET):
+        self.store = store
+        self.target = target
+        self.rows: List[Dict] = []
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> List[Dict]:
+        """
+        Fetch new change rows.
+
+        Returns:
+            List[Dict]: The rows added by this refresh, oldest first
+        """
+        with self._lock:
+            new_rows = self.store.changes_since(self.target, self.last_id)
+            if new_rows:
+                self.rows.extend(new_rows)
+                self.last_id = new_rows[-1]['id']
+            return new_rows
@@ -0,0 +1,232 @@
+import http.client
+import importlib.util
+import time
+import zlib
+from datetime import timedelta
+from typing import Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# (connect, read) seconds, like requests; transport.TransportConfig has the same defaults
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+CHUNK_SIZE = 16 * 1024
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class LiteHTTPError(OSError):
+    """HTTP error status or failed request; an OSError like requests' own exceptions."""
+
+    def __init__(self, message: str, response: Optional['LiteResponse'] = None):
+        super().__init__(message)
+        self.response = response
+
+
+def accept_encoding() -> str:
+    """Content codings this client can decode; brotli only if the brotli package is installed."""
+    if importlib.util.find_spec('brotli') is not None:
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+class _Decoder:
+    """Incremental decoder for a Content-Encoding."""
+
+    def __init__(self, content_encoding: str):
+        self.encoding = content_encoding.strip().lower()
+        if self.encoding in ('gzip', 'x-gzip'):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == 'deflate':
+            self._decompressor = zlib.decompressobj()
+            self._first = True
+        elif self.encoding == 'br':
+            import brotli
+
+            self._decompressor = brotli.Decompressor()
+        else:
+            self._decompressor = None
+
+    def decode(self, data: bytes) -> bytes:
+        if self._decompressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._decompressor.process(data)
+        if self.encoding == 'deflate' and self._first:
+            self._first = False
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        if self._decompressor is None or self.encoding == 'br':
+            return b''
+        return self._decompressor.flush()
+
+
+class _RawBody:
+    """The undecoded body stream; tell() counts bytes received, like urllib3's HTTPResponse."""
+
+    def __init__(self, response: http.client.HTTPResponse):
+        self._response = response
+        self._bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._response.read(size) if size > 0 else self._response.read()
+        self._bytes_read += len(data)
+        return data
+
+    def tell(self) -> int:
+        return self._bytes_read
+
+
+class LiteResponse:
+    """
+    The part of requests.Response that PMSVScraper uses.
+
+    headers is the http.client message object, whose get() is case-insensitive.
+    The body is read on first access to content or through iter_content, which
+    decodes it chunk by chunk.
+    """
+
+    def __init__(self, url: str, response: http.client.HTTPResponse,
+                 connection: http.client.HTTPConnection, elapsed: float):
+        self.url = url
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self.elapsed = timedelta(seconds=elapsed)
+        self.encoding = self.headers.get_content_charset()
+        self.raw = _RawBody(response)
+        self._connection = connection
+        self._content: Optional[bytes] = None
+
+    def iter_content(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the decoded body; the connection is closed once it has been read."""
+        if self._content is not None:
+            for offset in range(0, len(self._content), chunk_size):
+                yield self._content[offset:offset + chunk_size]
+            return
+        decoder = _Decoder(self.headers.get('Content-Encoding', ''))
+        try:
+            while True:
+                data = self.raw.read(chunk_size)
+                if not data:
+                    break
+                decoded = decoder.decode(data)
+                if decoded:
+                    yield decoded
+            tail = decoder.flush()
+            if tail:
+                yield tail
+        finally:
+            self.close()
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise LiteHTTPError(f"{self.status_code} {self.reason} for url: {self.url}", self)
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class LiteSession:
+    """
+    Minimal GET/HEAD HTTP client on top of http.client, for one-shot checks.
+
+    Importing requests takes longer than a whole conditional check, so the
+    `pmsv check --once` path uses this instead. It follows redirects and
+    decodes gzip/deflate (and brotli, if installed) bodies, but opens a new
+    connection per request and ignores proxy settings; long-running monitors
+    keep using requests.
+
+    Args:
+        headers (Optional[Dict[str, str]]): Headers sent with every request
+        max_redirects (int): Redirects to follow before giving up
+        timeout (Timeout): Default timeout, in seconds or as (connect, read)
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_redirects: int = 5,
+                 timeout: Timeout = DEFAULT_TIMEOUT):
+        self.headers = {
+            'Accept': '*/*',
+            'Accept-Encoding': accept_encoding(),
+            'Connection': 'close',
+        }
+        self.headers.update(headers or {})
+        self.max_redirects = max_redirects
+        self.timeout = timeout
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[Timeout] = None, stream: bool = False) -> LiteResponse:
+        """Send a GET request, see request()."""
+        return self.request('GET', url, headers=headers, timeout=timeout, stream=stream)
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None,
+             timeout: Optional[Timeout] = None) -> LiteResponse:
+        """Send a HEAD request, see request()."""
+        return self.request('HEAD', url, headers=headers, timeout=timeout)
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[Timeout] = None, stream: bool = False) -> LiteResponse:
+        """
+        Fetch a URL.
+
+        Args:
+            method (str): GET or HEAD
+            url (str): http or https URL
+            headers (Optional[Dict[str, str]]): Extra headers for this request
+            timeout (Optional[Timeout]): Seconds or (connect, read) seconds; the session default if None
+            stream (bool): Leave the body unread until content or iter_content is used
+
+        Returns:
+            LiteResponse: The final response after redirects
+        """
+        request_headers = {**self.headers, **(headers or {})}
+        timeout = self.timeout if timeout is None else timeout
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        start = time.perf_counter()
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            if parts.scheme == 'https':
+                connection = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=connect_timeout)
+            elif parts.scheme == 'http':
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=connect_timeout)
+            else:
+                raise LiteHTTPError(f"Unsupported URL scheme: {url}")
+            path = parts.path or '/'
+            if parts.query:
+                path = f"{path}?{parts.query}"
+            try:
+                connection.connect()
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, path, headers=request_headers)
+                response = connection.getresponse()
+            except BaseException:
+                connection.close()
+                raise
+            # Like requests, elapsed stops once the response headers are parsed
+            result = LiteResponse(url, response, connection, time.perf_counter() - start)
+
+            location = response.getheader('Location')
+            if response.status in REDIRECT_CODES and location:
+                result.close()
+                url = urljoin(url, location)
+                continue
+            if not stream:
+                result.content
+            return result
+        raise LiteHTTPError(f"Exceeded {self.max_redirects} redirects: {url}")
+
+    def close(self) -> None:
+        """Connections are closed with their response; kept for requests.Session compatibility."""
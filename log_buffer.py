@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional
+
+# Level used by the dashboards for successful scrapes, between INFO and WARNING
+SUCCESS = 25
+logging.addLevelName(SUCCESS, 'SUCCESS')
+
+DEFAULT_CAPACITY = 1000
+DEFAULT_FORMAT = '[%(asctime)s] %(levelname)s: %(message)s'
+
+
+def level_number(level: str) -> int:
+    """Map a level name such as "INFO" or "SUCCESS" to its number (unknown names map to INFO)."""
+    number = logging.getLevelName(level.upper())
+    return number if isinstance(number, int) else logging.INFO
+
+
+class LogEntry(NamedTuple):
+    seq: int
+    level: str
+    line: str
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the most recent log records in memory for display in the dashboards.
+
+    Records are formatted once when emitted and stored in a fixed-size deque,
+    so appends are O(1) and old entries fall off the end. Every entry gets a
+    sequence number; readers keep the last number they saw and ask only for
+    newer entries.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.setFormatter(logging.Formatter(DEFAULT_FORMAT, '%H:%M:%S'))
+        self._entries: Deque[LogEntry] = deque(maxlen=capacity)
+        self._seq = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # handle() already holds the (reentrant) lock; emit() may also be called directly
+        with self.lock:
+            self._seq += 1
+            self._entries.append(LogEntry(self._seq, record.levelname, line))
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest entry (0 if nothing was logged yet)."""
+        return self._seq
+
+    def entries_since(self, seq: int = 0) -> List[LogEntry]:
+        """
+        Return the entries newer than a sequence number, oldest first.
+
+        Args:
+            seq (int): Last sequence number the caller has seen
+
+        Returns:
+            List[LogEntry]: Newer entries still in the buffer
+        """
+        newer = []
+        with self.lock:
+            # Walk back from the newest entry, so the cost is proportional to the new entries
+            for entry in reversed(self._entries):
+                if entry.seq <= seq:
+                    break
+                newer.append(entry)
+        newer.reverse()
+        return newer
+
+
+class LogTail:
+    """
+    Follows a RingBufferHandler for one viewer.
+
+    Keeps the last max_lines lines and their joined text; the text is only
+    rebuilt when poll() picked up new entries.
+    """
+
+    def __init__(self, handler: RingBufferHandler, max_lines: int = 100):
+        self.handler = handler
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.cursor = 0
+        self._text: Optional[str] = ''
+
+    def poll(self) -> List[str]:
+        """Fetch entries logged since the last poll and return their lines."""
+        entries = self.handler.entries_since(self.cursor)
+        if entries:
+            self.lines.extend(entry.line for entry in entries)
+            self.cursor = entries[-1].seq
+            self._text = None
+        return [entry.line for entry in entries]
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.lines)
+        return self._text
+
+    def clear(self) -> None:
+        """Hide everything logged so far from this viewer."""
+        self.cursor = self.handler.last_seq
+        self.lines.clear()
+        self._text = ''
+
+
+_install_lock = threading.Lock()
+
+
+def install_ring_buffer(capacity: int = DEFAULT_CAPACITY, logger: Optional[logging.Logger] = None) -> RingBufferHandler:
+    """
+    Attach a RingBufferHandler to a logger (the root logger by default), once per process.
+
+    Returns:
+        RingBufferHandler: The handler that is attached, new or existing
+    """
+    logger = logger or logging.getLogger()
+    with _install_lock:
+        for handler in logger.handlers:
+            if isinstance(handler, RingBufferHandler):
+                return handler
+        handler = RingBufferHandler(capacity)
+        logger.addHandler(handler)
+        return handler
@@ -1,10 +1,16 @@
-import schedule
 import time
 import os
 import logging
 from dotenv import load_dotenv
 from scraper import PMSVScraper
 from email_notifier import EmailNotifier
+from monitor_engine import AsyncMonitorEngine
+from notification_queue import NotificationDispatcher
+from notification_coalescer import NotificationCoalescer
+from scheduler import Job, Scheduler
+from adaptive_polling import AdaptiveTrigger, load_change_times, load_timezone
+from metrics import MetricsServer
+from coordination import create_coordinator
 
 # Load environment variables
 load_dotenv()
@@ -21,53 +27,270 @@ logging.basicConfig(
 
 class PMSVMonitor:
     def __init__(self):
-        self.scraper = PMSVScraper()
+        # none | fsync | journal, see state_store.py
+        state_durability = os.getenv('STATE_DURABILITY', 'fsync')
+        self.scraper = PMSVScraper(state_durability=state_durability)
         self.email_notifier = EmailNotifier()
+        # Notifications are spooled and delivered in the background so a slow
+        # SMTP server never delays a check
+        self.notifications = NotificationDispatcher(
+            self.email_notifier,
+            spool_dir=os.getenv('NOTIFY_SPOOL_DIR', 'notification_spool'),
+            maxsize=int(os.getenv('NOTIFY_QUEUE_SIZE', '100')),
+            max_retries=int(os.getenv('NOTIFY_MAX_RETRIES', '5'))
+        )
+        self.notifications.start()
+        # Repeated errors are deduplicated, rate limited and rolled into digests
+        self.alerts = NotificationCoalescer(
+            self.notifications,
+            recipient=self.email_notifier.recipient_email,
+            dedup_window=self.email_notifier.dedup_window_minutes * 60,
+            rate_limit_per_hour=self.email_notifier.rate_limit_per_hour,
+            digest_interval=self.email_notifier.digest_interval_minutes * 60
+        )
         self.check_interval_hours = int(os.getenv('CHECK_INTERVAL_HOURS', '24'))
+        # CHECK_INTERVAL_SECONDS allows sub-hour polling; CHECK_CRON takes precedence over both
+        self.check_interval_seconds = float(os.getenv('CHECK_INTERVAL_SECONDS', self.check_interval_hours * 3600))
+        self.check_cron = os.getenv('CHECK_CRON')
+        self.check_jitter_seconds = float(os.getenv('CHECK_JITTER_SECONDS', '0'))
+        # Adaptive polling derives the interval from past change times
+        self.adaptive_polling = os.getenv('ADAPTIVE_POLLING', 'false').lower() in ('1', 'true', 'yes')
+        self.adaptive_trigger = None
+        if self.adaptive_polling:
+            self.adaptive_trigger = AdaptiveTrigger(
+                self.load_change_times,
+                min_interval=float(os.getenv('ADAPTIVE_MIN_INTERVAL_MINUTES', '15')) * 60,
+                max_interval=float(os.getenv('ADAPTIVE_MAX_INTERVAL_HOURS', '24')) * 3600,
+                base_interval=float(os.getenv('ADAPTIVE_BASE_INTERVAL_HOURS', '6')) * 3600,
+                tz=load_timezone(os.getenv('ADAPTIVE_TIMEZONE', 'Europe/Brussels'))
+            )
+        self.scheduler = Scheduler()
+        
+        # /metrics and /healthz; METRICS_PORT=0 disables the server
+        self.metrics_port = int(os.getenv('METRICS_PORT', '8080'))
+        self.metrics_server = None
+        self.started_at = time.time()
+        self.last_run_time = None
+        self.last_success_time = None
+        
+        # With several replicas, only the owner of a target checks it and sends its alerts
+        self.coordinator = create_coordinator()
+        
+        # Optional multi-target mode: a JSON file of {name, url, pattern} targets
+        targets_file = os.getenv('TARGETS_FILE')
+        self.engine = None
+        if targets_file:
+            self.engine = AsyncMonitorEngine.from_config(
+                targets_file,
+                data_dir=os.getenv('DATA_DIR', 'data'),
+                max_per_host=int(os.getenv('MAX_REQUESTS_PER_HOST', '4')),
+                max_concurrency=int(os.getenv('MAX_CONCURRENT_CHECKS', '16')),
+                state_durability=state_durability,
+                parse_workers=int(os.getenv('PARSE_WORKERS', '0'))
+            )
 
     def run_check(self):
         """Run a single check for SB number updates."""
+        start = time.perf_counter()
+        if self.engine is not None:
+            self.run_targets_check()
+        else:
+            self.run_single_check()
+        self.alerts.flush_digest_if_due()
+        self.last_run_time = time.time()
+        logging.info(f"Check completed in {time.perf_counter() - start:.2f}s "
+                     f"({self.notifications.pending} notification(s) pending)")
+
+    def run_single_check(self):
+        """Check the PMSV page for SB number updates."""
         try:
+            if self.coordinator is not None and not self.coordinator.owns(self.scraper.target_name):
+                logging.info(f"{self.scraper.target_name} is checked by another replica, skipping")
+                # A standby replica is healthy; /healthz must not restart it
+                self.last_success_time = time.time()
+                return
             logging.info("Starting PMSV SB number check...")
             
             updated, current, previous = self.scraper.check_for_updates()
+            if current is not None:
+                self.last_success_time = time.time()
+            # With TRACK_PAGE_CHANGES / TRACK_DOCUMENTS, what else changed on the page and in its PDFs
+            change_summary = getattr(self.scraper, 'change_summary', None)
+            changes = change_summary() if change_summary else None
+            # Only passed when there is something to report, so older spool entries and notifiers still match
+            change_kwargs = {'changes': changes} if changes else {}
             
             if updated and previous is not None:
                 logging.info(f"SB number updated! Previous: {previous}, Current: {current}")
                 
-                # Send email notification
-                if self.email_notifier.send_notification(previous, current):
-                    logging.info("Email notification sent successfully")
+                # Queue email notification
+                if self.alerts.send_notification(previous, current, **change_kwargs):
+                    logging.info("Email notification queued")
                 else:
                     logging.warning("Failed to send email notification")
+            elif changes:
+                logging.info(f"SB number unchanged ({current}), but {len(changes)} page change(s) found")
+                if not self.alerts.send_page_change_notification(changes):
+                    logging.warning("Failed to send page change notification")
             elif current is not None:
                 logging.info(f"SB number unchanged: {current}")
             else:
                 logging.error("Could not retrieve current SB number")
-                self.email_notifier.send_error_notification("Failed to retrieve current SB number from webpage")
+                self.alerts.send_error_notification("Failed to retrieve current SB number from webpage")
                 
         except Exception as e:
             error_msg = f"Error during PMSV check: {str(e)}"
             logging.error(error_msg)
-            self.email_notifier.send_error_notification(error_msg)
+            self.alerts.send_error_notification(error_msg)
+
+    def run_targets_check(self):
+        """Check all configured targets concurrently and notify about each change."""
+        try:
+            names = None
+            if self.coordinator is not None:
+                names = self.coordinator.owned([target.name for target in self.engine.targets])
+                logging.info(f"This replica owns {len(names)} of {len(self.engine.targets)} targets")
+                if not names:
+                    self.last_success_time = time.time()
+                    return
+            logging.info(f"Starting check of {len(names) if names is not None else len(self.engine.targets)} targets...")
+            
+            results = self.engine.run_check(names)
+            if any(result.current is not None for result in results):
+                self.last_success_time = time.time()
+            self._notify_target_results(results)
+                    
+        except Exception as e:
+            error_msg = f"Error during multi-target check: {str(e)}"
+            logging.error(error_msg)
+            self.alerts.send_error_notification(error_msg)
+
+    def _notify_target_results(self, results):
+        """Send change and error notifications for the results of a multi-target check."""
+        for result in results:
+            name = result.target.name
+            if result.updated and result.previous is not None:
+                logging.info(f"[{name}] Value updated! Previous: {result.previous}, Current: {result.current}")
+                if self.alerts.send_notification(result.previous, result.current,
+                                                 target_name=name, url=result.target.url,
+                                                 **({'changes': result.changes} if result.changes else {})):
+                    logging.info(f"[{name}] Email notification queued")
+                else:
+                    logging.warning(f"[{name}] Failed to send email notification")
+            elif result.changes:
+                logging.info(f"[{name}] {len(result.changes)} page change(s) found")
+                if not self.alerts.send_page_change_notification(result.changes, target_name=name,
+                                                                 url=result.target.url):
+                    logging.warning(f"[{name}] Failed to send page change notification")
+            elif result.current is None:
+                logging.error(f"[{name}] {result.error}")
+                self.alerts.send_error_notification(f"[{name}] {result.error} ({result.target.url})")
+
+    def expected_check_interval(self):
+        """Longest expected gap between two checks, in seconds."""
+        if self.adaptive_trigger is not None:
+            return self.adaptive_trigger.policy_options['max_interval']
+        if self.check_cron:
+            return 24 * 3600
+        return self.check_interval_seconds
+
+    def health(self):
+        """
+        Report whether checks are still succeeding, for /healthz.
+        
+        Returns:
+            Tuple[bool, dict]: Healthy flag and details for the response body
+        """
+        now = time.time()
+        max_age = float(os.getenv('HEALTH_MAX_CHECK_AGE_SECONDS', 3 * self.expected_check_interval()))
+        last_good = self.last_success_time or self.started_at
+        details = {
+            'last_check': self.last_run_time,
+            'last_success': self.last_success_time,
+            'max_check_age_seconds': max_age,
+            'pending_notifications': self.notifications.pending
+        }
+        if self.coordinator is not None:
+            details['replica'] = self.coordinator.member_id
+            details['leases'] = sorted(self.coordinator.held)
+        source = self.engine if self.engine is not None else self.scraper
+        parse_cache = getattr(source, 'parse_cache', None)
+        if parse_cache is not None:
+            details['parse_cache'] = parse_cache.stats()
+        return now - last_good <= max_age, details
+
+    def start_metrics_server(self):
+        """Serve /metrics and /healthz in the background, if enabled."""
+        if self.metrics_port <= 0:
+            return
+        try:
+            self.metrics_server = MetricsServer(os.getenv('METRICS_HOST', '0.0.0.0'), self.metrics_port,
+                                                health_check=self.health)
+            self.metrics_server.start()
+        except OSError as e:
+            logging.error(f"Could not start metrics server on port {self.metrics_port}: {e}")
+
+    def shutdown(self):
+        """Stop scheduling, background notification delivery and the SMTP session."""
+        self.scheduler.stop()
+        if self.engine is not None:
+            # Also stops the parse worker processes
+            self.engine.close()
+        if self.coordinator is not None:
+            self.coordinator.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.alerts.flush_digest()
+        self.notifications.stop()
+        self.email_notifier.close()
+
+    def load_change_times(self):
+        """Return the estimated unix times of all recorded SB number updates."""
+        if self.engine is not None:
+            return load_change_times(self.engine.history, [target.name for target in self.engine.targets])
+        return load_change_times(self.scraper.history, [self.scraper.target_name])
+
+    def schedule_checks(self):
+        """Register the periodic check with the scheduler."""
+        if self.adaptive_trigger is not None:
+            job = self.scheduler.add_job(Job(self.run_check, self.adaptive_trigger, name='pmsv-check',
+                                             jitter=self.check_jitter_seconds))
+            policy = self.adaptive_trigger.last_policy
+            logging.info(f"Adaptive polling: predicted change probability in the next 24h: "
+                         f"{policy.change_probability(time.time()):.1%}")
+            return job
+        if self.check_cron:
+            return self.scheduler.cron(self.check_cron, self.run_check, name='pmsv-check',
+                                       jitter=self.check_jitter_seconds)
+        return self.scheduler.every(self.check_interval_seconds, self.run_check, name='pmsv-check',
+                                    jitter=self.check_jitter_seconds)
 
     def start_monitoring(self):
         """Start the scheduled monitoring."""
-        logging.info(f"Starting PMSV monitoring service. Check interval: {self.check_interval_hours} hours")
+        if self.adaptive_polling:
+            schedule = "adaptive"
+        else:
+            schedule = self.check_cron or f"every {self.check_interval_seconds:g} seconds"
+        logging.info(f"Starting PMSV monitoring service. Check schedule: {schedule}")
+        self.start_metrics_server()
+        if self.coordinator is not None:
+            self.coordinator.start()
         
-        # Schedule the check to run every specified hours
-        schedule.every(self.check_interval_hours).hours.do(self.run_check)
+        job = self.schedule_checks()
         
         # Run initial check
-        self.run_check()
+        job.running = True
+        try:
+            self.run_check()
+        finally:
+            job.running = False
         
-        # Keep the service running
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute for scheduled tasks
+        # Sleeps until the next check is due; overlapping runs are skipped
+        self.scheduler.run_forever()
 
 def main():
     """Main entry point for the application."""
+    monitor = None
     try:
         monitor = PMSVMonitor()
         monitor.start_monitoring()
@@ -76,6 +299,9 @@ def main():
     except Exception as e:
         logging.error(f"Fatal error in PMSV monitoring service: {e}")
         raise
+    finally:
+        if monitor is not None:
+            monitor.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,291 @@
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 8 * 1024, 32 * 1024, 64 * 1024, 128 * 1024, 256 * 1024, 512 * 1024,
+                1024 * 1024, 4 * 1024 * 1024)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. a timestamp of the last success."""
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, as Prometheus expects.
+
+    Each observation is one bisect and a few additions under a lock, cheap
+    enough for every request and parse.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional['Registry'] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)], sum, count
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time spent inside the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    labels = _label_text(self.labelnames, key, ('le', _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Scraper hot path. Phases of scrape_webpage: connect (DNS, TCP/TLS connect and
+# time to response headers), download (body), hash, parse and regex.
+SCRAPE_PHASE_SECONDS = Histogram(
+    'pmsv_scrape_phase_seconds', 'Time spent in each phase of a page scrape.', ('target', 'phase'))
+RESPONSE_BYTES = Histogram(
+    'pmsv_response_bytes', 'Decoded page bytes read per fetch.', ('target',), buckets=SIZE_BUCKETS)
+RESPONSE_WIRE_BYTES = Counter(
+    'pmsv_response_wire_bytes_total', 'Page bytes received, before content decoding (compressed).', ('target',))
+RESPONSE_DECODED_BYTES = Counter(
+    'pmsv_response_decoded_bytes_total', 'Page bytes read after content decoding.', ('target',))
+HTTP_RESPONSES = Counter(
+    'pmsv_http_responses_total', 'HTTP responses received, by status code.', ('target', 'code'))
+FETCH_ERRORS = Counter(
+    'pmsv_fetch_errors_total', 'Scrapes that failed before a value could be extracted.', ('target',))
+CHECK_SECONDS = Histogram(
+    'pmsv_check_seconds', 'Duration of check_for_updates, by outcome.', ('target', 'status'))
+PARSE_QUEUE_SECONDS = Histogram(
+    'pmsv_parse_queue_seconds', 'Time a fetched body waited for a free parse worker slot.', ('target',))
+PARSE_CACHE_LOOKUPS = Counter(
+    'pmsv_parse_cache_lookups_total', 'Parse cache lookups of fetched page bodies: memory_hit, disk_hit or miss.',
+    ('target', 'result'))
+LAST_CHECK = Gauge(
+    'pmsv_last_check_timestamp_seconds', 'Unix time of the last check, by outcome.', ('target', 'status'))
+HTTP_RETRIES = Counter(
+    'pmsv_http_retries_total', 'Requests retried after a connection error or retryable status.', ('host',))
+CIRCUIT_STATE = Gauge(
+    'pmsv_circuit_state', 'Circuit breaker state per host: 0 closed, 1 open, 2 half-open.', ('host',))
+COORDINATION_LEASES = Gauge(
+    'pmsv_coordination_leases', 'Target leases held by this replica.', ('member',))
+DOCUMENT_CHECKS = Counter(
+    'pmsv_document_checks_total', 'Linked document checks, by outcome and whether the body was downloaded.',
+    ('target', 'status', 'downloaded'))
+DOCUMENT_BYTES = Counter(
+    'pmsv_document_bytes_total', 'Linked document bytes downloaded for hashing.', ('target',))
+
+# Notifications
+EMAIL_SEND_SECONDS = Histogram(
+    'pmsv_email_send_seconds', 'Time to hand a notification to the SMTP server.', ('kind', 'result'))
+
+
+class MetricsServer:
+    """
+    Serves /metrics (Prometheus text format) and /healthz on a background thread.
+
+    health_check returns (healthy, details); /healthz answers 200 or 503 with
+    the details as JSON.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8080, registry: Optional[Registry] = None,
+                 health_check: Optional[Callable[[], Tuple[bool, Dict]]] = None):
+        # http.server pulls in the email package; one-shot checks never serve metrics
+        from http.server import ThreadingHTTPServer
+
+        self.registry = registry if registry is not None else REGISTRY
+        self.health_check = health_check or (lambda: (True, {}))
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    status, content_type, body = 200, CONTENT_TYPE, server.registry.render().encode()
+                elif self.path == '/healthz':
+                    try:
+                        healthy, details = server.health_check()
+                    except Exception as e:
+                        healthy, details = False, {'error': str(e)}
+                    details['status'] = 'ok' if healthy else 'unhealthy'
+                    status, content_type = (200 if healthy else 503), 'application/json'
+                    body = json.dumps(details).encode()
+                else:
+                    status, content_type, body = 404, 'text/plain', b'Not found\n'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes every few seconds would flood the monitor log
+                logging.debug(f"Metrics server: {format % args}")
+
+        return Handler
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        logging.info(f"Serving /metrics and /healthz on port {self.port}")
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(5)
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from extraction import compile_selector
+from history_store import HistoryStore
+from parse_cache import create_parse_cache
+from scraper import MIR_PATTERN, MIR_SELECTOR, USER_AGENT, PMSVScraper
+from snapshot_archive import create_snapshot_archive
+from state_store import DURABILITY_FSYNC
+from transport import TransportConfig, create_session
+
+# Target names become state file names in data_dir, so they must not contain path separators
+TARGET_NAME_PATTERN = re.compile(r'[A-Za-z0-9_.-]+')
+
+
+@dataclass
+class MonitorTarget:
+    """A page to monitor, the regex whose first group is the tracked value and the block it is searched in."""
+    name: str
+    url: str
+    pattern: str = MIR_PATTERN
+    selector: Optional[str] = MIR_SELECTOR
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+
+@dataclass
+class TargetResult:
+    """Outcome of checking a single target."""
+    target: MonitorTarget
+    updated: bool
+    current: Optional[str]
+    previous: Optional[str]
+    duration: float
+    error: Optional[str] = None
+    # Other changes on the page and in its documents, with TRACK_PAGE_CHANGES / TRACK_DOCUMENTS
+    changes: Optional[List[str]] = None
+
+
+def load_targets(config_file: str) -> List[MonitorTarget]:
+    """
+    Load monitoring targets from a JSON config file.
+
+    The file holds either a list of targets or an object with a "targets" list;
+    each target needs "name" and "url" and may override "pattern" and set a CSS or
+    XPath "selector" (targets using the default pattern get the MIR section selector).
+    Names may only contain letters, digits, "_", "." and "-".
+
+    Args:
+        config_file (str): Path to the JSON config file
+
+    Returns:
+        List[MonitorTarget]: The configured targets
+
+    Raises:
+        ValueError: On invalid or duplicate target names or an invalid selector
+    """
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+    entries = config.get('targets', []) if isinstance(config, dict) else config
+
+    targets = []
+    names = set()
+    for entry in entries:
+        target = MonitorTarget(
+            name=entry['name'],
+            url=entry['url'],
+            pattern=entry.get('pattern', MIR_PATTERN),
+            selector=entry.get('selector', None if 'pattern' in entry else MIR_SELECTOR)
+        )
+        name = target.name
+        if not isinstance(name, str) or not TARGET_NAME_PATTERN.fullmatch(name) or name in ('.', '..'):
+            raise ValueError(f"Invalid target name in {config_file}: {name!r} "
+                             f"(use letters, digits, '_', '.' and '-')")
+        if target.selector:
+            # Compiled (and cached) now, so a bad selector fails at startup
+            compile_selector(target.selector)
+        if target.name in names:
+            raise ValueError(f"Duplicate target name in {config_file}: {target.name}")
+        names.add(target.name)
+        targets.append(target)
+    return targets
+
+
+class AsyncMonitorEngine:
+    """
+    Checks many targets concurrently from a single process.
+
+    All targets share one requests.Session (and therefore one connection pool,
+    with retries and a circuit breaker per host, see transport.py).
+    Blocking checks run on a dedicated thread pool driven by asyncio, bounded by a
+    global concurrency limit and a per-host limit so a single site is never hammered.
+    With parse_workers, those threads only fetch: the page bodies are parsed by a
+    shared process pool (see parse_pool.py), so parsing many large pages scales
+    with the CPU count instead of serializing on the GIL.
+    """
+
+    def __init__(self, targets: List[MonitorTarget], data_dir: str = 'data',
+                 max_per_host: int = 4, max_concurrency: int = 16,
+                 state_durability: str = DURABILITY_FSYNC, parse_workers: int = 0):
+        self.targets = targets
+        self.data_dir = data_dir
+        self.max_per_host = max_per_host
+        self.max_concurrency = max_concurrency
+        os.makedirs(data_dir, exist_ok=True)
+
+        hosts = {target.host for target in targets}
+        self.session = create_session(
+            TransportConfig.from_env(pool_connections=max(len(hosts), 1), pool_maxsize=max_per_host),
+            user_agent=USER_AGENT
+        )
+
+        # Parse stage in worker processes, shared by all targets; 0 parses on the fetch threads
+        self.parse_pool = None
+        if parse_workers > 0:
+            from parse_pool import ParsePool
+
+            self.parse_pool = ParsePool(parse_workers)
+
+        # One parse result cache for all targets (PARSE_CACHE_SIZE), keyed by target name
+        self.parse_cache = create_parse_cache()
+        # One snapshot archive (SNAPSHOT_ARCHIVE_DIR), so a page served to several targets is stored once
+        self.archive = create_snapshot_archive()
+
+        # One history log for all targets, keyed by target name
+        self.history = HistoryStore(os.path.join(data_dir, 'sb_history.db'))
+        self.scrapers: Dict[str, PMSVScraper] = {
+            target.name: PMSVScraper(
+                data_file=os.path.join(data_dir, f"{target.name}.json"),
+                url=target.url,
+                pattern=target.pattern,
+                selector=target.selector or '',
+                session=self.session,
+                history=self.history,
+                target_name=target.name,
+                state_durability=state_durability,
+                parse_pool=self.parse_pool,
+                parse_cache=self.parse_cache,
+                archive=self.archive
+            )
+            for target in targets
+        }
+
+    @classmethod
+    def from_config(cls, config_file: str, **kwargs) -> 'AsyncMonitorEngine':
+        """Create an engine for the targets listed in a JSON config file."""
+        return cls(load_targets(config_file), **kwargs)
+
+    async def _check_target(self, target: MonitorTarget, executor: ThreadPoolExecutor,
+                            global_limit: asyncio.Semaphore,
+                            host_limits: Dict[str, asyncio.Semaphore]) -> TargetResult:
+        scraper = self.scrapers[target.name]
+        loop = asyncio.get_running_loop()
+        async with global_limit, host_limits[target.host]:
+            start = time.perf_counter()
+            try:
+                updated, current, previous = await loop.run_in_executor(executor, scraper.check_for_updates)
+                error = None if current is not None else "Could not retrieve current value"
+            except Exception as e:
+                logging.error(f"Error checking target {target.name}: {e}")
+                updated, current, previous, error = False, None, None, str(e)
+            duration = time.perf_counter() - start
+        return TargetResult(target, updated, current, previous, duration, error, scraper.change_summary() or None)
+
+    async def run_check_async(self, names: Optional[List[str]] = None) -> List[TargetResult]:
+        """
+        Check every target concurrently.
+
+        Args:
+            names (Optional[List[str]]): Only check these targets, e.g. the ones this replica owns
+
+        Returns:
+            List[TargetResult]: One result per checked target, in configuration order
+        """
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='pmsv-check') as executor:
+            return await asyncio.gather(*(
+                self._check_target(target, executor, global_limit, host_limits)
+                for target in self.targets if names is None or target.name in names
+            ))
+
+    def run_check(self, names: Optional[List[str]] = None) -> List[TargetResult]:
+        """Synchronous wrapper around run_check_async for the scheduler."""
+        start = time.perf_counter()
+        results = asyncio.run(self.run_check_async(names))
+        logging.info(f"Checked {len(results)} targets in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def close(self) -> None:
+        self.session.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
@@ -0,0 +1,139 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Object addresses in exception text ("<... at 0x7f3a...>") differ between otherwise identical errors
+_ADDRESS_RE = re.compile(r'0x[0-9a-fA-F]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _dedup_key(message: str) -> str:
+    return _WHITESPACE_RE.sub(' ', _ADDRESS_RE.sub('0x', message)).strip()
+
+
+class NotificationCoalescer:
+    """
+    Suppresses repeated error notifications and rolls them into digests.
+
+    Sits in front of a notifier (EmailNotifier or NotificationDispatcher).
+    Error notifications are dropped if the same error was sent within the
+    dedup window or if the recipient already got rate_limit_per_hour emails
+    in the last hour; suppressed errors are counted and sent as one digest
+    email every digest_interval. SB change and page change notifications are never
+    suppressed, but they count towards the rate limit.
+    """
+
+    def __init__(self, notifier, recipient: Optional[str] = None, dedup_window: float = 3600,
+                 rate_limit_per_hour: int = 6, digest_interval: float = 6 * 3600,
+                 clock: Callable[[], float] = time.time):
+        self.notifier = notifier
+        self.recipient = recipient or 'default'
+        self.dedup_window = dedup_window
+        self.rate_limit_per_hour = rate_limit_per_hour
+        self.digest_interval = digest_interval
+        self.clock = clock
+
+        self._last_sent: Dict[str, float] = {}
+        self._sent_times: Dict[str, Deque[float]] = defaultdict(deque)
+        self._suppressed: Dict[str, Dict[str, Any]] = {}
+        self._last_digest = clock()
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(self.notifier, 'enabled', True)
+
+    def _within_rate_limit(self, now: float) -> bool:
+        sent = self._sent_times[self.recipient]
+        while sent and sent[0] <= now - 3600:
+            sent.popleft()
+        return len(sent) < self.rate_limit_per_hour
+
+    def _record_sent(self, now: float) -> None:
+        self._sent_times[self.recipient].append(now)
+
+    def _suppress(self, key: str, message: str, reason: str, now: float) -> None:
+        event = self._suppressed.get(key)
+        if event is None:
+            event = self._suppressed[key] = {'message': message, 'count': 0, 'first_seen': now, 'last_seen': now}
+        event['count'] += 1
+        event['last_seen'] = now
+        self.suppressed_total += 1
+        logging.info(f"Suppressed error notification ({reason}): {message}")
+
+    def send_notification(self, *args: Any, **kwargs: Any) -> bool:
+        """Forward an SB change notification; these are never suppressed."""
+        with self._lock:
+            self._record_sent(self.clock())
+        return self.notifier.send_notification(*args, **kwargs)
+
+    def send_page_change_notification(self, *args: Any, **kwargs: Any) -> bool:
+        """Forward a page change notification; like SB changes, these are never suppressed."""
+        with self._lock:
+            self._record_sent(self.clock())
+        return self.notifier.send_page_change_notification(*args, **kwargs)
+
+    def send_error_notification(self, error_message: str) -> bool:
+        """
+        Forward an error notification unless it is a duplicate or over the rate limit.
+
+        Returns:
+            bool: True if the notification was forwarded or folded into the next digest
+        """
+        self.flush_digest_if_due()
+        with self._lock:
+            now = self.clock()
+            key = _dedup_key(error_message)
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.dedup_window:
+                self._suppress(key, error_message, 'duplicate', now)
+                return True
+            if not self._within_rate_limit(now):
+                self._suppress(key, error_message, 'rate limit', now)
+                return True
+            self._last_sent[key] = now
+            self._record_sent(now)
+        return self.notifier.send_error_notification(error_message)
+
+    def pending_digest(self) -> List[Dict[str, Any]]:
+        """Return the suppressed events that will go into the next digest."""
+        with self._lock:
+            return [dict(event) for event in self._suppressed.values()]
+
+    def flush_digest(self) -> bool:
+        """
+        Send a digest of all suppressed errors now, if there are any.
+
+        Returns:
+            bool: True if a digest was sent
+        """
+        with self._lock:
+            self._last_digest = self.clock()
+            events = sorted(self._suppressed.values(), key=lambda e: e['first_seen'])
+            if not events:
+                return False
+            self._suppressed = {}
+        if self.notifier.send_digest(events):
+            logging.info(f"Sent digest of {sum(e['count'] for e in events)} suppressed error(s)")
+            return True
+        with self._lock:
+            # Keep the events for the next digest attempt
+            for event in events:
+                key = _dedup_key(event['message'])
+                current = self._suppressed.get(key)
+                if current is None:
+                    self._suppressed[key] = event
+                else:
+                    current['count'] += event['count']
+                    current['first_seen'] = min(current['first_seen'], event['first_seen'])
+        return False
+
+    def flush_digest_if_due(self) -> bool:
+        """Send the digest if digest_interval has passed since the last one."""
+        with self._lock:
+            due = self.clock() - self._last_digest >= self.digest_interval
+        return self.flush_digest() if due else False
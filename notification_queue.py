@@ -0,0 +1,262 @@
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from state_store import DURABILITY_FSYNC, StateFile
+
+# Notifier methods that may be dispatched in the background
+DISPATCHABLE_METHODS = ('send_notification', 'send_page_change_notification', 'send_error_notification', 'send_digest')
+
+
+class NotificationDispatcher:
+    """
+    Delivers notifications on a background worker so checks never wait on SMTP.
+
+    Every submitted notification is first written to a spool directory, then put
+    on a bounded in-memory queue. Workers call the wrapped notifier, retrying
+    failures with exponential backoff, and delete the spool file once delivered.
+    Spooled jobs left over from a previous run (or that did not fit in the queue)
+    are picked up again, so pending alerts survive restarts. A worker takes
+    everything that is queued (up to batch_size jobs) and, if the notifier
+    supports it, sends it inside one notifier.batch(), so a burst of alerts goes
+    out over a single SMTP session. Jobs of a batch that were not delivered are
+    retried one by one.
+
+    The dispatcher exposes the same send_notification / send_error_notification /
+    send_digest methods as EmailNotifier and can be used in its place.
+    """
+
+    def __init__(self, notifier, spool_dir: str = 'notification_spool', maxsize: int = 100,
+                 workers: int = 1, max_retries: int = 5, base_delay: float = 2.0,
+                 max_delay: float = 300.0, batch_size: int = 50):
+        self.notifier = notifier
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        os.makedirs(spool_dir, exist_ok=True)
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=maxsize)
+        self._known: Set[str] = set()
+        self._known_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.delivered = 0
+        self.failed = 0
+        # Seconds between submit() and successful delivery, for the most recent jobs
+        self.delivery_latencies: Deque[float] = deque(maxlen=100)
+
+    def start(self) -> None:
+        """Start the worker threads and enqueue notifications spooled by a previous run."""
+        self._stop.clear()
+        recovered = self._enqueue_spooled()
+        if recovered:
+            logging.info(f"Recovered {recovered} pending notification(s) from {self.spool_dir}")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'notification-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers. Undelivered notifications stay in the spool for the next start."""
+        self._stop.set()
+        for _ in self._threads:
+            # Wake idle workers; busy ones notice the stop flag after their current job
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _spool_files(self):
+        return sorted(glob.glob(os.path.join(self.spool_dir, '*.json')))
+
+    def _enqueue(self, path: str) -> bool:
+        with self._known_lock:
+            if path in self._known:
+                return True
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                return False
+            self._known.add(path)
+            return True
+
+    def _enqueue_spooled(self) -> int:
+        count = 0
+        for path in self._spool_files():
+            if not self._enqueue(path):
+                break
+            count += 1
+        return count
+
+    def submit(self, method: str, *args: Any, **kwargs: Any) -> bool:
+        """
+        Spool a notifier call and queue it for background delivery.
+
+        Args:
+            method (str): Name of the notifier method, e.g. "send_notification"
+            *args, **kwargs: JSON-serializable arguments for that method
+
+        Returns:
+            bool: True once the notification is safely spooled
+        """
+        if method not in DISPATCHABLE_METHODS:
+            raise ValueError(f"Cannot dispatch notifier method: {method}")
+        if not getattr(self.notifier, 'enabled', True):
+            # Nothing could ever deliver it; don't spool and retry
+            return getattr(self.notifier, method)(*args, **kwargs)
+        path = os.path.join(self.spool_dir, f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.json")
+        try:
+            StateFile(path, durability=DURABILITY_FSYNC).write({
+                'method': method,
+                'args': list(args),
+                'kwargs': kwargs,
+                'attempts': 0,
+                'submitted': time.time()
+            })
+        except Exception as e:
+            logging.error(f"Failed to spool notification, sending inline: {e}")
+            return getattr(self.notifier, method)(*args, **kwargs)
+        if not self._enqueue(path):
+            logging.warning("Notification queue full; notification stays spooled until the queue drains")
+        return True
+
+    def send_notification(self, *args: Any, **kwargs: Any) -> bool:
+        return self.submit('send_notification', *args, **kwargs)
+
+    def send_page_change_notification(self, *args: Any, **kwargs: Any) -> bool:
+        return self.submit('send_page_change_notification', *args, **kwargs)
+
+    def send_error_notification(self, *args: Any, **kwargs: Any) -> bool:
+        return self.submit('send_error_notification', *args, **kwargs)
+
+    def send_digest(self, *args: Any, **kwargs: Any) -> bool:
+        return self.submit('send_digest', *args, **kwargs)
+
+    @property
+    def pending(self) -> int:
+        """Number of spooled notifications not yet delivered."""
+        return len(self._spool_files())
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all spooled notifications have been delivered or given up.
+
+        Returns:
+            bool: True if the spool drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                # Pick up jobs that did not fit into the queue when submitted
+                self._enqueue_spooled()
+                continue
+            paths = [path]
+            while len(paths) < self.batch_size:
+                try:
+                    paths.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            jobs = [p for p in paths if p is not None]
+            try:
+                if len(jobs) > 1 and hasattr(self.notifier, 'batch'):
+                    self._deliver_batch(jobs)
+                else:
+                    for job_path in jobs:
+                        self._deliver(job_path)
+            finally:
+                with self._known_lock:
+                    self._known.difference_update(jobs)
+                for _ in paths:
+                    self._queue.task_done()
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            return StateFile(path, durability=DURABILITY_FSYNC).read()
+        except ValueError as e:
+            logging.error(f"Dropping unreadable spooled notification {path}: {e}")
+            os.rename(path, f"{path}.failed")
+            return None
+
+    def _delivered(self, path: str, job: Dict[str, Any]) -> None:
+        os.unlink(path)
+        self.delivered += 1
+        self.delivery_latencies.append(time.time() - job['submitted'])
+
+    def _deliver_batch(self, paths: List[str]) -> None:
+        """Send several spooled jobs over one SMTP session; retry the undelivered ones individually."""
+        jobs = [(path, job) for path, job in ((path, self._load(path)) for path in paths) if job is not None]
+        # Position of each job's message among the queued ones, None if it queued nothing
+        positions: List[Optional[int]] = []
+        with self.notifier.batch() as outcome:
+            for path, job in jobs:
+                job['attempts'] += 1
+                queued = outcome.queued
+                try:
+                    ok = getattr(self.notifier, job['method'])(*job['args'], **job['kwargs'])
+                except Exception as e:
+                    logging.error(f"Notification {job['method']} raised: {e}")
+                    ok = False
+                positions.append(queued if ok and outcome.queued > queued else None)
+
+        for (path, job), position in zip(jobs, positions):
+            if position is not None and position < outcome.sent:
+                self._delivered(path, job)
+                continue
+            StateFile(path, durability=DURABILITY_FSYNC).write(job)
+            if self._stop.is_set():
+                return
+            self._deliver(path)
+
+    def _deliver(self, path: str) -> None:
+        spool = StateFile(path, durability=DURABILITY_FSYNC)
+        job = self._load(path)
+        if job is None:
+            return
+
+        method = getattr(self.notifier, job['method'])
+        while not self._stop.is_set():
+            job['attempts'] += 1
+            try:
+                ok = method(*job['args'], **job['kwargs'])
+            except Exception as e:
+                logging.error(f"Notification {job['method']} raised: {e}")
+                ok = False
+
+            if ok:
+                self._delivered(path, job)
+                return
+
+            if job['attempts'] > self.max_retries:
+                logging.error(f"Giving up on notification {job['method']} after {job['attempts']} attempts")
+                os.rename(path, f"{path}.failed")
+                self.failed += 1
+                return
+
+            delay = self._backoff(job['attempts'])
+            spool.write(job)
+            logging.warning(f"Notification {job['method']} failed (attempt {job['attempts']}), retrying in {delay:.1f}s")
+            self._stop.wait(delay)
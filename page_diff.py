@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from state_store import DURABILITY_NONE, StateFile
+
+# Blocks of the forms page, e.g. <div class="ecl" id="section-trend-report">
+SECTION_XPATH = "//*[starts-with(@id, 'section-')]"
+# The first dotted number of a title is its form version, e.g. "MIR 7.3.1." -> "7.3.1"
+VERSION_RE = re.compile(r'\d+(?:\.\d+)+')
+# Numbers are masked when matching old and new records, so a new version is a change, not a new form
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)*\.?')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Records of pages without section blocks go into a single section
+PAGE_SECTION = 'page'
+
+
+@dataclass(frozen=True)
+class FormRecord:
+    """One link on the forms page: its section, link text, form version and target."""
+    section: str
+    title: str
+    version: Optional[str]
+    link: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Identity of the form across versions: its section and title without numbers."""
+        return self.section, _NUMBER_RE.sub('#', self.title)
+
+    def digest(self) -> str:
+        return hashlib.sha256('\x1f'.join((self.title, self.version or '', self.link)).encode()).hexdigest()
+
+    def describe(self) -> str:
+        return f"{self.title} <{self.link}>"
+
+
+@dataclass
+class PageFingerprint:
+    """
+    Merkle-style fingerprint of a page's records.
+
+    Each section hash covers the digests of its records and the root hash
+    covers the section hashes, so equal roots mean an unchanged page and
+    unequal section hashes point at the sections to diff.
+    """
+    root: str
+    sections: Dict[str, str]
+
+    def changed_sections(self, other: 'PageFingerprint') -> Set[str]:
+        names = set(self.sections) | set(other.sections)
+        return {name for name in names if self.sections.get(name) != other.sections.get(name)}
+
+
+@dataclass
+class PageDiff:
+    """Records added, removed and changed (old, new) between two versions of a page."""
+    added: List[FormRecord] = field(default_factory=list)
+    removed: List[FormRecord] = field(default_factory=list)
+    changed: List[Tuple[FormRecord, FormRecord]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary_lines(self) -> List[str]:
+        """Human-readable, JSON-serializable description of the changes, one line each."""
+        lines = []
+        for old, new in self.changed:
+            if old.title != new.title:
+                lines.append(f"Changed in {new.section}: {old.title} -> {new.title}")
+            else:
+                lines.append(f"Changed in {new.section}: {new.title}")
+            if old.link != new.link:
+                lines.append(f"  link: {old.link} -> {new.link}")
+        lines.extend(f"Added to {record.section}: {record.describe()}" for record in self.added)
+        lines.extend(f"Removed from {record.section}: {record.describe()}" for record in self.removed)
+        return lines
+
+
+def _text(element) -> str:
+    return _WHITESPACE_RE.sub(' ', ''.join(element.itertext())).strip()
+
+
+def extract_records(content: bytes, base_url: str = '', encoding: Optional[str] = None) -> List[FormRecord]:
+    """
+    Normalize a forms page into its (section, title, version, link) records.
+
+    Args:
+        content (bytes): The HTML body
+        base_url (str): URL of the page, to resolve relative links
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+
+    Returns:
+        List[FormRecord]: The page's links in document order
+    """
+    from lxml import etree
+
+    root = etree.fromstring(content, etree.HTMLParser(encoding=encoding))
+    if root is None:
+        return []
+    blocks = [(block.findtext('.//h2') or block.get('id'), block) for block in root.xpath(SECTION_XPATH)]
+    if not blocks:
+        blocks = [(PAGE_SECTION, root)]
+
+    records = []
+    for name, block in blocks:
+        section = _WHITESPACE_RE.sub(' ', name).strip()
+        for anchor in block.iter('a'):
+            href = anchor.get('href')
+            title = _text(anchor)
+            if not href or href.startswith('#') or not title:
+                continue
+            version = VERSION_RE.search(title)
+            records.append(FormRecord(section, title, version.group(0) if version else None,
+                                      urljoin(base_url, href)))
+    return records
+
+
+def fingerprint(records: Iterable[FormRecord]) -> PageFingerprint:
+    """Compute the section and root hashes of a page's records."""
+    leaves: Dict[str, List[str]] = {}
+    for record in records:
+        leaves.setdefault(record.section, []).append(record.digest())
+    sections = {
+        name: hashlib.sha256('\n'.join([name] + digests).encode()).hexdigest()
+        for name, digests in leaves.items()
+    }
+    root = hashlib.sha256('\n'.join(f"{name} {digest}" for name, digest in sorted(sections.items())).encode())
+    return PageFingerprint(root.hexdigest(), sections)
+
+
+def diff_records(old: List[FormRecord], new: List[FormRecord],
+                 sections: Optional[Set[str]] = None) -> PageDiff:
+    """
+    Diff two versions of a page's records.
+
+    Args:
+        old (List[FormRecord]): Records of the previous version
+        new (List[FormRecord]): Records of the current version
+        sections (Optional[Set[str]]): Only diff these sections (all if None)
+
+    Returns:
+        PageDiff: The added, removed and changed records
+    """
+    if sections is not None:
+        old = [record for record in old if record.section in sections]
+        new = [record for record in new if record.section in sections]
+    old_by_key: Dict[Tuple[str, str], List[FormRecord]] = {}
+    for record in old:
+        old_by_key.setdefault(record.key, []).append(record)
+
+    diff = PageDiff()
+    for record in new:
+        candidates = old_by_key.get(record.key)
+        if not candidates:
+            diff.added.append(record)
+            continue
+        previous = candidates.pop(0)
+        if previous != record:
+            diff.changed.append((previous, record))
+    diff.removed = [record for records in old_by_key.values() for record in records]
+    return diff
+
+
+class PageTracker:
+    """
+    Detects changes anywhere in the forms page, not just the tracked value.
+
+    The page's records and fingerprint are kept in a state file. A body with the
+    same hash as the stored one costs a string compare; otherwise the records are
+    extracted and fingerprinted, and only sections whose hashes differ are diffed.
+
+    Args:
+        state_file (str): JSON file for the records and fingerprint of the last version
+        url (str): URL of the page, to resolve relative links
+    """
+
+    def __init__(self, state_file: str, url: str):
+        self.state = StateFile(state_file, durability=DURABILITY_NONE)
+        self.url = url
+        self._snapshot: Optional[dict] = None
+
+    def load_snapshot(self) -> dict:
+        if self._snapshot is None:
+            try:
+                snapshot = self.state.read() or {}
+            except Exception as e:
+                logging.error(f"Error loading page snapshot: {e}")
+                snapshot = {}
+            self._snapshot = snapshot if snapshot.get('url') == self.url else {}
+        return self._snapshot
+
+    def _save(self, content_hash: str, records: List[FormRecord], page_fingerprint: PageFingerprint) -> None:
+        self._snapshot = {
+            'url': self.url,
+            'content_hash': content_hash,
+            'root': page_fingerprint.root,
+            'sections': page_fingerprint.sections,
+            'records': [asdict(record) for record in records],
+            'last_updated': datetime.now().isoformat()
+        }
+        try:
+            self.state.write(self._snapshot)
+        except Exception as e:
+            logging.error(f"Error saving page snapshot: {e}")
+
+    def check(self, content: bytes, content_hash: str, encoding: Optional[str] = None) -> Optional[PageDiff]:
+        """
+        Compare a fetched page with the stored version and store it.
+
+        Args:
+            content (bytes): The full HTML body
+            content_hash (str): Hash of the body, compared before anything is parsed
+            encoding (Optional[str]): Declared body encoding, if any
+
+        Returns:
+            Optional[PageDiff]: The changes (empty if none), or None on the first check
+        """
+        snapshot = self.load_snapshot()
+        if snapshot and snapshot.get('content_hash') == content_hash:
+            return PageDiff()
+
+        records = extract_records(content, self.url, encoding)
+        current = fingerprint(records)
+        if not snapshot:
+            logging.info(f"Stored page snapshot with {len(records)} records")
+            self._save(content_hash, records, current)
+            return None
+
+        previous = PageFingerprint(snapshot['root'], snapshot['sections'])
+        if current.root == previous.root:
+            # Only markup outside the records changed; remember the hash so the next check is cheap
+            self._save(content_hash, records, current)
+            return PageDiff()
+
+        old_records = [FormRecord(**record) for record in snapshot['records']]
+        diff = diff_records(old_records, records, current.changed_sections(previous))
+        logging.info(f"Page changed: {len(diff.changed)} changed, {len(diff.added)} added, "
+                     f"{len(diff.removed)} removed record(s)")
+        self._save(content_hash, records, current)
+        return diff
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from metrics import PARSE_CACHE_LOOKUPS
+
+RESULT_MEMORY_HIT = 'memory_hit'
+RESULT_DISK_HIT = 'disk_hit'
+RESULT_MISS = 'miss'
+
+DEFAULT_PARSE_CACHE_TTL = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_results (
+    target TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (target, extractor, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_parse_results_stored_at ON parse_results(stored_at);
+"""
+
+CacheKey = Tuple[str, str, str]
+
+
+class ParseCache:
+    """
+    Extraction results by (target, extractor version, body hash).
+
+    A page body that was parsed before, for any of the last max_entries bodies,
+    is not parsed again. Entries older than ttl are ignored, so a change to the
+    extraction that is not reflected in the extractor version heals on its own.
+    With a disk path, results are also kept in an SQLite file of up to
+    disk_entries rows, so they survive a restart.
+
+    Args:
+        max_entries (int): Results kept in memory, least recently used evicted first
+        ttl (float): Seconds a result stays valid
+        disk_path (Optional[str]): SQLite file for the disk tier, none if not given
+        disk_entries (Optional[int]): Results kept on disk, 10 times max_entries by default
+    """
+
+    def __init__(self, max_entries: int, ttl: float = DEFAULT_PARSE_CACHE_TTL, disk_path: Optional[str] = None,
+                 disk_entries: Optional[int] = None, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.disk_entries = disk_entries or 10 * max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _read_disk(self, key: CacheKey) -> Optional[Tuple[float, Dict[str, Any]]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT stored_at, result FROM parse_results WHERE target = ? AND extractor = ? AND content_hash = ?",
+                    key
+                ).fetchone()
+        except Exception as e:
+            logging.error(f"Error reading parse cache: {e}")
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _write_disk(self, key: CacheKey, stored_at: float, result: Dict[str, Any]) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO parse_results VALUES (?, ?, ?, ?, ?)",
+                             key + (json.dumps(result), stored_at))
+                conn.execute("DELETE FROM parse_results WHERE stored_at < ?", (stored_at - self.ttl,))
+                conn.execute(
+                    "DELETE FROM parse_results WHERE rowid IN "
+                    "(SELECT rowid FROM parse_results ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,)
+                )
+        except Exception as e:
+            logging.error(f"Error writing parse cache: {e}")
+
+    def get(self, target: str, extractor: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the extraction results of a body.
+
+        Args:
+            target (str): Target the body was fetched for
+            extractor (str): Version of the extraction code and configuration
+            content_hash (str): Hash of the whole body
+
+        Returns:
+            Optional[Dict[str, Any]]: The stored results, or None on a miss
+        """
+        key = (target, extractor, content_hash)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                PARSE_CACHE_LOOKUPS.inc(target=target, result=RESULT_MEMORY_HIT)
+                return entry[1]
+
+        entry = self._read_disk(key) if self.disk_path else None
+        with self._lock:
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._store(key, entry)
+                self.hits += 1
+                PARSE_CACHE_LOOKUPS.inc(target=target, result=RESULT_DISK_HIT)
+                return entry[1]
+            self.misses += 1
+            PARSE_CACHE_LOOKUPS.inc(target=target, result=RESULT_MISS)
+            return None
+
+    def _store(self, key: CacheKey, entry: Tuple[float, Dict[str, Any]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, target: str, extractor: str, content_hash: str, result: Dict[str, Any]) -> None:
+        """
+        Store the extraction results of a body.
+
+        Args:
+            target (str): Target the body was fetched for
+            extractor (str): Version of the extraction code and configuration
+            content_hash (str): Hash of the whole body
+            result (Dict[str, Any]): JSON-serializable results
+        """
+        key = (target, extractor, content_hash)
+        entry = (self.clock(), result)
+        with self._lock:
+            self._store(key, entry)
+        if self.disk_path:
+            self._write_disk(key, *entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts of this process, and the hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else None,
+                'entries': len(self._entries)
+            }
+
+
+def create_parse_cache(max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                       disk_path: Optional[str] = None) -> Optional[ParseCache]:
+    """
+    Create a parse cache from arguments or the PARSE_CACHE_* environment variables.
+
+    Args:
+        max_entries (Optional[int]): Results kept in memory (PARSE_CACHE_SIZE, default 0: no cache)
+        ttl (Optional[float]): Seconds a result stays valid (PARSE_CACHE_TTL_SECONDS, default one day)
+        disk_path (Optional[str]): SQLite file for the disk tier (PARSE_CACHE_PATH, default none)
+
+    Returns:
+        Optional[ParseCache]: None if the cache is disabled
+    """
+    if max_entries is None:
+        max_entries = int(os.getenv('PARSE_CACHE_SIZE', '0'))
+    if max_entries <= 0:
+        return None
+    return ParseCache(
+        max_entries,
+        ttl=ttl or float(os.getenv('PARSE_CACHE_TTL_SECONDS', str(DEFAULT_PARSE_CACHE_TTL))),
+        disk_path=disk_path or os.getenv('PARSE_CACHE_PATH') or None
+    )
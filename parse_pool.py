@@ -0,0 +1,126 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Pattern, Tuple
+
+from history_store import DEFAULT_TARGET
+from metrics import PARSE_QUEUE_SECONDS
+
+
+def _init_worker() -> None:
+    # Pay for the lxml / BeautifulSoup imports when the worker starts, not on its first page
+    import bs4  # noqa: F401
+
+    import extraction  # noqa: F401
+
+
+def parse_body(content: bytes, pattern: Pattern, selector: Optional[str] = None,
+               encoding: Optional[str] = None) -> Tuple[Optional[str], Dict[str, float]]:
+    """
+    Extract the tracked value from a page body; runs in a parse worker process.
+
+    Args:
+        content (bytes): The full HTML body
+        pattern (Pattern): Compiled regex whose first group is the wanted value
+        selector (Optional[str]): CSS or XPath selector for the block holding the value, if any
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+
+    Returns:
+        Tuple[Optional[str], Dict[str, float]]: The value (None if not found) and the regex timings
+    """
+    from extraction import extract
+
+    timings: Dict[str, float] = {}
+    return extract(content, pattern, selector, encoding, timings), timings
+
+
+class ParsePool:
+    """
+    Process pool for the CPU-bound parse stage of a many-target check.
+
+    Fetch threads stay in the monitor process and do the network I/O; each
+    finished body is handed as one bytes object to a worker process, so parsing
+    runs on all cores instead of taking turns on the GIL. At most max_pending
+    bodies are queued or being parsed at a time. A fetch thread with a body beyond
+    that blocks before submitting it, and so does not start its next fetch, which
+    bounds memory and backs the fetch stage off when parsing falls behind.
+
+    Args:
+        workers (Optional[int]): Worker processes, the CPU count by default
+        max_pending (Optional[int]): Bodies queued or being parsed at once
+            (PARSE_MAX_PENDING, default 2 per worker)
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or int(os.getenv('PARSE_MAX_PENDING', '0')) or 2 * self.workers
+        # Forking a process that runs fetch threads can copy a held lock into the child;
+        # forkserver and spawn start the workers from a clean interpreter
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._executor_lock = threading.Lock()
+        self.executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        logging.info(f"Parse pool with {self.workers} worker(s), at most {self.max_pending} pending bodies")
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._mp_context,
+                                   initializer=_init_worker)
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        """Replace a pool whose worker died; every later submit to it would fail."""
+        with self._executor_lock:
+            # Another fetch thread may have replaced it already
+            if self.executor is not executor:
+                return
+            logging.warning("A parse worker died, restarting the parse pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+
+    def extract(self, content: bytes, pattern: Pattern, selector: Optional[str] = None,
+                encoding: Optional[str] = None, timings: Optional[Dict[str, float]] = None,
+                target: str = DEFAULT_TARGET) -> Optional[str]:
+        """
+        Parse a body in a worker process and wait for the value.
+
+        Blocks while max_pending bodies are already queued or being parsed. If a
+        worker process dies, the pool is restarted for the next body and
+        BrokenProcessPool is raised for this one.
+
+        Args:
+            content (bytes): The full HTML body
+            pattern (Pattern): Compiled regex whose first group is the wanted value
+            selector (Optional[str]): CSS or XPath selector for the block holding the value, if any
+            encoding (Optional[str]): Declared body encoding, detected from the document if None
+            timings (Optional[Dict[str, float]]): If given, the worker's regex seconds are added under 'regex'
+            target (str): Target name for the queue wait metric
+
+        Returns:
+            Optional[str]: The extracted value or None if not found
+        """
+        start = time.perf_counter()
+        with self._slots:
+            PARSE_QUEUE_SECONDS.observe(time.perf_counter() - start, target=target)
+            executor = self.executor
+            try:
+                value, worker_timings = executor.submit(parse_body, content, pattern, selector, encoding).result()
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+                raise
+        if timings is not None:
+            for name, seconds in worker_timings.items():
+                timings[name] = timings.get(name, 0.0) + seconds
+        return value
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
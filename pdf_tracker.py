@@ -0,0 +1,284 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from history_store import HistoryStore, STATUS_ERROR, STATUS_INITIAL, STATUS_UNCHANGED, STATUS_UPDATED
+from metrics import DOCUMENT_BYTES, DOCUMENT_CHECKS
+
+# Links to PDFs, directly or through the EC download endpoint (".../download/<id>_en?filename=form.pdf")
+DOCUMENT_LINK_RE = re.compile(r'\.pdf(?:$|[?#])|[?&]filename=[^&#]*\.pdf', re.IGNORECASE)
+# "bytes 0-0/123456" in a 206 response to a one-byte range request
+CONTENT_RANGE_RE = re.compile(r'bytes \d+-\d+/(\d+)')
+
+DEFAULT_DOCUMENT_MAX_BYTES = 50 * 1024 * 1024
+DOCUMENT_CHUNK_SIZE = 64 * 1024
+
+
+class DocumentTooLarge(OSError):
+    """The document is larger than the tracker's max_bytes."""
+
+
+def document_links(content: bytes, base_url: str, selector: Optional[str] = None,
+                   encoding: Optional[str] = None) -> List[str]:
+    """
+    Collect the PDF links of a page, or of the block a selector picks out.
+
+    Args:
+        content (bytes): The HTML body
+        base_url (str): URL of the page, to resolve relative links
+        selector (Optional[str]): CSS or XPath selector limiting the search, whole page if empty
+        encoding (Optional[str]): Declared body encoding, detected from the document if None
+
+    Returns:
+        List[str]: Absolute document URLs in document order, without duplicates
+    """
+    from lxml import etree
+
+    from extraction import compile_selector
+
+    root = etree.fromstring(content, etree.HTMLParser(encoding=encoding))
+    if root is None:
+        return []
+    blocks = compile_selector(selector)(root) if selector else [root]
+    links: Dict[str, None] = {}
+    for block in blocks:
+        if isinstance(block, str):
+            # Text or attribute results of an XPath selector
+            continue
+        anchors = [block] if block.tag == 'a' else block.iter('a')
+        for anchor in anchors:
+            href = anchor.get('href')
+            if href and DOCUMENT_LINK_RE.search(href):
+                links.setdefault(urljoin(base_url, href), None)
+    return list(links)
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by concurrent downloads.
+
+    Each chunk reserves its bytes; once the bucket is empty the reading thread
+    sleeps until the reservation is covered, so all downloads together stay
+    at about bytes_per_second.
+
+    Args:
+        bytes_per_second (float): Sustained rate; 0 or less disables the limit
+        burst (Optional[float]): Bucket size in bytes, one second's worth by default
+    """
+
+    def __init__(self, bytes_per_second: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = bytes_per_second
+        self.burst = burst if burst is not None else max(bytes_per_second, 0.0)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int) -> float:
+        """
+        Take size bytes from the bucket, sleeping while it is overdrawn.
+
+        Returns:
+            float: Seconds slept
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+@dataclass
+class DocumentResult:
+    """Outcome of checking one linked document."""
+    url: str
+    status: str
+    sha256: Optional[str] = None
+    previous_sha256: Optional[str] = None
+    downloaded: bool = False
+    bytes_read: int = 0
+    error: Optional[str] = None
+
+    def describe(self) -> str:
+        return f"Document changed: {self.url} (sha256 {self.previous_sha256[:12]} -> {self.sha256[:12]})"
+
+
+def _validators(headers: Any, content_length: Optional[int] = None) -> Dict[str, Any]:
+    length = headers.get('Content-Length', '')
+    if content_length is None and length.isdigit():
+        content_length = int(length)
+    return {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'content_length': content_length
+    }
+
+
+def validators_unchanged(previous: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    """
+    Whether the server's validators show the document is the one hashed last time.
+
+    An ETag decides on its own; without one, Last-Modified and Content-Length must
+    both be present and equal. Sizes that are known on both sides must always match.
+    """
+    if previous.get('content_length') is not None and current.get('content_length') is not None:
+        if previous['content_length'] != current['content_length']:
+            return False
+    if previous.get('etag') and current.get('etag'):
+        return previous['etag'] == current['etag']
+    if previous.get('last_modified') and current.get('last_modified'):
+        return (previous['last_modified'] == current['last_modified']
+                and previous.get('content_length') is not None and current.get('content_length') is not None)
+    return False
+
+
+class DocumentTracker:
+    """
+    Tracks the documents (PDF forms) linked from a monitored page.
+
+    Each document is probed with HEAD, or with a one-byte range request if the
+    server does not answer HEAD. Only when its ETag / Last-Modified / length
+    differ from the last check is it downloaded, hashed with SHA-256 as it
+    streams in, and compared to the previous hash. Every check is appended to
+    the documents table of the history store.
+
+    Args:
+        history (HistoryStore): Where the document hashes are stored
+        target_name (str): Target the documents belong to
+        max_workers (Optional[int]): Documents checked concurrently (DOCUMENT_CONCURRENCY, default 4)
+        bytes_per_second (Optional[float]): Download cap shared by all documents
+            (DOCUMENT_BANDWIDTH_BYTES_PER_SECOND, default 1 MiB/s, 0 for none)
+        max_bytes (Optional[int]): Largest document that is hashed (DOCUMENT_MAX_BYTES, default 50 MiB)
+    """
+
+    def __init__(self, history: HistoryStore, target_name: str, max_workers: Optional[int] = None,
+                 bytes_per_second: Optional[float] = None, max_bytes: Optional[int] = None,
+                 timeout: Optional[Any] = None):
+        self.history = history
+        self.target_name = target_name
+        self.max_workers = max_workers or int(os.getenv('DOCUMENT_CONCURRENCY', '4'))
+        if bytes_per_second is None:
+            bytes_per_second = float(os.getenv('DOCUMENT_BANDWIDTH_BYTES_PER_SECOND', str(1024 * 1024)))
+        self.limiter = BandwidthLimiter(bytes_per_second)
+        self.max_bytes = max_bytes or int(os.getenv('DOCUMENT_MAX_BYTES', DEFAULT_DOCUMENT_MAX_BYTES))
+        self.timeout = timeout
+
+    def probe(self, session: Any, url: str) -> Dict[str, Any]:
+        """Read a document's validators without downloading it."""
+        response = session.request('HEAD', url, timeout=self.timeout)
+        try:
+            if response.status_code not in (405, 501):
+                response.raise_for_status()
+                validators = _validators(response.headers)
+                if validators['etag'] or validators['last_modified']:
+                    return validators
+        finally:
+            response.close()
+
+        # Some servers reject HEAD or leave out the validators; a one-byte range request has them
+        response = session.get(url, headers={'Range': 'bytes=0-0'}, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+            content_length = None
+            if response.status_code == 206:
+                match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+                content_length = int(match.group(1)) if match else None
+            return _validators(response.headers, content_length)
+        finally:
+            # Closing drops the rest of the body if the server ignored the range
+            response.close()
+
+    def download_hash(self, session: Any, url: str) -> Tuple[str, int, Dict[str, Any]]:
+        """
+        Stream a document through SHA-256 under the bandwidth cap.
+
+        Returns:
+            Tuple[str, int, Dict[str, Any]]: Hex digest, bytes read and the response's validators
+        """
+        response = session.get(url, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+            validators = _validators(response.headers)
+            if validators['content_length'] is not None and validators['content_length'] > self.max_bytes:
+                raise DocumentTooLarge(f"Document of {validators['content_length']} bytes exceeds {self.max_bytes} bytes")
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in response.iter_content(DOCUMENT_CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise DocumentTooLarge(f"Document exceeds {self.max_bytes} bytes")
+                self.limiter.consume(len(chunk))
+                digest.update(chunk)
+            return digest.hexdigest(), size, validators
+        finally:
+            response.close()
+
+    def check_document(self, session: Any, url: str) -> DocumentResult:
+        """Check one document and record the outcome."""
+        previous = self.history.latest_document(self.target_name, url)
+        previous_sha = previous['sha256'] if previous else None
+        try:
+            validators = self.probe(session, url)
+            if previous and validators_unchanged(previous, validators):
+                result = DocumentResult(url, STATUS_UNCHANGED, previous_sha, previous_sha)
+            else:
+                sha256, size, response_validators = self.download_hash(session, url)
+                validators.update({key: value for key, value in response_validators.items() if value is not None})
+                if previous is None:
+                    status = STATUS_INITIAL
+                elif sha256 == previous_sha:
+                    status = STATUS_UNCHANGED
+                else:
+                    status = STATUS_UPDATED
+                    logging.info(f"Document changed: {url}")
+                result = DocumentResult(url, status, sha256, previous_sha, downloaded=True, bytes_read=size)
+                DOCUMENT_BYTES.inc(size, target=self.target_name)
+        except Exception as e:
+            logging.error(f"Error checking document {url}: {e}")
+            validators = {}
+            result = DocumentResult(url, STATUS_ERROR, previous_sha256=previous_sha, error=str(e))
+
+        DOCUMENT_CHECKS.inc(target=self.target_name, status=result.status, downloaded=str(result.downloaded).lower())
+        try:
+            self.history.record_document(self.target_name, url, result.status, sha256=result.sha256,
+                                         bytes_read=result.bytes_read, **validators)
+        except Exception as e:
+            logging.error(f"Error recording document check in history: {e}")
+        return result
+
+    def check(self, session: Any, urls: List[str]) -> List[DocumentResult]:
+        """
+        Check documents concurrently.
+
+        Args:
+            session (Any): requests.Session or lite_http.LiteSession
+            urls (List[str]): Document URLs, e.g. from document_links()
+
+        Returns:
+            List[DocumentResult]: One result per URL, in order
+        """
+        if not urls:
+            return []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)),
+                                thread_name_prefix='pmsv-documents') as executor:
+            results = list(executor.map(lambda url: self.check_document(session, url), urls))
+        downloaded = sum(result.downloaded for result in results)
+        logging.info(f"Checked {len(results)} document(s) in {time.perf_counter() - start:.2f}s, "
+                     f"{downloaded} downloaded")
+        return results
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, List, Optional, Set
+
+
+class IntervalTrigger:
+    """Fires every `seconds` seconds, measured from the previous planned run."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_run(self, after: float) -> float:
+        return after + self.seconds
+
+    def __repr__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step: {step_text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronTrigger:
+    """
+    Fires on a standard five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports '*', lists, ranges and steps. Day-of-week 0 and 7 are Sunday. As in
+    cron, if both day fields are restricted a day matches when either matches.
+    """
+
+    def __init__(self, expression: str, tz: Optional[tzinfo] = None):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.tz = tz
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        weekdays = _parse_cron_field(fields[4], 0, 7)
+        # cron: 0/7 = Sunday; datetime.isoweekday: 7 = Sunday
+        self.weekdays = {7 if d == 0 else d for d in weekdays}
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = dt.isoweekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_run(self, after: float) -> float:
+        dt = datetime.fromtimestamp(after, self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def __repr__(self) -> str:
+        return f"cron '{self.expression}'"
+
+
+class Job:
+    """A scheduled callable with its trigger, jitter and overlap state."""
+
+    def __init__(self, func: Callable[[], None], trigger, name: Optional[str] = None, jitter: float = 0.0):
+        self.func = func
+        self.trigger = trigger
+        self.name = name or getattr(func, '__name__', 'job')
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.planned = 0.0
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+
+    def schedule_after(self, planned: float, now: float) -> None:
+        """Plan the next run after `planned`, skipping runs that are already in the past."""
+        planned = self.trigger.next_run(planned)
+        while planned <= now:
+            planned = self.trigger.next_run(planned)
+        self.planned = planned
+        # Jitter spreads replicas that share a schedule
+        self.next_run = planned + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+class Scheduler:
+    """
+    Event-driven job scheduler.
+
+    Deadlines are kept in a heap and the scheduler thread sleeps exactly until
+    the earliest one, instead of waking up periodically to poll. Each job runs
+    on its own thread; if a job is still running when it is due again, that run
+    is skipped rather than started concurrently.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.wakeups = 0
+
+    def add_job(self, job: Job, run_immediately: bool = False) -> Job:
+        """Add a job; by default its first run is one trigger period from now."""
+        now = self.clock()
+        with self._condition:
+            if run_immediately:
+                job.planned = job.next_run = now
+            else:
+                job.schedule_after(now, now)
+            heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+            self._condition.notify()
+        logging.info(f"Scheduled {job.name} ({job.trigger}), next run at "
+                     f"{datetime.fromtimestamp(job.next_run).isoformat(timespec='seconds')}")
+        return job
+
+    def every(self, seconds: float, func: Callable[[], None], name: Optional[str] = None,
+              jitter: float = 0.0, run_immediately: bool = False) -> Job:
+        """Run func every `seconds` seconds (sub-minute intervals are fine)."""
+        return self.add_job(Job(func, IntervalTrigger(seconds), name, jitter), run_immediately)
+
+    def cron(self, expression: str, func: Callable[[], None], name: Optional[str] = None,
+             jitter: float = 0.0, tz: Optional[tzinfo] = None) -> Job:
+        """Run func on a five-field cron expression."""
+        return self.add_job(Job(func, CronTrigger(expression, tz), name, jitter))
+
+    def _run_job(self, job: Job) -> None:
+        start = time.perf_counter()
+        try:
+            job.func()
+        except Exception as e:
+            logging.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            job.running = False
+            logging.debug(f"Job {job.name} finished in {time.perf_counter() - start:.2f}s")
+
+    def _dispatch(self, job: Job, now: float) -> None:
+        if job.running:
+            job.skipped += 1
+            logging.warning(f"Skipping {job.name}: previous run still in progress")
+        else:
+            job.running = True
+            job.runs += 1
+            threading.Thread(target=self._run_job, args=(job,), name=f'job-{job.name}', daemon=True).start()
+        job.schedule_after(job.planned, now)
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+
+    def run_pending(self) -> int:
+        """Start every job that is due now. Returns the number of jobs dispatched."""
+        dispatched = 0
+        with self._condition:
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+                self._dispatch(job, now)
+                dispatched += 1
+        return dispatched
+
+    def next_deadline(self) -> Optional[float]:
+        with self._condition:
+            return self._heap[0][0] if self._heap else None
+
+    def run_forever(self) -> None:
+        """Dispatch jobs until stop() is called, sleeping until the next deadline."""
+        while True:
+            self.run_pending()
+            with self._condition:
+                if self._stopped:
+                    return
+                timeout = None
+                if self._heap:
+                    timeout = max(self._heap[0][0] - self.clock(), 0)
+                self._condition.wait(timeout)
+                self.wakeups += 1
+                if self._stopped:
+                    return
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
@@ -1,11 +1,18 @@
-import requests
-from bs4 import BeautifulSoup
 import re
-import json
 import os
+import hashlib
+import time
 from datetime import datetime
 import logging
-from typing import Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from history_store import (DEFAULT_TARGET, STATUS_ERROR, STATUS_INITIAL,
+                           STATUS_UNCHANGED, STATUS_UPDATED, HistoryStore)
+from state_store import DURABILITY_FSYNC, DURABILITY_NONE, StateFile
+from log_buffer import install_ring_buffer
+from parse_cache import create_parse_cache
+from snapshot_archive import create_snapshot_archive
+from metrics import (CHECK_SECONDS, FETCH_ERRORS, HTTP_RESPONSES, LAST_CHECK, RESPONSE_BYTES,
+                     RESPONSE_DECODED_BYTES, RESPONSE_WIRE_BYTES, SCRAPE_PHASE_SECONDS)
 
 # Configure logging
 logging.basicConfig(
@@ -16,70 +23,468 @@ logging.basicConfig(
         logging.StreamHandler()
     ]
 )
+# Recent records stay in memory so the dashboards can show the scraper's own log
+install_ring_buffer()
+
+PMSV_URL = "https://health.ec.europa.eu/medical-devices-sector/new-regulations/guidance-mdcg-endorsed-documents-and-other-guidance/pmsv-reporting-forms_en"
+
+# Matches the line "New manufacturer incident report (MIR 7.3.1. PDF form - SB 10573)"
+MIR_PATTERN = r'MIR 7\.3\.1.*?SB (\d+)'
+# The links of the manufacturer incident report section, where that line lives
+MIR_SELECTOR = '#section-manufacturer-incident-report a'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Larger bodies are not read; the EC page is about 100 KB
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+BODY_CHUNK_SIZE = 16 * 1024
+
+
+class ResponseTooLarge(OSError):
+    """The response body is larger than the scraper's max_body_bytes."""
+
+
+class StreamedBody:
+    """
+    A streamed response body, read chunk by chunk only as far as it is consumed.
+    
+    Enforces the size cap and hashes what was read. Chunks are kept, so the body
+    can be iterated again (e.g. by the BeautifulSoup fallback) without a new request.
+    
+    Args:
+        response: Response from get(..., stream=True), requests or lite_http
+        max_bytes (int): Largest decoded body accepted
+    """
+
+    def __init__(self, response: Any, max_bytes: int, chunk_size: int = BODY_CHUNK_SIZE):
+        self.max_bytes = max_bytes
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.complete = False
+        # Time spent waiting for the network and hashing, as opposed to parsing
+        self.read_seconds = 0.0
+        self.hash_seconds = 0.0
+        self._hash = hashlib.sha256()
+        self._source = response.iter_content(chunk_size)
+
+    @property
+    def io_seconds(self) -> float:
+        return self.read_seconds + self.hash_seconds
+
+    def __iter__(self) -> Iterator[bytes]:
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+                continue
+            if self.complete:
+                return
+            start = time.perf_counter()
+            chunk = next(self._source, None)
+            self.read_seconds += time.perf_counter() - start
+            if chunk is None:
+                self.complete = True
+                return
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise ResponseTooLarge(f"Response body exceeds {self.max_bytes} bytes")
+            start = time.perf_counter()
+            self._hash.update(chunk)
+            self.hash_seconds += time.perf_counter() - start
+            self.chunks.append(chunk)
+
+    def read(self) -> bytes:
+        """Read the rest of the body and return all of it."""
+        for _ in self:
+            pass
+        return b''.join(self.chunks)
+
+    def hexdigest(self) -> str:
+        """SHA-256 of the bytes read so far; of the whole body once complete."""
+        return self._hash.hexdigest()
+
+
+def _is_fetch_error(error: Exception) -> bool:
+    """
+    Tell network and HTTP errors apart from bugs without importing requests.
+    
+    requests' exceptions derive from OSError, as do socket errors and the lite
+    client's errors; http.client protocol errors come from their own module.
+    """
+    return isinstance(error, OSError) or type(error).__module__.startswith(('http.', 'requests', 'urllib3'))
+
 
 class PMSVScraper:
-    def __init__(self, data_file: str = 'sb_number_data.json'):
-        self.url = "https://health.ec.europa.eu/medical-devices-sector/new-regulations/guidance-mdcg-endorsed-documents-and-other-guidance/pmsv-reporting-forms_en"
+    def __init__(self, data_file: str = 'sb_number_data.json', url: Optional[str] = None,
+                 cache_file: Optional[str] = None, pattern: Optional[str] = None,
+                 session: Optional[Any] = None,
+                 history: Optional[HistoryStore] = None, target_name: str = DEFAULT_TARGET,
+                 state_durability: str = DURABILITY_FSYNC,
+                 timeout: Optional[Union[float, Tuple[float, float]]] = None,
+                 max_body_bytes: Optional[int] = None, stop_at_match: Optional[bool] = None,
+                 selector: Optional[str] = None, track_page_changes: Optional[bool] = None,
+                 track_documents: Optional[bool] = None, parse_pool: Optional[Any] = None,
+                 parse_cache: Optional[Any] = None, archive: Optional[Any] = None):
+        self.url = url or PMSV_URL
         self.data_file = data_file
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Atomic writes so a crash mid-write never leaves a truncated state file
+        self.state = StateFile(data_file, durability=state_durability)
+        self.target_name = target_name
+        # Every check is appended to the history store; by default it sits next to the data file
+        self.history = history or HistoryStore(os.path.join(os.path.dirname(data_file), 'sb_history.db'))
+        self.last_content_hash: Optional[str] = None
+        # HTTP validators (ETag / Last-Modified / content hash) live next to the data file
+        self.cache_file = cache_file or f"{os.path.splitext(data_file)[0]}_http_cache.json"
+        self.http_cache = StateFile(self.cache_file, durability=DURABILITY_NONE)
+        # The first capture group of the pattern is the tracked value
+        self.pattern = re.compile(pattern or MIR_PATTERN, re.IGNORECASE)
+        # CSS or XPath selector for the block the pattern is searched in; the default
+        # pattern comes with the MIR section selector, an empty string searches the whole page
+        self.selector = MIR_SELECTOR if selector is None and pattern is None else selector
+        # requests costs ~100ms to import, so the default session is created on first use;
+        # any object with a requests-style get() (e.g. lite_http.LiteSession) can be passed
+        self._session = session
+        # None leaves the (connect, read) timeouts to the session, see transport.py
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes or int(os.getenv('MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES))
+        # Stop downloading once the value has been found, unless the whole body is needed
+        if stop_at_match is None:
+            stop_at_match = os.getenv('STOP_AT_MATCH', 'true').lower() in ('1', 'true', 'yes')
+        self.stop_at_match = stop_at_match
+        # Optionally diff every form link on the page, not just the tracked value
+        if track_page_changes is None:
+            track_page_changes = os.getenv('TRACK_PAGE_CHANGES', 'false').lower() in ('1', 'true', 'yes')
+        self.page_tracker = None
+        self.last_page_diff = None
+        if track_page_changes:
+            from page_diff import PageTracker
+
+            self.page_tracker = PageTracker(f"{os.path.splitext(data_file)[0]}_page.json", self.url)
+            # The records come from the whole page
+            self.stop_at_match = False
+        # Optionally hash the PDFs linked from the selected block (or the page), see pdf_tracker.py
+        if track_documents is None:
+            track_documents = os.getenv('TRACK_DOCUMENTS', 'false').lower() in ('1', 'true', 'yes')
+        self.document_tracker = None
+        self.last_document_links: List[str] = []
+        self.last_document_results = []
+        if track_documents:
+            from pdf_tracker import DocumentTracker
+
+            self.document_tracker = DocumentTracker(self.history, target_name, timeout=timeout)
+            self.stop_at_match = False
+        # Optional parse_pool.ParsePool, shared by the targets of a monitor engine
+        self.parse_pool = parse_pool
+        # Optional parse_cache.ParseCache (PARSE_CACHE_SIZE): a body parsed before is not parsed again.
+        # Results are keyed by the hash of the whole body, so the whole body is read.
+        self.parse_cache = parse_cache if parse_cache is not None else create_parse_cache()
+        self._extractor_version: Optional[str] = None
+        if self.parse_cache is not None:
+            self.stop_at_match = False
+        # Optional snapshot_archive.SnapshotArchive (SNAPSHOT_ARCHIVE_DIR) keeping every distinct page body
+        self.archive = archive if archive is not None else create_snapshot_archive()
+        if self.archive is not None:
+            self.stop_at_match = False
+
+    @property
+    def extractor_version(self) -> str:
+        """Parse cache key part: the extraction code version and everything configuring the extraction."""
+        if self._extractor_version is None:
+            from extraction import EXTRACTOR_VERSION
+
+            config = repr((self.url, self.pattern.pattern, self.pattern.flags, self.selector))
+            self._extractor_version = f"{EXTRACTOR_VERSION}-{hashlib.blake2b(config.encode(), digest_size=8).hexdigest()}"
+        return self._extractor_version
+
+    @property
+    def session(self) -> Any:
+        if self._session is None:
+            from transport import create_session
+
+            self._session = create_session(user_agent=USER_AGENT)
+        return self._session
+
+    def load_http_cache(self) -> dict:
+        """
+        Load the HTTP validators and cached SB number from the last successful fetch.
+        
+        Returns:
+            dict: The cached validators, or an empty dict if none are stored for this URL
+        """
+        try:
+            cache = self.http_cache.read()
+            if cache and cache.get('url') == self.url:
+                return cache
+        except Exception as e:
+            logging.error(f"Error loading HTTP cache: {e}")
+        return {}
+
+    def save_http_cache(self, etag: Optional[str], last_modified: Optional[str],
+                        content_hash: Optional[str], sb_number: str, documents: Optional[List[str]] = None) -> None:
+        """
+        Save the HTTP validators of the current response together with the extracted SB number.
+        
+        Args:
+            etag (Optional[str]): ETag response header
+            last_modified (Optional[str]): Last-Modified response header
+            content_hash (Optional[str]): SHA-256 hex digest of the response body, None if it was not read to the end
+            sb_number (str): The SB number extracted from that body
+            documents (Optional[List[str]]): Linked document URLs found in that body, if tracked
+        """
+        try:
+            cache = {
+                'url': self.url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': content_hash,
+                'sb_number': sb_number,
+                'documents': documents,
+                'last_fetched': datetime.now().isoformat()
+            }
+            self.http_cache.write(cache)
+        except Exception as e:
+            logging.error(f"Error saving HTTP cache: {e}")
 
     def scrape_webpage(self) -> Optional[str]:
         """
         Scrape the webpage and extract the SB number from the MIR form line.
         
+        Sends If-None-Match / If-Modified-Since from the previous response; on a
+        304 (or an unchanged body hash) the cached SB number is returned without parsing.
+        The body is streamed into the parser and, once the value is found, the rest
+        of it is not downloaded.
+        
         Returns:
             Optional[str]: The extracted SB number or None if not found
         """
         try:
             logging.info(f"Scraping webpage: {self.url}")
-            response = self.session.get(self.url, timeout=30)
-            response.raise_for_status()
+            self.last_content_hash = None
+            self.last_page_diff = None
+            cache = self.load_http_cache()
+            headers = {}
+            # A cached response only helps document tracking if its document links were stored,
+            # and the archive if it already holds a copy of the page
+            if (cache.get('sb_number') and (self.document_tracker is None or cache.get('documents') is not None)
+                    and (self.archive is None or self.archive.has_snapshot(self.target_name))):
+                if cache.get('etag'):
+                    headers['If-None-Match'] = cache['etag']
+                if cache.get('last_modified'):
+                    headers['If-Modified-Since'] = cache['last_modified']
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for the specific line containing "New manufacturer incident report (MIR 7.3.1. PDF form - SB 10573)"
-            # We'll search for text containing "MIR 7.3.1" and "SB"
-            mir_pattern = re.compile(r'MIR 7\.3\.1.*?SB (\d+)', re.IGNORECASE)
-            
-            # Search in all text content
-            page_text = soup.get_text()
-            match = mir_pattern.search(page_text)
+            start = time.perf_counter()
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                return self._read_response(response, cache, time.perf_counter() - start)
+            finally:
+                # Drops the connection if the body was not read to the end
+                response.close()
+                
+        except Exception as e:
+            if _is_fetch_error(e):
+                logging.error(f"Error scraping webpage: {e}")
+            else:
+                logging.error(f"Unexpected error during scraping: {e}")
+            FETCH_ERRORS.inc(target=self.target_name)
+            return None
+
+    def _read_response(self, response: Any, cache: dict, fetch_seconds: float) -> Optional[str]:
+        """Handle a streamed response of scrape_webpage: 304, cap, hash shortcut and extraction."""
+        HTTP_RESPONSES.inc(target=self.target_name, code=str(response.status_code))
+        # elapsed runs until the response headers were parsed: DNS, connect, TLS and
+        # server time. The body is read afterwards, while it is parsed.
+        connect_seconds = response.elapsed.total_seconds()
+        SCRAPE_PHASE_SECONDS.observe(connect_seconds, target=self.target_name, phase='connect')
+        header_wait = max(fetch_seconds - connect_seconds, 0.0)
+        
+        if response.status_code == 304 and cache.get('sb_number'):
+            SCRAPE_PHASE_SECONDS.observe(header_wait, target=self.target_name, phase='download')
+            logging.info(f"Page not modified (304), using cached SB number: {cache['sb_number']}")
+            self.last_content_hash = cache.get('content_hash')
+            self.last_document_links = cache.get('documents') or []
+            if self.archive is not None:
+                try:
+                    self.archive.touch(self.target_name)
+                except Exception as e:
+                    logging.error(f"Error updating page archive: {e}")
+            return cache['sb_number']
+        
+        response.raise_for_status()
+        declared_length = response.headers.get('Content-Length', '')
+        if declared_length.isdigit() and int(declared_length) > self.max_body_bytes:
+            raise ResponseTooLarge(f"Response body of {declared_length} bytes exceeds {self.max_body_bytes} bytes")
+        
+        body = StreamedBody(response, self.max_body_bytes)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        content_type = response.headers.get('Content-Type', '')
+        encoding = response.encoding if 'charset' in content_type.lower() else None
+        try:
+            if not (etag or last_modified):
+                # Without validators the hash of the whole body is the only way to see it is unchanged
+                body.read()
+                if cache.get('sb_number') and body.hexdigest() == cache.get('content_hash'):
+                    self.last_content_hash = cache['content_hash']
+                    logging.info(f"Page content unchanged, using cached SB number: {cache['sb_number']}")
+                    self.last_document_links = cache.get('documents') or []
+                    self.archive_body(body)
+                    return cache['sb_number']
             
-            if match:
-                sb_number = match.group(1)
-                logging.info(f"Found SB number: {sb_number}")
-                return sb_number
+            cached = None
+            if self.parse_cache is not None:
+                body.read()
+                cached = self.parse_cache.get(self.target_name, self.extractor_version, body.hexdigest())
+            if cached is not None:
+                logging.info("Page body parsed before, using the cached extraction result")
+                sb_number = cached['value']
             else:
-                logging.warning("SB number not found in the webpage")
-                return None
-                
-        except requests.RequestException as e:
-            logging.error(f"Error scraping webpage: {e}")
+                sb_number = self.extract_value(body, encoding)
+            if not self.stop_at_match:
+                body.read()
+        finally:
+            self._observe_body(response, body, header_wait)
+        
+        # Only the hash of the whole body identifies the page; none is stored if the rest was skipped
+        content_hash = body.hexdigest() if body.complete else None
+        self.last_content_hash = content_hash
+        self.archive_body(body)
+        if self.page_tracker is not None:
+            try:
+                self.last_page_diff = self.page_tracker.check(body.read(), content_hash, encoding)
+            except Exception as e:
+                logging.error(f"Error comparing page records: {e}")
+        documents = None
+        if self.document_tracker is not None:
+            from pdf_tracker import document_links
+
+            if cached is not None and cached.get('documents') is not None:
+                documents = cached['documents']
+            else:
+                try:
+                    documents = document_links(body.read(), self.url, self.selector, encoding)
+                except Exception as e:
+                    logging.error(f"Error collecting document links: {e}")
+            self.last_document_links = documents or []
+        if self.parse_cache is not None and (cached is None or documents != cached.get('documents')):
+            self.parse_cache.put(self.target_name, self.extractor_version, content_hash,
+                                 {'value': sb_number, 'documents': documents})
+        if sb_number:
+            logging.info(f"Found SB number: {sb_number}")
+            self.save_http_cache(etag, last_modified, content_hash, sb_number, documents)
+            return sb_number
+        else:
+            logging.warning("SB number not found in the webpage")
             return None
+
+    def archive_body(self, body: StreamedBody) -> None:
+        """Store a fully read page body in the snapshot archive, if one is configured."""
+        if self.archive is None:
+            return
+        try:
+            self.archive.store(self.target_name, self.url, body.read(), body.hexdigest())
         except Exception as e:
-            logging.error(f"Unexpected error during scraping: {e}")
-            return None
+            logging.error(f"Error archiving page: {e}")
+
+    def _observe_body(self, response: Any, body: StreamedBody, header_wait: float) -> None:
+        SCRAPE_PHASE_SECONDS.observe(header_wait + body.read_seconds, target=self.target_name, phase='download')
+        SCRAPE_PHASE_SECONDS.observe(body.hash_seconds, target=self.target_name, phase='hash')
+        RESPONSE_BYTES.observe(body.size, target=self.target_name)
+        RESPONSE_DECODED_BYTES.inc(body.size, target=self.target_name)
+        try:
+            # urllib3 (and lite_http) count the bytes received before decoding
+            RESPONSE_WIRE_BYTES.inc(response.raw.tell(), target=self.target_name)
+        except (AttributeError, OSError):
+            pass
+
+    def extract_value(self, content: Union[bytes, StreamedBody], encoding: Optional[str] = None) -> Optional[str]:
+        """
+        Extract the tracked value from a page body.
+        
+        With a selector, only the text of the selected elements is searched. Otherwise,
+        or if no selected element matches, the streaming lxml text matcher searches the
+        whole page text without building a DOM, with the full BeautifulSoup page text
+        as the last resort. All paths stop reading at the first match. With a parse
+        pool, the whole body is read and parsed in a worker process instead.
+        
+        Args:
+            content (Union[bytes, StreamedBody]): The HTML body, or a streamed body that
+                is only read as far as the match
+            encoding (Optional[str]): Charset declared by the server, if any
+            
+        Returns:
+            Optional[str]: The first capture group of the pattern or None if not found
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        streamed = isinstance(content, StreamedBody)
+        io_before = content.io_seconds if streamed else 0.0
+        value = None
+        parsed = False
+        if self.parse_pool is not None:
+            # The parse worker needs the whole body, so there is no early exit
+            body = content.read() if streamed else content
+            try:
+                value = self.parse_pool.extract(body, self.pattern, self.selector, encoding, timings,
+                                                target=self.target_name)
+                parsed = True
+            except Exception as e:
+                logging.warning(f"Parse worker failed, parsing in this thread: {e}")
+        if not parsed:
+            # lxml and BeautifulSoup are only needed once a body has to be parsed
+            from extraction import extract
+
+            value = extract(content, self.pattern, self.selector, encoding, timings, reraise=(ResponseTooLarge,))
+        regex_seconds = timings.get('regex', 0.0)
+        # Reading a streamed body happens inside the parse; it is reported as download and hash
+        io_seconds = content.io_seconds - io_before if streamed else 0.0
+        SCRAPE_PHASE_SECONDS.observe(regex_seconds, target=self.target_name, phase='regex')
+        SCRAPE_PHASE_SECONDS.observe(max(time.perf_counter() - start - regex_seconds - io_seconds, 0.0),
+                                     target=self.target_name, phase='parse')
+        return value
 
     def load_previous_sb_number(self) -> Optional[str]:
         """
         Load the previously saved SB number from the data file.
         
+        Falls back to the latest value in the history store if the data file is
+        missing or unreadable.
+        
         Returns:
             Optional[str]: The previously saved SB number or None if not found
         """
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                    return data.get('sb_number')
-            return None
+            data = self.state.read()
+            if data is not None:
+                return data.get('sb_number')
         except Exception as e:
             logging.error(f"Error loading previous SB number: {e}")
+        
+        try:
+            return self.history.latest_value(self.target_name)
+        except Exception as e:
+            logging.error(f"Error loading previous SB number from history: {e}")
             return None
 
+    def record_check(self, status: str, current_sb: Optional[str], previous_sb: Optional[str],
+                     latency_ms: float) -> None:
+        """
+        Append the outcome of a check to the history store.
+        
+        Args:
+            status (str): One of initial, unchanged, updated or error
+            current_sb (Optional[str]): SB number found by the check
+            previous_sb (Optional[str]): SB number known before the check
+            latency_ms (float): Duration of the check in milliseconds
+        """
+        try:
+            self.history.record_check(
+                self.target_name, status, sb_number=current_sb, previous_sb=previous_sb,
+                latency_ms=latency_ms, content_hash=self.last_content_hash
+            )
+        except Exception as e:
+            logging.error(f"Error recording check in history: {e}")
+
     def save_sb_number(self, sb_number: str) -> None:
         """
         Save the current SB number to the data file.
@@ -94,13 +499,34 @@ class PMSVScraper:
                 'timestamp': datetime.now().timestamp()
             }
             
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            self.state.write(data)
             
             logging.info(f"Saved SB number: {sb_number}")
         except Exception as e:
             logging.error(f"Error saving SB number: {e}")
 
+    def check_documents(self) -> None:
+        """Check the linked documents of the last scrape for changes, if document tracking is on."""
+        self.last_document_results = []
+        if self.document_tracker is None or not self.last_document_links:
+            return
+        try:
+            self.last_document_results = self.document_tracker.check(self.session, self.last_document_links)
+        except Exception as e:
+            logging.error(f"Error checking linked documents: {e}")
+
+    def change_summary(self) -> List[str]:
+        """
+        Changes found by the last check besides the SB number.
+        
+        Returns:
+            List[str]: Changed page records (TRACK_PAGE_CHANGES) and linked
+                documents (TRACK_DOCUMENTS), one line each
+        """
+        lines = self.last_page_diff.summary_lines() if self.last_page_diff else []
+        lines.extend(result.describe() for result in self.last_document_results if result.status == STATUS_UPDATED)
+        return lines
+
     def check_for_updates(self) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Check if the SB number has been updated.
@@ -111,25 +537,43 @@ class PMSVScraper:
                 - Current SB number
                 - Previous SB number
         """
-        current_sb = self.scrape_webpage()
-        previous_sb = self.load_previous_sb_number()
-        
-        if current_sb is None:
-            logging.error("Could not retrieve current SB number")
-            return False, None, previous_sb
-        
-        if previous_sb is None:
-            logging.info(f"First run - saving initial SB number: {current_sb}")
-            self.save_sb_number(current_sb)
-            return False, current_sb, None
-        
-        if current_sb != previous_sb:
-            logging.info(f"SB number updated! Previous: {previous_sb}, Current: {current_sb}")
-            self.save_sb_number(current_sb)
-            return True, current_sb, previous_sb
-        else:
-            logging.info(f"SB number unchanged: {current_sb}")
-            return False, current_sb, previous_sb
+        start = time.perf_counter()
+        status = STATUS_ERROR
+        try:
+            self.last_document_links = []
+            self.last_document_results = []
+            current_sb = self.scrape_webpage()
+            latency_ms = (time.perf_counter() - start) * 1000
+            previous_sb = self.load_previous_sb_number()
+            if current_sb is not None:
+                self.check_documents()
+            
+            if current_sb is None:
+                logging.error("Could not retrieve current SB number")
+                self.record_check(status, None, previous_sb, latency_ms)
+                return False, None, previous_sb
+            
+            if previous_sb is None:
+                logging.info(f"First run - saving initial SB number: {current_sb}")
+                status = STATUS_INITIAL
+                self.save_sb_number(current_sb)
+                self.record_check(status, current_sb, None, latency_ms)
+                return False, current_sb, None
+            
+            if current_sb != previous_sb:
+                logging.info(f"SB number updated! Previous: {previous_sb}, Current: {current_sb}")
+                status = STATUS_UPDATED
+                self.save_sb_number(current_sb)
+                self.record_check(status, current_sb, previous_sb, latency_ms)
+                return True, current_sb, previous_sb
+            else:
+                logging.info(f"SB number unchanged: {current_sb}")
+                status = STATUS_UNCHANGED
+                self.record_check(status, current_sb, previous_sb, latency_ms)
+                return False, current_sb, previous_sb
+        finally:
+            CHECK_SECONDS.observe(time.perf_counter() - start, target=self.target_name, status=status)
+            LAST_CHECK.set(time.time(), target=self.target_name, status=status)
 
 def main():
     """Main function for testing the scraper."""
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+from history_store import STATUS_ERROR, STATUS_INITIAL, STATUS_UNCHANGED, STATUS_UPDATED
+from log_buffer import level_number
+from scraper import PMSVScraper
+
+
+class ScraperService:
+    """
+    One scraper and one monitoring thread shared by every dashboard session.
+
+    The dashboard keeps a single instance per process (st.cache_resource), so
+    the EC site is checked on one schedule no matter how many browsers have the
+    dashboard open. Results go to the history store and to an in-memory snapshot
+    that sessions read instead of scraping themselves. Manual checks are
+    serialized, and a check requested while a recent result exists reuses it.
+    """
+
+    def __init__(self, scraper: Optional[PMSVScraper] = None,
+                 next_interval: Optional[Callable[[], float]] = None,
+                 log: Optional[Callable[[str, str], None]] = None, recent_size: int = 50):
+        self.scraper = scraper or PMSVScraper()
+        self.next_interval = next_interval or (lambda: 300)
+        self._log = log
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent_size)
+        self.last_check: Optional[datetime] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.checks = 0
+
+        self._check_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def log(self, message: str, level: str = "INFO") -> None:
+        if self._log:
+            self._log(message, level)
+        else:
+            logging.log(level_number(level), message)
+
+    @property
+    def monitoring(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self) -> bool:
+        """
+        Start the shared monitoring thread.
+
+        Returns:
+            bool: False if monitoring was already running
+        """
+        with self._state_lock:
+            if self.monitoring:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._monitor_loop, name='dashboard-monitor', daemon=True)
+            self._thread.start()
+        self.log("Starting continuous monitoring...")
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the monitoring thread; a check in progress is allowed to finish."""
+        with self._state_lock:
+            thread = self._thread
+            self._stop.set()
+        if thread is not None:
+            self.log("Stopping continuous monitoring...")
+            thread.join(timeout)
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.is_set():
+            self.check_now()
+            try:
+                interval = self.next_interval()
+            except Exception as e:
+                logging.error(f"Could not compute monitoring interval: {e}")
+                interval = 300
+            self._stop.wait(interval)
+
+    def check_now(self, max_age: float = 0) -> Dict[str, Any]:
+        """
+        Run one check, unless another one finished less than max_age seconds ago.
+
+        Args:
+            max_age (float): Reuse the last result if it is at most this old
+
+        Returns:
+            Dict[str, Any]: The check result (timestamp, sb_number, previous_sb, status)
+        """
+        with self._check_lock:
+            if self.last_result is not None and time.time() - self.last_result['unix_timestamp'] <= max_age:
+                return self.last_result
+
+            self.log("Fetching webpage content...")
+            try:
+                updated, current_sb, previous_sb = self.scraper.check_for_updates()
+            except Exception as e:
+                self.log(f"Error during scraping: {e}", "ERROR")
+                current_sb, previous_sb, updated = None, None, False
+
+            if not current_sb:
+                status = STATUS_ERROR
+                self.log("Failed to extract SB number from webpage", "ERROR")
+            elif updated:
+                status = STATUS_UPDATED
+                self.log(f"UPDATE DETECTED! Previous: {previous_sb}, Current: {current_sb}", "WARNING")
+            elif previous_sb:
+                status = STATUS_UNCHANGED
+                self.log(f"No change detected. Current SB number: {current_sb}")
+            else:
+                status = STATUS_INITIAL
+                self.log(f"First run - saving initial SB number: {current_sb}")
+
+            now = datetime.now()
+            result = {
+                'timestamp': now,
+                'unix_timestamp': now.timestamp(),
+                'sb_number': current_sb,
+                'previous_sb': previous_sb,
+                'status': status
+            }
+            with self._state_lock:
+                self.checks += 1
+                self.last_check = now
+                self.last_result = result
+                if current_sb:
+                    self.recent.append(result)
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a consistent copy of the shared state for rendering."""
+        with self._state_lock:
+            return {
+                'monitoring': self.monitoring,
+                'checks': self.checks,
+                'last_check': self.last_check,
+                'last_result': self.last_result,
+                'recent': list(self.recent)
+            }
@@ -0,0 +1,177 @@
+import logging
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import List, Optional
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """True if the session is dead and should be re-established."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 421: service not available, closing transmission channel
+        return error.smtp_code == 421
+    # SMTPException derives from OSError; anything else OSError is a socket failure
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionManager:
+    """
+    Keeps one authenticated SMTP session alive and reuses it for every message.
+
+    The session is opened lazily, kept alive with NOOP while idle for up to
+    max_idle seconds and transparently re-established (once per send) if the
+    server dropped it. Messages can also be queued and flushed over the session
+    in one go.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = True, timeout: float = 30,
+                 keepalive_interval: float = 60, max_idle: float = 300):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        self.handshakes = 0
+
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._queue: List[Message] = []
+        self._lock = threading.RLock()
+        self._keepalive_thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls()
+                server.ehlo()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.handshakes += 1
+        logging.info(f"Opened SMTP session to {self.host}:{self.port}")
+        return server
+
+    def _disconnect(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                self._server.close()
+            self._server = None
+
+    def _ensure_connection(self) -> smtplib.SMTP:
+        idle = time.monotonic() - self._last_used
+        if self._server is not None and idle > self.keepalive_interval:
+            # The server may have timed the session out while we were idle
+            try:
+                if self._server.noop()[0] != 250:
+                    self._disconnect()
+            except Exception as e:
+                if not _is_connection_error(e):
+                    raise
+                self._server.close()
+                self._server = None
+        if self._server is None:
+            self._server = self._connect()
+            self._start_keepalive()
+        self._last_used = time.monotonic()
+        return self._server
+
+    def _start_keepalive(self) -> None:
+        if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+            return
+        self._closed.clear()
+        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name='smtp-keepalive', daemon=True)
+        self._keepalive_thread.start()
+
+    def _keepalive_loop(self) -> None:
+        while not self._closed.wait(self.keepalive_interval):
+            with self._lock:
+                if self._server is None:
+                    return
+                idle = time.monotonic() - self._last_used
+                if idle > self.max_idle:
+                    logging.info("Closing idle SMTP session")
+                    self._disconnect()
+                    return
+                try:
+                    self._server.noop()
+                except Exception as e:
+                    logging.info(f"SMTP keepalive failed, closing the session: {e}")
+                    self._server.close()
+                    self._server = None
+                    return
+
+    def send(self, msg: Message) -> None:
+        """
+        Send a message over the shared session.
+
+        Raises:
+            smtplib.SMTPException: If the message could not be sent after one reconnect
+        """
+        with self._lock:
+            for attempt in range(2):
+                server = self._ensure_connection()
+                try:
+                    server.send_message(msg)
+                    return
+                except Exception as e:
+                    if not _is_connection_error(e):
+                        raise
+                    server.close()
+                    self._server = None
+                    if attempt:
+                        raise
+                    logging.warning(f"SMTP session lost ({e}), reconnecting")
+
+    def queue(self, msg: Message) -> None:
+        """Queue a message to be sent by the next flush()."""
+        with self._lock:
+            self._queue.append(msg)
+
+    def flush(self) -> int:
+        """
+        Send all queued messages over one session, in order.
+
+        send() already reconnects once; if a message still fails, it and the
+        messages after it are dropped and logged rather than left for an
+        unrelated later flush. Callers that must deliver them (the notification
+        dispatcher) resend everything after the first `sent` messages.
+
+        Returns:
+            int: Number of messages sent
+        """
+        with self._lock:
+            sent = 0
+            while self._queue:
+                try:
+                    self.send(self._queue[0])
+                except Exception as e:
+                    logging.error(f"Failed to flush queued email, dropping {len(self._queue)} unsent message(s): {e}")
+                    self._queue.clear()
+                    break
+                self._queue.pop(0)
+                sent += 1
+            return sent
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def close(self) -> None:
+        """Close the session and stop the keepalive thread."""
+        self._closed.set()
+        with self._lock:
+            self._disconnect()
@@ -0,0 +1,293 @@
+import gzip
+import hashlib
+import importlib.util
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+CODEC_GZIP = 'gzip'
+CODEC_ZSTD = 'zstd'
+CODECS = (CODEC_GZIP, CODEC_ZSTD)
+_SUFFIXES = {CODEC_GZIP: '.gz', CODEC_ZSTD: '.zst'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content_hash TEXT NOT NULL REFERENCES blobs(content_hash),
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    checks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_target_first_seen ON snapshots(target, first_seen);
+CREATE INDEX IF NOT EXISTS idx_snapshots_content_hash ON snapshots(content_hash);
+"""
+
+_SNAPSHOT_COLUMNS = "id, target, url, content_hash, first_seen, last_seen, checks"
+
+
+def default_codec() -> str:
+    """zstd if the zstandard package is installed, gzip otherwise."""
+    return CODEC_ZSTD if importlib.util.find_spec('zstandard') is not None else CODEC_GZIP
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    # Each version is compressed once and kept for years, so the slowest levels are worth it
+    if codec == CODEC_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotArchive:
+    """
+    Archive of every distinct page body, for "the page as of date X".
+
+    Bodies are content-addressed: each is compressed and stored once, as
+    blobs/<first two hex digits>/<sha256>.gz (or .zst), however often and
+    for however many targets it was fetched. The SQLite index has one row per
+    run of identical checks of a target (content hash, first and last time
+    seen, number of checks), so both the blobs and the index grow with the
+    number of page versions rather than the number of checks.
+
+    Args:
+        directory (str): Directory for the index (index.db) and the blobs
+        codec (Optional[str]): Compression of new blobs, gzip or zstd
+            (SNAPSHOT_CODEC, default zstd if the zstandard package is installed)
+    """
+
+    def __init__(self, directory: str, codec: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.codec = (codec or os.getenv('SNAPSHOT_CODEC') or default_codec()).lower()
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown SNAPSHOT_CODEC {self.codec!r}, expected one of {', '.join(CODECS)}")
+        self.clock = clock
+        self.db_path = os.path.join(directory, 'index.db')
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front, so store() and compact() never interleave
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def blob_path(self, content_hash: str, codec: str) -> str:
+        return os.path.join(self.directory, 'blobs', content_hash[:2], content_hash + _SUFFIXES[codec])
+
+    def _write_blob(self, content_hash: str, content: bytes) -> int:
+        path = self.blob_path(content_hash, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = compress(content, self.codec)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return len(data)
+
+    def store(self, target: str, url: str, content: bytes, content_hash: Optional[str] = None,
+              timestamp: Optional[float] = None) -> str:
+        """
+        Record that a check of target fetched content.
+
+        Args:
+            target (str): Name of the monitored target
+            url (str): URL the body was fetched from
+            content (bytes): The whole page body
+            content_hash (Optional[str]): SHA-256 hex digest of content, computed if not given
+            timestamp (Optional[float]): Unix time of the check, defaults to now
+
+        Returns:
+            str: The content hash the body is stored under
+        """
+        content_hash = content_hash or hashlib.sha256(content).hexdigest()
+        timestamp = timestamp if timestamp is not None else self.clock()
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone() is None:
+                stored_size = self._write_blob(content_hash, content)
+                conn.execute("INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                             (content_hash, self.codec, len(content), stored_size, timestamp))
+                logging.info(f"Archived new page version {content_hash[:12]} of {target} "
+                             f"({len(content)} bytes, {stored_size} stored)")
+            latest = conn.execute(
+                "SELECT id, content_hash FROM snapshots WHERE target = ? ORDER BY first_seen DESC, id DESC LIMIT 1",
+                (target,)
+            ).fetchone()
+            if latest is not None and latest['content_hash'] == content_hash:
+                conn.execute("UPDATE snapshots SET last_seen = MAX(last_seen, ?), checks = checks + 1 WHERE id = ?",
+                             (timestamp, latest['id']))
+            else:
+                conn.execute(
+                    "INSERT INTO snapshots (target, url, content_hash, first_seen, last_seen, checks) "
+                    "VALUES (?, ?, ?, ?, ?, 1)",
+                    (target, url, content_hash, timestamp, timestamp)
+                )
+        return content_hash
+
+    def touch(self, target: str, timestamp: Optional[float] = None) -> bool:
+        """
+        Record a check that found the page unchanged without reading it (e.g. 304 Not Modified).
+
+        Returns:
+            bool: False if the target has no snapshot to extend
+        """
+        timestamp = timestamp if timestamp is not None else self.clock()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE snapshots SET last_seen = MAX(last_seen, ?), checks = checks + 1 WHERE id = "
+                "(SELECT id FROM snapshots WHERE target = ? ORDER BY first_seen DESC, id DESC LIMIT 1)",
+                (timestamp, target)
+            )
+            return cursor.rowcount > 0
+
+    def has_snapshot(self, target: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM snapshots WHERE target = ? LIMIT 1", (target,)).fetchone() is not None
+
+    def snapshot_as_of(self, target: str, when: float) -> Optional[Dict]:
+        """
+        Return the index row of the version a target was serving at a point in time.
+
+        Args:
+            target (str): Name of the monitored target
+            when (float): Unix time
+
+        Returns:
+            Optional[Dict]: The latest snapshot first seen at or before when (its last_seen
+                tells whether it was still confirmed then), or None if there is none
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_SNAPSHOT_COLUMNS} FROM snapshots WHERE target = ? AND first_seen <= ? "
+                "ORDER BY first_seen DESC, id DESC LIMIT 1",
+                (target, when)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def read_blob(self, content_hash: str) -> bytes:
+        """Return the page body stored under a content hash."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT codec FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            raise KeyError(content_hash)
+        with open(self.blob_path(content_hash, row['codec']), 'rb') as f:
+            return decompress(f.read(), row['codec'])
+
+    def page_as_of(self, target: str, when: float) -> Optional[bytes]:
+        """Return the page body a target was serving at a point in time, or None if it predates the archive."""
+        snapshot = self.snapshot_as_of(target, when)
+        return self.read_blob(snapshot['content_hash']) if snapshot else None
+
+    def versions(self, target: Optional[str] = None) -> List[Dict]:
+        """Return the index rows, oldest first, for one target or all of them."""
+        query = f"SELECT {_SNAPSHOT_COLUMNS} FROM snapshots"
+        params: tuple = ()
+        if target is not None:
+            query += " WHERE target = ?"
+            params = (target,)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY target, first_seen, id", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def compact(self, keep_seconds: float, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Apply retention and reclaim space.
+
+        Drops the snapshots last seen before the retention window, except the latest
+        one of each target, deletes the blobs no snapshot refers to any more and
+        vacuums the index.
+
+        Args:
+            keep_seconds (float): Retention window
+            now (Optional[float]): End of the window, defaults to now
+
+        Returns:
+            Dict[str, int]: snapshots_removed, blobs_removed and bytes_freed
+        """
+        cutoff = (now if now is not None else self.clock()) - keep_seconds
+        with self._transaction() as conn:
+            snapshots_removed = conn.execute(
+                "DELETE FROM snapshots WHERE last_seen < ? AND id NOT IN "
+                "(SELECT id FROM snapshots AS s WHERE s.first_seen = "
+                "(SELECT MAX(first_seen) FROM snapshots WHERE target = s.target))",
+                (cutoff,)
+            ).rowcount
+            orphans = conn.execute(
+                "SELECT content_hash, codec, stored_size FROM blobs WHERE content_hash NOT IN "
+                "(SELECT content_hash FROM snapshots)"
+            ).fetchall()
+            conn.executemany("DELETE FROM blobs WHERE content_hash = ?", [(row['content_hash'],) for row in orphans])
+            # Still under the write lock, so a store() of the same body cannot rewrite a file deleted here
+            bytes_freed = 0
+            for row in orphans:
+                try:
+                    os.unlink(self.blob_path(row['content_hash'], row['codec']))
+                    bytes_freed += row['stored_size']
+                except FileNotFoundError:
+                    pass
+        with self._connect() as conn:
+            conn.execute("VACUUM")
+        logging.info(f"Archive compacted: {snapshots_removed} snapshot(s) and {len(orphans)} blob(s) removed, "
+                     f"{bytes_freed} bytes freed")
+        return {'snapshots_removed': snapshots_removed, 'blobs_removed': len(orphans), 'bytes_freed': bytes_freed}
+
+    def stats(self) -> Dict[str, int]:
+        """Number of snapshots and blobs, and the page bytes archived vs. stored on disk."""
+        with self._connect() as conn:
+            snapshots, checks = conn.execute("SELECT COUNT(*), COALESCE(SUM(checks), 0) FROM snapshots").fetchone()
+            blobs, size, stored_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+        return {'snapshots': snapshots, 'checks': checks, 'blobs': blobs, 'bytes': size, 'stored_bytes': stored_size}
+
+
+def create_snapshot_archive(directory: Optional[str] = None) -> Optional[SnapshotArchive]:
+    """
+    Create the snapshot archive from an argument or SNAPSHOT_ARCHIVE_DIR.
+
+    Returns:
+        Optional[SnapshotArchive]: None if no archive directory is configured
+    """
+    directory = directory or os.getenv('SNAPSHOT_ARCHIVE_DIR')
+    return SnapshotArchive(directory) if directory else None
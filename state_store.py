@@ -0,0 +1,175 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None
+
+# Durability modes for StateFile.write
+DURABILITY_NONE = 'none'        # atomic rename only; survives a process kill, not a power loss
+DURABILITY_FSYNC = 'fsync'      # file and directory are fsynced around the rename
+DURABILITY_JOURNAL = 'journal'  # fsynced journal record first, replayed at startup if the rename was cut short
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_FSYNC, DURABILITY_JOURNAL)
+
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on some platforms (e.g. Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _directory_lock(directory: str) -> Iterator[None]:
+    """
+    Hold an exclusive flock on a directory.
+
+    Writes and recovery take it, so a process starting up (a one-shot check next
+    to the service, or a replica on a shared volume) never removes a temporary
+    file or journal that a live writer is still using. The lock goes away with
+    the process, so files left behind by a killed writer are cleaned up.
+    """
+    if fcntl is None:
+        yield
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Missing directory (nothing to protect yet) or a platform that cannot open directories
+        yield
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _checksum(payload: str) -> str:
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StateFile:
+    """
+    JSON state file that is never left truncated.
+
+    Writes go to a temporary file in the same directory which is then renamed
+    over the target, so readers see either the old or the new content. In
+    journal mode the new content is first written to a checksummed journal that
+    is replayed by recover() if the process died before the rename completed.
+    """
+
+    def __init__(self, path: str, durability: str = DURABILITY_FSYNC):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.path = path
+        self.durability = durability
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.journal_path = f"{path}.journal"
+        self.recover()
+
+    def _write_atomic(self, payload: str, fsync: bool) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{os.path.basename(self.path)}.",
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(payload)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if fsync:
+            _fsync_directory(self.directory)
+
+    def write(self, data: Dict[str, Any]) -> None:
+        """
+        Atomically replace the state file with data.
+
+        Args:
+            data (Dict[str, Any]): JSON-serializable state
+        """
+        payload = json.dumps(data, indent=2)
+        with _directory_lock(self.directory):
+            if self.durability == DURABILITY_JOURNAL:
+                record = json.dumps({'checksum': _checksum(payload), 'payload': payload})
+                with open(self.journal_path, 'w') as f:
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                _fsync_directory(self.directory)
+                self._write_atomic(payload, fsync=True)
+                os.unlink(self.journal_path)
+            else:
+                self._write_atomic(payload, fsync=self.durability == DURABILITY_FSYNC)
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """
+        Read the state file.
+
+        Returns:
+            Optional[Dict[str, Any]]: The stored state, or None if the file does not exist
+
+        Raises:
+            ValueError: If the file exists but does not contain valid JSON
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def recover(self) -> bool:
+        """
+        Finish or discard an interrupted write.
+
+        Leftover temporary files are removed. A complete journal record is applied
+        to the state file; a torn one is discarded, leaving the previous state intact.
+        Runs under the directory lock, so files of writers that are still alive are
+        never touched.
+
+        Returns:
+            bool: True if a journal record was replayed
+        """
+        with _directory_lock(self.directory):
+            return self._recover()
+
+    def _recover(self) -> bool:
+        for tmp_path in glob.glob(os.path.join(self.directory, f"{glob.escape(os.path.basename(self.path))}.*.tmp")):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+        if not os.path.exists(self.journal_path):
+            return False
+
+        replayed = False
+        try:
+            with open(self.journal_path, 'r') as f:
+                record = json.load(f)
+            payload = record['payload']
+            if record['checksum'] == _checksum(payload):
+                self._write_atomic(payload, fsync=True)
+                replayed = True
+                logging.info(f"Recovered state file {self.path} from journal")
+            else:
+                logging.warning(f"Discarding journal with bad checksum for {self.path}")
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Discarding torn journal for {self.path}: {e}")
+        os.unlink(self.journal_path)
+        return replayed
@@ -6,8 +6,11 @@ from datetime import datetime, timedelta
 import json
 import os
 import time
-import threading
 from scraper import PMSVScraper
+from scraper_service import ScraperService
+from history_store import ChangeFeed
+from log_buffer import LogTail, install_ring_buffer, level_number
+from adaptive_polling import AdaptivePollingPolicy, load_change_times
 import logging
 from io import StringIO
 import sys
@@ -71,120 +74,108 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class StreamlitLogger:
-    def __init__(self):
-        self.log_buffer = []
-        self.max_logs = 100
+    """Sends dashboard messages to the logging module and shows this session's view of the shared log."""
+    def __init__(self, max_logs=100):
+        self.logger = logging.getLogger('dashboard')
+        self.logger.setLevel(logging.INFO)
+        # Same in-memory handler scraper.py logs to, so scraper output shows up here too
+        self.tail = LogTail(install_ring_buffer(), max_logs)
     
     def log(self, message, level="INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {level}: {message}"
-        self.log_buffer.append(log_entry)
-        
-        # Keep only the last max_logs entries
-        if len(self.log_buffer) > self.max_logs:
-            self.log_buffer = self.log_buffer[-self.max_logs:]
+        self.logger.log(level_number(level), message)
     
     def get_logs(self):
-        return "\n".join(self.log_buffer)
+        # Only entries newer than the last render are fetched; the text is rejoined only if there were any
+        self.tail.poll()
+        return self.tail.text()
+    
+    def clear(self):
+        self.tail.clear()
+
+@st.cache_resource
+def get_scraper_service():
+    """The one scraper service of this process; every session reads its results."""
+    service = ScraperService(PMSVScraper())
+    service.next_interval = lambda: polling_policy(service.scraper).next_interval(time.time())
+    return service
+
+# Manual scrapes within this many seconds of the last check reuse its result
+MANUAL_SCRAPE_MAX_AGE = 30
 
-# Initialize session state
+service = get_scraper_service()
 if 'logger' not in st.session_state:
     st.session_state.logger = StreamlitLogger()
-if 'scraper' not in st.session_state:
-    st.session_state.scraper = PMSVScraper()
-if 'monitoring' not in st.session_state:
-    st.session_state.monitoring = False
-if 'last_check' not in st.session_state:
-    st.session_state.last_check = None
-if 'check_history' not in st.session_state:
-    st.session_state.check_history = []
+logger = st.session_state.logger
 
-def load_historical_data():
-    """Load historical data from the JSON file and create a DataFrame."""
+@st.cache_resource
+def get_change_feed():
+    """Change rows of the monitored target, shared by all sessions and fetched incrementally."""
+    return ChangeFeed(service.scraper.history, service.scraper.target_name)
+
+def history_version():
+    """Cache key for the history: changes whenever the history database or legacy data file is written."""
+    legacy = os.path.getmtime('sb_number_data.json') if os.path.exists('sb_number_data.json') else 0.0
+    return service.scraper.history.data_version(), legacy
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_historical_data(version):
+    """Load the SB number changes from the history store and create a DataFrame."""
     try:
+        # Only change rows newer than the last seen row id are read, so refresh
+        # cost does not grow with the number of checks in the log.
+        feed = get_change_feed()
+        feed.refresh()
+        if feed.rows:
+            df = pd.DataFrame(feed.rows)[['sb_number', 'timestamp', 'status', 'latency_ms']]
+            df['unix_timestamp'] = df['timestamp']
+            # Naive local time, like last_updated in the data file and datetime.now() below
+            df['timestamp'] = pd.to_datetime(df['timestamp'].map(datetime.fromtimestamp))
+            return df
+        
+        # Data file written before the history store existed
         if os.path.exists('sb_number_data.json'):
             with open('sb_number_data.json', 'r') as f:
                 data = json.load(f)
-                if isinstance(data, dict):
-                    # Single entry format
-                    return pd.DataFrame([{
-                        'sb_number': data.get('sb_number'),
-                        'timestamp': pd.to_datetime(data.get('last_updated')),
-                        'unix_timestamp': data.get('timestamp')
-                    }])
-                else:
-                    # Multiple entries format
-                    return pd.DataFrame(data)
+                return pd.DataFrame([{
+                    'sb_number': data.get('sb_number'),
+                    'timestamp': pd.to_datetime(data.get('last_updated')),
+                    'unix_timestamp': data.get('timestamp')
+                }])
     except Exception as e:
-        st.session_state.logger.log(f"Error loading historical data: {e}", "ERROR")
+        logging.error(f"Error loading historical data: {e}")
     return pd.DataFrame()
 
-def perform_scrape():
-    """Perform a single scrape operation with detailed logging."""
-    st.session_state.logger.log("Starting manual scrape operation...", "INFO")
-    
-    try:
-        # Scrape the webpage
-        st.session_state.logger.log("Fetching webpage content...", "INFO")
-        current_sb = st.session_state.scraper.scrape_webpage()
-        
-        if current_sb:
-            st.session_state.logger.log(f"Successfully extracted SB number: {current_sb}", "SUCCESS")
-            
-            # Load previous data
-            previous_sb = st.session_state.scraper.load_previous_sb_number()
-            
-            if previous_sb:
-                if current_sb != previous_sb:
-                    st.session_state.logger.log(f"UPDATE DETECTED! Previous: {previous_sb}, Current: {current_sb}", "WARNING")
-                    st.session_state.scraper.save_sb_number(current_sb)
-                    st.session_state.logger.log("New SB number saved to database", "INFO")
-                else:
-                    st.session_state.logger.log(f"No change detected. Current SB number: {current_sb}", "INFO")
-            else:
-                st.session_state.logger.log(f"First run - saving initial SB number: {current_sb}", "INFO")
-                st.session_state.scraper.save_sb_number(current_sb)
-            
-            # Update check history
-            check_result = {
-                'timestamp': datetime.now(),
-                'sb_number': current_sb,
-                'previous_sb': previous_sb,
-                'status': 'updated' if previous_sb and current_sb != previous_sb else 'unchanged'
-            }
-            st.session_state.check_history.append(check_result)
-            
-            # Keep only last 50 entries
-            if len(st.session_state.check_history) > 50:
-                st.session_state.check_history = st.session_state.check_history[-50:]
-            
-            st.session_state.last_check = datetime.now()
-            return True, current_sb, previous_sb
-        else:
-            st.session_state.logger.log("Failed to extract SB number from webpage", "ERROR")
-            return False, None, None
-            
-    except Exception as e:
-        st.session_state.logger.log(f"Error during scraping: {str(e)}", "ERROR")
-        return False, None, None
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_timeline_figure(version):
+    """Build the SB number timeline chart; rebuilt only when the history changes."""
+    fig = px.line(
+        load_historical_data(version), 
+        x='timestamp', 
+        y='sb_number',
+        title="SB Number Timeline",
+        labels={'sb_number': 'SB Number', 'timestamp': 'Date'},
+        markers=True
+    )
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="SB Number",
+        hovermode='x unified'
+    )
+    return fig
 
-def start_monitoring():
-    """Start continuous monitoring in a separate thread."""
-    st.session_state.monitoring = True
-    st.session_state.logger.log("Starting continuous monitoring...", "INFO")
-    
-    def monitor_loop():
-        while st.session_state.monitoring:
-            perform_scrape()
-            time.sleep(300)  # Check every 5 minutes
-    
-    thread = threading.Thread(target=monitor_loop, daemon=True)
-    thread.start()
+def perform_scrape():
+    """Run a manual check through the shared service."""
+    logger.log("Starting manual scrape operation...", "INFO")
+    result = service.check_now(max_age=MANUAL_SCRAPE_MAX_AGE)
+    if result['sb_number']:
+        return True, result['sb_number'], result['previous_sb']
+    return False, None, None
 
-def stop_monitoring():
-    """Stop continuous monitoring."""
-    st.session_state.monitoring = False
-    st.session_state.logger.log("Stopping continuous monitoring...", "INFO")
+def polling_policy(scraper):
+    """Build the adaptive polling policy from the recorded SB number updates."""
+    changes = load_change_times(scraper.history, [scraper.target_name])
+    # Dashboard monitoring polls between every 5 minutes and every hour
+    return AdaptivePollingPolicy(changes, min_interval=300, max_interval=3600, base_interval=900, now=time.time())
 
 # Main app layout
 st.markdown('<h1 class="main-header">🔍 PMSV Scraper Monitor</h1>', unsafe_allow_html=True)
@@ -206,21 +197,32 @@ with st.sidebar:
     # Monitoring controls
     st.subheader("📡 Monitoring")
     
+    # Monitoring is shared: starting or stopping it applies to every viewer
     col1, col2 = st.columns(2)
     with col1:
-        if not st.session_state.monitoring:
+        if not service.monitoring:
             if st.button("▶️ Start Monitoring", use_container_width=True):
-                start_monitoring()
+                service.start()
     with col2:
-        if st.session_state.monitoring:
+        if service.monitoring:
             if st.button("⏹️ Stop Monitoring", use_container_width=True):
-                stop_monitoring()
+                service.stop()
+    
+    snapshot = service.snapshot()
     
     # Monitoring status
-    if st.session_state.monitoring:
+    if snapshot['monitoring']:
         st.success("🟢 Monitoring Active")
     else:
         st.info("⚪ Monitoring Inactive")
+    if snapshot['last_check']:
+        st.caption(f"Last check: {snapshot['last_check'].strftime('%H:%M:%S')}")
+    
+    try:
+        st.caption(f"Predicted change probability (next 24h): "
+                   f"{polling_policy(service.scraper).change_probability(time.time()):.1%}")
+    except Exception as e:
+        logger.log(f"Error predicting change probability: {e}", "ERROR")
     
     st.divider()
     
@@ -229,121 +231,108 @@ with st.sidebar:
     auto_refresh = st.checkbox("Auto-refresh dashboard", value=True)
     refresh_interval = st.slider("Refresh interval (seconds)", 5, 60, 30)
 
-# Main content area
-col1, col2 = st.columns([2, 1])
+# Main content area: refreshed on a timer as a fragment, so the rest of the
+# page is not rerun and the script thread never sleeps
+@st.fragment(run_every=refresh_interval if auto_refresh else None)
+def live_dashboard():
+    snapshot = service.snapshot()
+    version = history_version()
+    current_data = load_historical_data(version)
+        
+    col1, col2 = st.columns([2, 1])
 
-with col1:
-    # Current Status
-    st.header("📊 Current Status")
-    
-    # Load current data
-    current_data = load_historical_data()
-    
-    if not current_data.empty:
-        latest_data = current_data.iloc[-1]
+    with col1:
+        # Current Status
+        st.header("📊 Current Status")
         
-        # Status cards
-        col1_1, col1_2, col1_3 = st.columns(3)
+        if not current_data.empty:
+            latest_data = current_data.iloc[-1]
+            
+            # Status cards
+            col1_1, col1_2, col1_3 = st.columns(3)
+            
+            with col1_1:
+                st.markdown(f"""
+                <div class="metric-card">
+                    <h3>Current SB Number</h3>
+                    <h2>{latest_data['sb_number']}</h2>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col1_2:
+                last_update = latest_data['timestamp']
+                time_diff = datetime.now() - last_update.replace(tzinfo=None)
+                hours_ago = time_diff.total_seconds() / 3600
+                
+                st.markdown(f"""
+                <div class="metric-card">
+                    <h3>Last Updated</h3>
+                    <h2>{hours_ago:.1f}h ago</h2>
+                    <p>{last_update.strftime('%Y-%m-%d %H:%M')}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col1_3:
+                total_checks = snapshot['checks']
+                st.markdown(f"""
+                <div class="metric-card">
+                    <h3>Total Checks</h3>
+                    <h2>{total_checks}</h2>
+                </div>
+                """, unsafe_allow_html=True)
         
-        with col1_1:
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Current SB Number</h3>
-                <h2>{latest_data['sb_number']}</h2>
-            </div>
-            """, unsafe_allow_html=True)
+        # Historical Chart
+        st.header("📈 Historical Data")
         
-        with col1_2:
-            last_update = latest_data['timestamp']
-            time_diff = datetime.now() - last_update.replace(tzinfo=None)
-            hours_ago = time_diff.total_seconds() / 3600
+        if not current_data.empty:
+            st.plotly_chart(build_timeline_figure(version), use_container_width=True)
             
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Last Updated</h3>
-                <h2>{hours_ago:.1f}h ago</h2>
-                <p>{last_update.strftime('%Y-%m-%d %H:%M')}</p>
-            </div>
-            """, unsafe_allow_html=True)
+            # Data table
+            st.subheader("📋 Historical Records")
+            display_data = current_data.copy()
+            display_data['timestamp'] = display_data['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            st.dataframe(display_data, use_container_width=True)
+        else:
+            st.info("No historical data available. Run a manual scrape to get started!")
+
+    with col2:
+        # Live Activity Log
+        st.header("📝 Live Activity Log")
         
-        with col1_3:
-            total_checks = len(st.session_state.check_history)
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Total Checks</h3>
-                <h2>{total_checks}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-    
-    # Historical Chart
-    st.header("📈 Historical Data")
-    
-    if not current_data.empty:
-        # Create timeline chart
-        fig = px.line(
-            current_data, 
-            x='timestamp', 
-            y='sb_number',
-            title="SB Number Timeline",
-            labels={'sb_number': 'SB Number', 'timestamp': 'Date'},
-            markers=True
-        )
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="SB Number",
-            hovermode='x unified'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        # Log display
+        st.markdown(f"""
+        <div class="log-container">
+            {logger.get_logs()}
+        </div>
+        """, unsafe_allow_html=True)
         
-        # Data table
-        st.subheader("📋 Historical Records")
-        display_data = current_data.copy()
-        display_data['timestamp'] = display_data['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        st.dataframe(display_data, use_container_width=True)
-    else:
-        st.info("No historical data available. Run a manual scrape to get started!")
-
-with col2:
-    # Live Activity Log
-    st.header("📝 Live Activity Log")
-    
-    # Log display
-    st.markdown(f"""
-    <div class="log-container">
-        {st.session_state.logger.get_logs()}
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Clear logs button
-    if st.button("🗑️ Clear Logs", use_container_width=True):
-        st.session_state.logger.log_buffer = []
-        st.rerun()
-    
-    st.divider()
-    
-    # Recent Checks
-    st.header("🕒 Recent Checks")
-    
-    if st.session_state.check_history:
-        recent_checks = pd.DataFrame(st.session_state.check_history[-10:])
-        recent_checks['timestamp'] = recent_checks['timestamp'].dt.strftime('%H:%M:%S')
+        # Clear logs button
+        if st.button("🗑️ Clear Logs", use_container_width=True):
+            logger.clear()
+            st.rerun(scope="fragment")
         
-        for _, check in recent_checks.iterrows():
-            status_color = "success-status" if check['status'] == 'updated' else "warning-status"
-            st.markdown(f"""
-            <div class="status-card">
-                <strong>{check['timestamp']}</strong><br>
-                SB: {check['sb_number']}<br>
-                <span class="{status_color}">{check['status'].upper()}</span>
-            </div>
-            """, unsafe_allow_html=True)
-    else:
-        st.info("No recent checks available")
+        st.divider()
+        
+        # Recent Checks
+        st.header("🕒 Recent Checks")
+        
+        if snapshot['recent']:
+            recent_checks = pd.DataFrame(snapshot['recent'][-10:])
+            recent_checks['timestamp'] = recent_checks['timestamp'].dt.strftime('%H:%M:%S')
+            
+            for _, check in recent_checks.iterrows():
+                status_color = "success-status" if check['status'] == 'updated' else "warning-status"
+                st.markdown(f"""
+                <div class="status-card">
+                    <strong>{check['timestamp']}</strong><br>
+                    SB: {check['sb_number']}<br>
+                    <span class="{status_color}">{check['status'].upper()}</span>
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            st.info("No recent checks available")
 
-# Auto-refresh functionality
-if auto_refresh:
-    time.sleep(refresh_interval)
-    st.rerun()
+live_dashboard()
 
 # Footer
 st.markdown("---")
@@ -6,6 +6,8 @@ import json
 import os
 import time
 import random
+import logging
+from log_buffer import LogTail, install_ring_buffer, level_number
 
 # Configure page
 st.set_page_config(
@@ -66,20 +68,21 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class DemoLogger:
-    def __init__(self):
-        self.log_buffer = []
-        self.max_logs = 100
+    """Logs demo messages through the logging module and shows them from the in-memory log buffer."""
+    def __init__(self, max_logs=100):
+        self.logger = logging.getLogger('demo')
+        self.logger.setLevel(logging.INFO)
+        self.tail = LogTail(install_ring_buffer(), max_logs)
     
     def log(self, message, level="INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {level}: {message}"
-        self.log_buffer.append(log_entry)
-        
-        if len(self.log_buffer) > self.max_logs:
-            self.log_buffer = self.log_buffer[-self.max_logs:]
+        self.logger.log(level_number(level), message)
     
     def get_logs(self):
-        return "\n".join(self.log_buffer)
+        self.tail.poll()
+        return self.tail.text()
+    
+    def clear(self):
+        self.tail.clear()
 
 # Initialize session state
 if 'logger' not in st.session_state:
@@ -292,7 +295,7 @@ with col2:
     
     # Clear logs button
     if st.button("🗑️ Clear Logs", use_container_width=True):
-        st.session_state.logger.log_buffer = []
+        st.session_state.logger.clear()
         st.rerun()
     
     st.divider()
@@ -329,7 +332,7 @@ st.markdown(
 )
 
 # Add some initial demo logs
-if not st.session_state.logger.log_buffer:
+if not st.session_state.logger.get_logs():
     st.session_state.logger.log("Demo app initialized", "INFO")
     st.session_state.logger.log("Ready to simulate scraping operations", "INFO")
     st.session_state.logger.log("Click 'Demo Scrape' to see the interface in action", "INFO")
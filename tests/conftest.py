@@ -0,0 +1,237 @@
+"""Shared fixtures for the PMSV monitor test suite."""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name: str) -> bytes:
+    """Return the raw bytes of a file in tests/fixtures."""
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff(monkeypatch):
+    """Failed requests are still retried, but without sleeping between attempts."""
+    monkeypatch.setenv('HTTP_BACKOFF_FACTOR', '0')
+
+
+class StubServer:
+    """
+    Minimal local HTTP server for exercising the scraper without network access.
+
+    Each path maps to a handler callable taking the request handler and returning
+    (status, headers, body). Every request is recorded in ``requests`` as
+    (method, path, headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self):
+                with stub._lock:
+                    stub.requests.append((self.command, self.path, dict(self.headers)))
+                route = stub.routes.get(self.path.split('?')[0])
+                if route is None:
+                    status, headers, body = 404, {}, b'not found'
+                else:
+                    status, headers, body = route(self)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD' and status not in (204, 304):
+                    self.wfile.write(body)
+
+            do_GET = _dispatch
+            do_HEAD = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Streamed fetches that stop after the match reset the connection
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.httpd = Server(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def pmsv_page() -> bytes:
+    return load_fixture('pmsv_page.html')
+
+
+class FlakyRoute:
+    """
+    StubServer route that fails on demand.
+
+    Statuses queued in ``failures`` are answered first (one per request), then
+    the page is served with 200. ``latency`` delays every response.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.failures = deque()
+        self.latency = 0.0
+        self.calls = 0
+        self.url = None
+
+    def __call__(self, handler):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failures:
+            return self.failures.popleft(), {}, b'server error'
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, self.body
+
+
+@pytest.fixture
+def flaky_page(stub_server, pmsv_page) -> FlakyRoute:
+    """The PMSV page served by a FlakyRoute at /flaky."""
+    route = FlakyRoute(pmsv_page)
+    stub_server.routes['/flaky'] = route
+    route.url = stub_server.url('/flaky')
+    return route
+
+
+class StubSMTPServer:
+    """
+    Minimal threaded SMTP server that accepts everything and counts handshakes.
+
+    ``connections`` counts accepted TCP connections, ``handshakes`` counts EHLO/HELO
+    commands and ``messages`` holds the DATA payload of every delivered message.
+    """
+
+    def __init__(self):
+        import socketserver
+
+        self.connections = 0
+        self.handshakes = 0
+        self.noops = 0
+        self.messages = []
+        self.fail_next_data = False
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b'\r\n')
+
+            def handle(self):
+                with stub._lock:
+                    stub.connections += 1
+                self.reply('220 stub ESMTP')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode().strip()
+                    verb = command.split(' ', 1)[0].upper()
+                    if verb in ('EHLO', 'HELO'):
+                        with stub._lock:
+                            stub.handshakes += 1
+                        self.wfile.write(b'250-stub\r\n250 AUTH PLAIN LOGIN\r\n')
+                    elif verb == 'AUTH':
+                        self.reply('235 Authentication successful')
+                    elif verb == 'NOOP':
+                        with stub._lock:
+                            stub.noops += 1
+                        self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline()
+                            if chunk in (b'.\r\n', b''):
+                                break
+                            data.append(chunk)
+                        if stub.fail_next_data:
+                            # Simulate the server dropping the session mid-transaction
+                            stub.fail_next_data = False
+                            return
+                        with stub._lock:
+                            stub.messages.append(b''.join(data))
+                        self.reply('250 OK queued')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('250 OK')
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.host, self.port = self.server.server_address[:2]
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def smtp_server():
+    server = StubSMTPServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def email_env(monkeypatch, smtp_server):
+    """Point EmailNotifier at the stub SMTP server."""
+    monkeypatch.setenv('SMTP_SERVER', smtp_server.host)
+    monkeypatch.setenv('SMTP_PORT', str(smtp_server.port))
+    monkeypatch.setenv('SMTP_USE_TLS', 'false')
+    monkeypatch.setenv('SENDER_EMAIL', 'monitor@example.org')
+    monkeypatch.setenv('SENDER_PASSWORD', 'secret')
+    monkeypatch.setenv('RECIPIENT_EMAIL', 'team@example.org')
+    return smtp_server
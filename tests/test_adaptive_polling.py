@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from adaptive_polling import (AdaptivePollingPolicy, AdaptiveTrigger, adaptive_strategy,
+                              estimate_change_time, load_change_times, simulate)
+from history_store import HistoryStore
+from scheduler import Job, Scheduler
+
+CET = timezone(timedelta(hours=1), 'CET')
+START = datetime(2024, 1, 1, tzinfo=CET).timestamp()  # a Monday
+
+
+def at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=CET).timestamp()
+
+
+def business_hour_changes(weeks=52):
+    """One change a week, cycling through weekdays and 09:00-16:00."""
+    return [START + week * 7 * 86400 + (week % 5) * 86400 + (9 + week % 8) * 3600 + 1800
+            for week in range(weeks)]
+
+
+@pytest.fixture
+def policy():
+    return AdaptivePollingPolicy(business_hour_changes(), tz=CET, observed_since=START,
+                                 now=START + 52 * 7 * 86400)
+
+
+def test_polls_often_in_business_hours_and_rarely_at_weekends(policy):
+    busy = policy.next_interval(at('2025-01-07 10:00:00'))
+    night = policy.next_interval(at('2025-01-07 22:00:00'))
+    weekend = policy.next_interval(at('2025-01-11 10:00:00'))
+
+    assert policy.min_interval <= busy < night <= policy.max_interval
+    assert busy < weekend
+    # A poll late on Friday waits for Monday business hours, capped at max_interval
+    assert policy.next_interval(at('2025-01-10 18:00:00')) == policy.max_interval
+
+
+def test_change_probability(policy):
+    weekday = policy.change_probability(at('2025-01-07 08:00:00'), horizon=10 * 3600)
+    weekend = policy.change_probability(at('2025-01-11 08:00:00'), horizon=10 * 3600)
+    assert 0 < weekend < weekday < 1
+
+
+def test_without_history_stays_within_bounds():
+    policy = AdaptivePollingPolicy([], min_interval=600, max_interval=7200, tz=CET)
+    assert 600 <= policy.next_interval(START) <= 7200
+    assert 0 < policy.change_probability(START) < 1
+    with pytest.raises(ValueError):
+        AdaptivePollingPolicy([], min_interval=7200, max_interval=600)
+
+
+def test_change_times_estimated_between_checks(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    store.record_check('mir', 'initial', sb_number='100', timestamp=1000)
+    store.record_check('mir', 'unchanged', sb_number='100', timestamp=2000)
+    store.record_check('mir', 'updated', sb_number='101', timestamp=3000)
+    store.record_check('mir', 'updated', sb_number='102', timestamp=3600)
+
+    assert load_change_times(store, ['mir']) == [2500, 3300]
+    assert estimate_change_time(None, 3000) == 3000
+
+
+def test_trigger_drives_scheduler():
+    now = at('2025-01-07 10:00:00')
+    trigger = AdaptiveTrigger(business_hour_changes, tz=CET, observed_since=START)
+    scheduler = Scheduler(clock=lambda: now)
+    job = scheduler.add_job(Job(lambda: None, trigger, name='check'))
+
+    assert now + trigger.last_policy.min_interval <= job.next_run <= now + trigger.last_policy.max_interval
+    assert scheduler.next_deadline() == job.next_run
+
+
+def test_trigger_keeps_last_history_when_loading_fails():
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) > 1:
+            raise OSError("database locked")
+        return business_hour_changes()
+
+    trigger = AdaptiveTrigger(load, tz=CET, observed_since=START)
+    first = trigger.next_run(at('2025-01-07 10:00:00'))
+    assert trigger.next_run(at('2025-01-07 10:00:00')) == first
+
+
+def test_simulation_beats_fixed_interval_with_same_budget():
+    changes = business_hour_changes(weeks=26)
+    end = START + 26 * 7 * 86400
+    adaptive = simulate(changes, START, end, adaptive_strategy(START, base_interval=3 * 3600, tz=CET))
+    same_budget = (end - START) / adaptive['requests']
+    fixed = simulate(changes, START, end, lambda now, detected: same_budget)
+
+    assert adaptive['detected'] == adaptive['changes'] == len(changes)
+    assert adaptive['mean_delay'] < fixed['mean_delay']
+    # Fewer requests than polling at the fixed interval that would match its delay
+    assert adaptive['requests'] < (end - START) / (2 * adaptive['mean_delay'])
@@ -0,0 +1,39 @@
+import copy
+import logging
+
+from benchmarks.bench_suite import BENCHMARKS, compare, run_benchmark, run_suite
+
+
+def test_suite_runs_offline_and_reports_metrics():
+    document = run_suite(iterations=2, pages=['recorded'], isolate=False)
+
+    assert set(document['results']) == {f"{name}/recorded" for name in BENCHMARKS}
+    for metrics in document['results'].values():
+        assert metrics['median_ms'] > 0
+        assert metrics['peak_rss_kib'] > 0
+    assert document['results']['parse/recorded']['pages_per_sec'] > 0
+    assert document['meta']['iterations'] == 2
+
+
+def test_compare_flags_regressions_in_the_bad_direction():
+    baseline = {'results': {'parse/recorded': {'median_ms': 10.0, 'pages_per_sec': 100.0, 'peak_rss_kib': 1000}}}
+    current = copy.deepcopy(baseline)
+    current['results']['parse/recorded'].update(median_ms=12.0, pages_per_sec=150.0, peak_rss_kib=1050)
+
+    rows = {row['metric']: row for row in compare(baseline, current, threshold=10)}
+    assert rows['median_ms']['regression']
+    assert rows['median_ms']['change_pct'] == 20.0
+    # Higher throughput and a small RSS increase are fine
+    assert not rows['pages_per_sec']['regression']
+    assert not rows['peak_rss_kib']['regression']
+
+
+def test_run_benchmark_restores_the_log_level():
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.DEBUG)
+    try:
+        run_benchmark('parse', 'recorded', 1)
+        assert root.level == logging.DEBUG
+    finally:
+        root.setLevel(level)
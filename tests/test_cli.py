@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a cached 304 check must not need
+HEAVY_MODULES = ('requests', 'urllib3', 'lxml', 'bs4', 'smtplib', 'http.server')
+
+
+def conditional_route(page: bytes, etag: str = '"v1"'):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}, page
+    return route
+
+
+def test_check_once_304_skips_heavy_imports(tmp_path, monkeypatch, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('NOTIFY_SPOOL_DIR', str(tmp_path / 'spool'))
+    args = ['check', '--once', '--url', stub_server.url('/pmsv'), '--data-file', str(tmp_path / 'sb.json')]
+
+    assert cli.main(args) == 0
+
+    code = (f"import sys, json, cli; code = cli.main({args!r}); "
+            f"print(json.dumps([code, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    lines = result.stdout.splitlines()
+    assert lines[0] == 'unchanged: 10573'
+    assert json.loads(lines[-1]) == [0, []]
+    assert stub_server.requests[-1][2].get('If-None-Match') == '"v1"'
+
+
+def test_check_once_emails_change(tmp_path, monkeypatch, stub_server, pmsv_page, email_env, capsys):
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('NOTIFY_SPOOL_DIR', str(tmp_path / 'spool'))
+    args = ['check', '--once', '--url', stub_server.url('/pmsv'), '--data-file', str(tmp_path / 'sb.json')]
+    assert cli.main(args) == 0
+
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page.replace(b'SB 10573', b'SB 10574'), '"v2"')
+    assert cli.main(args) == 0
+
+    assert capsys.readouterr().out.splitlines()[-1] == 'updated: 10573 -> 10574'
+    assert len(email_env.messages) == 1
+    assert os.listdir(tmp_path / 'spool') == []
+
+    stub_server.routes['/pmsv'] = lambda h: (500, {}, b'down')
+    assert cli.main(args) == 1
+    assert len(email_env.messages) == 1
+
+
+def test_parse_importtime():
+    stderr = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       200 |        200 |     _socket',
+        'import time:      1000 |       1200 |   socket',
+        'import time:       500 |       1700 | lite_http',
+        'Scraping webpage: http://example.org',
+    ])
+
+    timings, other = cli.parse_importtime(stderr)
+
+    assert timings == [('_socket', 200, 200, 2), ('socket', 1000, 1200, 1), ('lite_http', 500, 1700, 0)]
+    assert other == ['Scraping webpage: http://example.org']
+    report = cli.format_importtime(timings, 0.01, top=2)
+    assert 'imports 1.7 ms (3 modules)' in report
+    assert 'socket                                              1.0' in report
@@ -0,0 +1,52 @@
+import scraper
+from scraper import PMSVScraper
+
+
+def conditional_route(body, etag='"v1"', last_modified='Mon, 15 Jan 2024 10:30:00 GMT'):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Last-Modified': last_modified,
+                     'Content-Type': 'text/html; charset=utf-8'}, body
+    return route
+
+
+def test_304_returns_cached_sb_without_parsing(tmp_path, stub_server, pmsv_page, monkeypatch):
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page)
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+
+    assert s.scrape_webpage() == '10573'
+    cache = s.load_http_cache()
+    assert cache['etag'] == '"v1"'
+    assert cache['last_modified'] == 'Mon, 15 Jan 2024 10:30:00 GMT'
+
+    parses = []
+    monkeypatch.setattr(scraper.PMSVScraper, 'extract_value', lambda *a, **k: parses.append(1))
+
+    assert s.scrape_webpage() == '10573'
+    assert parses == []
+    _, _, headers = stub_server.requests[-1]
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == 'Mon, 15 Jan 2024 10:30:00 GMT'
+
+
+def test_unchanged_body_hash_skips_parse(tmp_path, stub_server, pmsv_page, monkeypatch):
+    # Server without validator support: body hash is the fallback
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html'}, pmsv_page)
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    assert s.scrape_webpage() == '10573'
+
+    parses = []
+    monkeypatch.setattr(scraper.PMSVScraper, 'extract_value', lambda *a, **k: parses.append(1))
+    assert s.scrape_webpage() == '10573'
+    assert parses == []
+
+
+def test_changed_page_is_parsed_again(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page)
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    assert s.scrape_webpage() == '10573'
+
+    stub_server.routes['/pmsv'] = conditional_route(pmsv_page.replace(b'SB 10573', b'SB 10574'), etag='"v2"')
+    assert s.scrape_webpage() == '10574'
+    assert s.load_http_cache()['etag'] == '"v2"'
@@ -0,0 +1,148 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from coordination import Coordinator, FileLeaseBackend, HashRing, LeaseBackend, SQLiteLeaseBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = [f"target-{i}" for i in range(24)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def make_backend(request, tmp_path):
+    def make(clock):
+        if request.param == 'sqlite':
+            return SQLiteLeaseBackend(str(tmp_path / 'coordination.db'), clock=clock)
+        return FileLeaseBackend(str(tmp_path / 'coordination'), clock=clock)
+    return make
+
+
+def test_ring_moves_only_the_leaving_members_targets():
+    before = HashRing(['a', 'b', 'c'])
+    after = HashRing(['a', 'c'])
+
+    owners = {t: before.owner(t) for t in TARGETS}
+    assert set(owners.values()) == {'a', 'b', 'c'}
+    assert all(after.owner(t) == owner for t, owner in owners.items() if owner != 'b')
+
+
+def test_lease_is_exclusive_until_expiry(make_backend):
+    clock = FakeClock()
+    backend = make_backend(clock)
+
+    assert backend.acquire('t', 'a', ttl=10)
+    assert not backend.acquire('t', 'b', ttl=10)
+    assert backend.acquire('t', 'a', ttl=10)
+    clock.now += 10
+    assert backend.holder('t') is None
+    assert backend.acquire('t', 'b', ttl=10)
+    backend.release('t', 'a')
+    assert backend.holder('t') == 'b'
+
+
+def test_incomplete_backend_cannot_be_created():
+    class AcquireOnly(LeaseBackend):
+        def acquire(self, name, owner, ttl):
+            return True
+
+    with pytest.raises(TypeError):
+        AcquireOnly()
+
+
+def test_targets_are_handed_over_without_overlap(make_backend):
+    clock = FakeClock()
+    backend = make_backend(clock)
+    a = Coordinator(backend, 'replica-a', lease_ttl=30)
+    b = Coordinator(backend, 'replica-b', lease_ttl=30)
+
+    assert a.owned(TARGETS) == TARGETS
+    # b joins; a's next heartbeat hands over the targets that moved to b
+    b.heartbeat()
+    a.heartbeat()
+    ring = b.ring()
+    owned_b = b.owned(TARGETS)
+    owned_a = a.owned(TARGETS)
+    assert owned_b == [t for t in TARGETS if ring.owner(t) == 'replica-b']
+    assert owned_a and owned_b and not set(owned_a) & set(owned_b)
+    assert sorted(owned_a + owned_b) == sorted(TARGETS)
+
+    # a dies: its heartbeat and leases expire, then b takes everything
+    clock.now += 31
+    assert b.owned(TARGETS) == TARGETS
+
+    b.stop()
+    assert backend.members() == [] and backend.holder(TARGETS[0]) is None
+
+
+WORKER = """
+import sys, time
+from coordination import Coordinator, SQLiteLeaseBackend
+db, member, log_path, stop_path = sys.argv[1:5]
+targets = [f"target-{i}" for i in range(12)]
+coordinator = Coordinator(SQLiteLeaseBackend(db), member, lease_ttl=1.0)
+coordinator.start()
+with open(log_path, 'a', buffering=1) as log:
+    while True:
+        for name in coordinator.owned(targets):
+            log.write(f"{time.time()} {member} {name}\\n")
+        try:
+            open(stop_path).close()
+            break
+        except FileNotFoundError:
+            time.sleep(0.05)
+coordinator.stop()
+"""
+
+
+def test_failover_between_processes(tmp_path):
+    script = tmp_path / 'worker.py'
+    script.write_text(WORKER)
+    log_path, stop_path = tmp_path / 'owners.log', tmp_path / 'stop'
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    workers = {
+        member: subprocess.Popen([sys.executable, str(script), str(tmp_path / 'c.db'), member,
+                                  str(log_path), str(stop_path)], cwd=tmp_path, env=env)
+        for member in ('r1', 'r2', 'r3')
+    }
+    try:
+        time.sleep(2.0)
+        workers['r1'].send_signal(signal.SIGKILL)
+        workers['r1'].wait()
+        killed_at = time.time()
+        time.sleep(2.5)
+    finally:
+        stop_path.touch()
+        for process in workers.values():
+            process.wait(timeout=10)
+
+    entries = [line.split() for line in log_path.read_text().splitlines()]
+    owners_before = {name: member for ts, member, name in entries if float(ts) < killed_at}
+    assert set(owners_before.values()) == {'r1', 'r2', 'r3'}
+
+    # Two concurrent owners would both log a target every 50ms, alternating many times;
+    # legitimate moves are at most one per replica joining plus the failover
+    owner_changes = {}
+    last_owner = {}
+    for ts, member, name in sorted(entries, key=lambda e: float(e[0])):
+        if last_owner.get(name, member) != member:
+            owner_changes[name] = owner_changes.get(name, 0) + 1
+        last_owner[name] = member
+    assert max(owner_changes.values()) <= 3
+
+    # r1's targets move to the survivors within the lease TTL (1s) plus scheduling slack
+    for name, member in owners_before.items():
+        if member == 'r1':
+            takeover = min(float(ts) for ts, m, n in entries if n == name and m != 'r1' and float(ts) > killed_at)
+            assert takeover - killed_at < 2.0
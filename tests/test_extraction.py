@@ -0,0 +1,88 @@
+import re
+import sys
+
+import pytest
+
+from extraction import compile_selector, css_to_xpath, iter_chunks, selector_extract, soup_extract, stream_extract
+from scraper import MIR_PATTERN, MIR_SELECTOR, PMSVScraper
+
+MIR = re.compile(MIR_PATTERN, re.IGNORECASE)
+
+
+def test_stream_matches_soup_on_fixture(pmsv_page):
+    assert stream_extract(iter_chunks(pmsv_page), MIR) == soup_extract(pmsv_page, MIR) == '10573'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1024])
+def test_match_split_across_chunks(pmsv_page, chunk_size):
+    # Digits split over chunk boundaries must not yield a truncated number
+    assert stream_extract(iter_chunks(pmsv_page, chunk_size), MIR) == '10573'
+
+
+def test_stops_consuming_after_match(pmsv_page):
+    consumed = []
+
+    def chunks():
+        for chunk in iter_chunks(pmsv_page, 256):
+            consumed.append(chunk)
+            yield chunk
+
+    assert stream_extract(chunks(), MIR) == '10573'
+    assert sum(map(len, consumed)) < len(pmsv_page)
+
+
+def test_match_at_end_of_document():
+    assert stream_extract([b'<p>MIR 7.3.1 form - SB 42'], MIR) == '42'
+
+
+def test_no_match_returns_none(pmsv_page):
+    assert stream_extract(iter_chunks(pmsv_page), re.compile(r'PSR 9\.9 - SB (\d+)')) is None
+
+
+def test_falls_back_to_soup_when_streaming_fails(tmp_path, pmsv_page, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr('extraction.selector_extract', broken)
+    monkeypatch.setattr('extraction.stream_extract', broken)
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'))
+    assert scraper.extract_value(pmsv_page) == '10573'
+
+
+@pytest.mark.parametrize('selector', [
+    MIR_SELECTOR,
+    "div.ecl > ul a[href$='.pdf']",
+    "//div[@id='section-manufacturer-incident-report']//a",
+    '//a/text()',
+])
+@pytest.mark.parametrize('chunk_size', [64, 16384])
+def test_selector_extract(pmsv_page, selector, chunk_size):
+    assert selector_extract(iter_chunks(pmsv_page, chunk_size), selector, MIR) == '10573'
+
+
+def test_selector_only_searches_selected_block(pmsv_page):
+    fsca = re.compile(r'FSCA (\d+(?:\.\d+)*) PDF form')
+    assert selector_extract(iter_chunks(pmsv_page), MIR_SELECTOR, fsca) is None
+    assert selector_extract(iter_chunks(pmsv_page), '#section-field-safety-corrective-action a', fsca) == '1.1'
+
+
+def test_selector_waits_for_complete_element():
+    # "SB 4" at the end of the first chunk must not be taken before the element is closed
+    assert selector_extract([b'<ul><li><a>MIR 7.3.1 SB 4', b'2</a></li></ul>'], 'li a', MIR) == '42'
+
+
+def test_css_subset_and_cache(monkeypatch):
+    # The built-in translator, as used when cssselect is not installed
+    monkeypatch.setitem(sys.modules, 'cssselect', None)
+    assert css_to_xpath('#a > p.note[lang^=en], b') == (
+        "descendant-or-self::*[@id='a']/p[contains(concat(' ', normalize-space(@class), ' '), ' note ')]"
+        "[starts-with(@lang, 'en')] | descendant-or-self::b"
+    )
+    assert compile_selector(MIR_SELECTOR) is compile_selector(MIR_SELECTOR)
+    with pytest.raises(ValueError):
+        css_to_xpath('ul > li:first-child')
+
+
+def test_falls_back_to_whole_page_when_selector_misses(tmp_path, pmsv_page):
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), selector='#no-such-section a')
+    assert scraper.extract_value(pmsv_page) == '10573'
@@ -0,0 +1,76 @@
+import sqlite3
+
+from history_store import ChangeFeed, HistoryStore
+from scraper import PMSVScraper
+
+
+def test_latest_value_and_changes(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    store.record_check('mir', 'initial', sb_number='100', timestamp=1000)
+    store.record_check('mir', 'unchanged', sb_number='100', previous_sb='100', timestamp=2000)
+    store.record_check('mir', 'updated', sb_number='101', previous_sb='100', timestamp=3000)
+    store.record_check('mir', 'error', previous_sb='101', timestamp=4000)
+    store.record_check('psr', 'initial', sb_number='1.0', timestamp=3500)
+
+    assert store.latest_value('mir') == '101'
+    assert store.latest('mir')['status'] == 'error'
+    assert [c['sb_number'] for c in store.changes('mir')] == ['100', '101']
+    assert [c['sb_number'] for c in store.changes('mir', start=1500, end=3500)] == ['101']
+    assert [c['timestamp'] for c in store.checks('mir', limit=2)] == [4000, 3000]
+    assert store.targets() == ['mir', 'psr']
+
+
+def test_queries_use_indexes(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    conn = sqlite3.connect(store.db_path)
+    plans = {
+        'latest': "SELECT * FROM checks WHERE target = 'mir' ORDER BY timestamp DESC LIMIT 1",
+        'changes': "SELECT * FROM checks WHERE target = 'mir' AND status IN ('initial', 'updated') "
+                   "AND timestamp BETWEEN 0 AND 1 ORDER BY timestamp",
+    }
+    for name, query in plans.items():
+        plan = ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+        assert 'USING INDEX' in plan, (name, plan)
+        assert 'TEMP B-TREE' not in plan, (name, plan)
+    conn.close()
+
+
+def test_scraper_records_every_check(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = lambda h: (200, {}, pmsv_page)
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    scraper.check_for_updates()
+    scraper.check_for_updates()
+    stub_server.routes['/pmsv'] = lambda h: (500, {}, b'error')
+    scraper.check_for_updates()
+
+    checks = scraper.history.checks(scraper.target_name)
+    assert [c['status'] for c in checks] == ['error', 'unchanged', 'initial']
+    assert checks[-1]['content_hash'] and checks[-1]['latency_ms'] > 0
+
+
+def test_previous_value_falls_back_to_history(tmp_path):
+    data_file = tmp_path / 'sb.json'
+    scraper = PMSVScraper(data_file=str(data_file))
+    scraper.history.record_check(scraper.target_name, 'initial', sb_number='10573')
+    data_file.write_text('{"sb_num')  # truncated write
+    assert scraper.load_previous_sb_number() == '10573'
+
+
+def test_change_feed_fetches_only_new_rows(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    feed = ChangeFeed(store, 'mir')
+    store.record_check('mir', 'initial', sb_number='100', timestamp=1000)
+    store.record_check('mir', 'unchanged', sb_number='100', timestamp=2000)
+    assert [r['sb_number'] for r in feed.refresh()] == ['100']
+
+    version = store.data_version()
+    for i in range(50):
+        store.record_check('mir', 'unchanged', sb_number='100', timestamp=3000 + i)
+    store.record_check('mir', 'updated', sb_number='101', previous_sb='100', timestamp=4000)
+    store.record_check('psr', 'updated', sb_number='1.1', timestamp=4000)
+
+    assert store.data_version() >= version
+    assert [r['sb_number'] for r in feed.refresh()] == ['101']
+    assert feed.refresh() == []
+    assert [r['sb_number'] for r in feed.rows] == ['100', '101']
+    assert store.changes_since('mir', feed.last_id) == []
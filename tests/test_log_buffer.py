@@ -0,0 +1,56 @@
+import logging
+
+from log_buffer import SUCCESS, LogTail, RingBufferHandler, install_ring_buffer, level_number
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers = [handler]
+    return logger
+
+
+def test_entries_since_cursor_and_capacity():
+    handler = RingBufferHandler(capacity=5)
+    logger = make_logger('test.ring', handler)
+    for i in range(8):
+        logger.info(f"line {i}")
+
+    assert handler.last_seq == 8
+    # Oldest entries fell off the buffer
+    assert [e.seq for e in handler.entries_since(0)] == [4, 5, 6, 7, 8]
+    assert [e.line.split(': ', 1)[1] for e in handler.entries_since(6)] == ['line 6', 'line 7']
+    assert handler.entries_since(8) == []
+
+
+def test_tail_only_rejoins_on_new_entries():
+    handler = RingBufferHandler()
+    logger = make_logger('test.tail', handler)
+    tail = LogTail(handler, max_lines=2)
+    logger.info("first")
+    logger.log(SUCCESS, "second")
+    logger.warning("third")
+
+    assert len(tail.poll()) == 3
+    text = tail.text()
+    assert len(text.split('\n')) == 2
+    assert 'SUCCESS: second' in text and 'first' not in text
+    assert tail.poll() == []
+    assert tail.text() is text
+
+    tail.clear()
+    assert tail.text() == ''
+    logger.info("fourth")
+    assert tail.poll()[0].endswith('INFO: fourth')
+
+
+def test_install_is_idempotent_and_sees_module_logs():
+    root = logging.getLogger('test.install')
+    handler = install_ring_buffer(logger=root)
+    assert install_ring_buffer(logger=root) is handler
+    root.setLevel(logging.INFO)
+    logging.getLogger('test.install.scraper').info("Successfully extracted SB number: 10573")
+    assert handler.entries_since(0)[-1].level == 'INFO'
+    assert level_number('success') == SUCCESS
+    assert level_number('bogus') == logging.INFO
@@ -0,0 +1,86 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from email_notifier import EmailNotifier
+from metrics import (CHECK_SECONDS, EMAIL_SEND_SECONDS, HTTP_RESPONSES, RESPONSE_BYTES,
+                     SCRAPE_PHASE_SECONDS, Counter, Histogram, MetricsServer, Registry)
+from scraper import PMSVScraper
+
+
+def test_histogram_and_counter_text_format():
+    registry = Registry()
+    latency = Histogram('demo_seconds', 'Demo latency.', ('phase',), buckets=(0.1, 1.0), registry=registry)
+    requests_total = Counter('demo_requests_total', 'Demo requests.', ('code',), registry=registry)
+    latency.observe(0.05, phase='parse')
+    latency.observe(0.5, phase='parse')
+    latency.observe(5, phase='parse')
+    requests_total.inc(code='200')
+    requests_total.inc(2, code='200')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE demo_seconds histogram' in lines
+    assert 'demo_seconds_bucket{phase="parse",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{phase="parse",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{phase="parse",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{phase="parse"} 5.55' in lines
+    assert 'demo_seconds_count{phase="parse"} 3' in lines
+    assert 'demo_requests_total{code="200"} 3' in lines
+
+    with pytest.raises(ValueError):
+        latency.observe(1, target='x')
+    with pytest.raises(ValueError):
+        Counter('demo_requests_total', 'Duplicate.', registry=registry)
+
+
+def test_scrape_phases_are_recorded(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html'}, pmsv_page)
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'),
+                          target_name='metrics-test')
+    phases = ('connect', 'download', 'hash', 'parse', 'regex')
+    before = {phase: SCRAPE_PHASE_SECONDS.count(target='metrics-test', phase=phase) for phase in phases}
+
+    assert scraper.check_for_updates() == (False, '10573', None)
+
+    for phase in phases:
+        assert SCRAPE_PHASE_SECONDS.count(target='metrics-test', phase=phase) == before[phase] + 1
+    assert RESPONSE_BYTES.sum(target='metrics-test') >= len(pmsv_page)
+    assert HTTP_RESPONSES.value(target='metrics-test', code='200') >= 1
+    assert CHECK_SECONDS.count(target='metrics-test', status='initial') >= 1
+
+
+def test_email_send_time_is_recorded(email_env):
+    before = EMAIL_SEND_SECONDS.count(kind='change', result='ok')
+    notifier = EmailNotifier()
+    try:
+        assert notifier.send_notification('10573', '10574')
+    finally:
+        notifier.close()
+    assert EMAIL_SEND_SECONDS.count(kind='change', result='ok') == before + 1
+
+
+def test_metrics_server_endpoints():
+    health = {'healthy': True}
+    server = MetricsServer('127.0.0.1', 0, health_check=lambda: (health['healthy'], {'last_check': 1.0}))
+    server.start()
+    base = f"http://127.0.0.1:{server.port}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert b'# TYPE pmsv_scrape_phase_seconds histogram' in response.read()
+
+        with urllib.request.urlopen(f"{base}/healthz") as response:
+            assert json.load(response) == {'last_check': 1.0, 'status': 'ok'}
+
+        health['healthy'] = False
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{base}/healthz")
+        assert excinfo.value.code == 503
+
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{base}/nope")
+        assert excinfo.value.code == 404
+    finally:
+        server.stop()
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+
+import pytest
+
+from monitor_engine import AsyncMonitorEngine, MonitorTarget, load_targets
+from scraper import MIR_SELECTOR
+
+DELAY = 0.2
+
+
+class InFlightCounter:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def route(self, body):
+        def handler(_):
+            with self.lock:
+                self.current += 1
+                self.peak = max(self.peak, self.current)
+            time.sleep(DELAY)
+            with self.lock:
+                self.current -= 1
+            return 200, {'Content-Type': 'text/html'}, body
+        return handler
+
+
+def test_load_targets(tmp_path):
+    config = tmp_path / 'targets.json'
+    config.write_text(json.dumps({'targets': [
+        {'name': 'mir', 'url': 'https://example.org/a'},
+        {'name': 'psr', 'url': 'https://example.org/b', 'pattern': r'PSR (\d+)'},
+    ]}))
+    targets = load_targets(str(config))
+    assert [t.name for t in targets] == ['mir', 'psr']
+    assert targets[1].pattern == r'PSR (\d+)'
+    assert targets[0].host == 'example.org'
+    # The default pattern keeps the MIR section selector; a custom pattern searches the whole page
+    assert targets[0].selector == MIR_SELECTOR and targets[1].selector is None
+
+
+def test_invalid_selector_rejected(tmp_path):
+    config = tmp_path / 'targets.json'
+    config.write_text(json.dumps([{'name': 'a', 'url': 'u', 'selector': 'li > > a'}]))
+    with pytest.raises(ValueError):
+        load_targets(str(config))
+
+
+def test_duplicate_target_names_rejected(tmp_path):
+    config = tmp_path / 'targets.json'
+    config.write_text(json.dumps([{'name': 'a', 'url': 'u'}, {'name': 'a', 'url': 'v'}]))
+    with pytest.raises(ValueError):
+        load_targets(str(config))
+
+
+@pytest.mark.parametrize('name', ['../escape', 'a/b', '', 'mir page', '..', 'mir\n'])
+def test_unsafe_target_names_rejected(tmp_path, name):
+    config = tmp_path / 'targets.json'
+    config.write_text(json.dumps([{'name': name, 'url': 'u'}]))
+    with pytest.raises(ValueError):
+        load_targets(str(config))
+
+
+def test_targets_are_checked_concurrently(tmp_path, stub_server, pmsv_page):
+    counter = InFlightCounter()
+    targets = []
+    for i in range(8):
+        stub_server.routes[f'/page{i}'] = counter.route(pmsv_page.replace(b'SB 10573', f'SB {100 + i}'.encode()))
+        targets.append(MonitorTarget(name=f't{i}', url=stub_server.url(f'/page{i}')))
+
+    engine = AsyncMonitorEngine(targets, data_dir=str(tmp_path), max_per_host=8)
+    start = time.perf_counter()
+    results = engine.run_check()
+    elapsed = time.perf_counter() - start
+    engine.close()
+
+    assert [r.current for r in results] == [str(100 + i) for i in range(8)]
+    assert all(r.error is None for r in results)
+    # Sequential checks would take 8 * DELAY
+    assert elapsed < 4 * DELAY
+    assert counter.peak > 1
+
+
+def test_per_host_limit_is_respected(tmp_path, stub_server, pmsv_page):
+    counter = InFlightCounter()
+    stub_server.routes['/pmsv'] = counter.route(pmsv_page)
+    targets = [MonitorTarget(name=f't{i}', url=stub_server.url('/pmsv')) for i in range(6)]
+
+    engine = AsyncMonitorEngine(targets, data_dir=str(tmp_path), max_per_host=2)
+    results = engine.run_check()
+    engine.close()
+
+    assert all(r.current == '10573' for r in results)
+    assert counter.peak <= 2
+
+
+def test_change_detected_per_target(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = lambda h: (200, {}, pmsv_page)
+    engine = AsyncMonitorEngine([MonitorTarget('mir', stub_server.url('/pmsv'))], data_dir=str(tmp_path))
+    first, = engine.run_check()
+    assert not first.updated and first.current == '10573'
+
+    stub_server.routes['/pmsv'] = lambda h: (200, {}, pmsv_page.replace(b'SB 10573', b'SB 10574'))
+    second, = engine.run_check()
+    engine.close()
+    assert second.updated and (second.previous, second.current) == ('10573', '10574')
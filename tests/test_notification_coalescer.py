@@ -0,0 +1,108 @@
+from email_notifier import EmailNotifier
+from notification_coalescer import NotificationCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingNotifier:
+    enabled = True
+
+    def __init__(self):
+        self.errors = []
+        self.changes = []
+        self.digests = []
+
+    def send_notification(self, previous_sb, current_sb, **kwargs):
+        self.changes.append((previous_sb, current_sb))
+        return True
+
+    def send_error_notification(self, error_message):
+        self.errors.append(error_message)
+        return True
+
+    def send_digest(self, events):
+        self.digests.append(events)
+        return True
+
+
+def make(**kwargs):
+    clock = FakeClock()
+    notifier = RecordingNotifier()
+    options = dict(dedup_window=3600, rate_limit_per_hour=3, digest_interval=6 * 3600, clock=clock)
+    options.update(kwargs)
+    return NotificationCoalescer(notifier, recipient='team@example.org', **options), notifier, clock
+
+
+def test_identical_errors_deduplicated_within_window():
+    coalescer, notifier, clock = make()
+    for _ in range(10):
+        coalescer.send_error_notification("Failed to retrieve current SB number from webpage")
+        clock.now += 60
+    assert len(notifier.errors) == 1
+    assert coalescer.pending_digest()[0]['count'] == 9
+
+    clock.now += 3600
+    coalescer.send_error_notification("Failed to retrieve current SB number from webpage")
+    assert len(notifier.errors) == 2
+
+
+def test_rate_limit_per_recipient():
+    coalescer, notifier, clock = make()
+    for i in range(5):
+        coalescer.send_error_notification(f"error {i}")
+    assert notifier.errors == ["error 0", "error 1", "error 2"]
+    clock.now += 3601
+    coalescer.send_error_notification("error 5")
+    assert notifier.errors[-1] == "error 5"
+
+
+def test_change_notifications_are_never_suppressed():
+    coalescer, notifier, clock = make(rate_limit_per_hour=1)
+    coalescer.send_error_notification("site down")
+    assert coalescer.send_notification('10573', '10574')
+    assert notifier.changes == [('10573', '10574')]
+
+
+def test_digest_sent_when_due():
+    coalescer, notifier, clock = make()
+    coalescer.send_error_notification("<Timeout at 0x7f00aa>")
+    coalescer.send_error_notification("<Timeout at 0x7f00bb>")
+    coalescer.send_error_notification("<Timeout  at 0x7f00cc>")
+    assert not coalescer.flush_digest_if_due()
+
+    clock.now += 6 * 3600
+    assert coalescer.flush_digest_if_due()
+    events, = notifier.digests
+    assert len(events) == 1 and events[0]['count'] == 2
+    assert coalescer.pending_digest() == []
+
+
+def test_failed_digest_is_kept():
+    coalescer, notifier, clock = make()
+    notifier.send_digest = lambda events: False
+    coalescer.send_error_notification("down")
+    coalescer.send_error_notification("down")
+    assert not coalescer.flush_digest()
+    assert coalescer.pending_digest()[0]['count'] == 1
+
+
+def test_digest_email_delivered(email_env):
+    notifier = EmailNotifier()
+    assert notifier.send_digest([{'message': 'site down', 'count': 12,
+                                  'first_seen': 1_700_000_000, 'last_seen': 1_700_003_600}])
+    notifier.close()
+    assert b'12x between' in email_env.messages[0]
+
+
+def test_config_read_from_env(monkeypatch):
+    monkeypatch.setenv('NOTIFY_DEDUP_WINDOW_MINUTES', '15')
+    monkeypatch.setenv('NOTIFY_RATE_LIMIT_PER_HOUR', '2')
+    monkeypatch.setenv('NOTIFY_DIGEST_INTERVAL_MINUTES', '120')
+    notifier = EmailNotifier()
+    assert (notifier.dedup_window_minutes, notifier.rate_limit_per_hour, notifier.digest_interval_minutes) == (15, 2, 120)
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from email_notifier import BatchOutcome
+from notification_queue import NotificationDispatcher
+
+
+class RecordingNotifier:
+    enabled = True
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def send_notification(self, previous_sb, current_sb, target_name=None, url=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((previous_sb, current_sb))
+            if self.failures:
+                self.failures -= 1
+                return False
+        return True
+
+    def send_error_notification(self, error_message):
+        with self.lock:
+            self.calls.append((error_message,))
+        return True
+
+
+def test_submit_does_not_wait_for_delivery(tmp_path):
+    notifier = RecordingNotifier(delay=0.5)
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path))
+    dispatcher.start()
+
+    start = time.perf_counter()
+    assert dispatcher.send_notification('1', '2')
+    assert time.perf_counter() - start < 0.1
+
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+    assert notifier.calls == [('1', '2')]
+    assert dispatcher.delivered == 1
+    assert dispatcher.delivery_latencies[0] >= 0.5
+
+
+def test_retries_with_backoff(tmp_path):
+    notifier = RecordingNotifier(failures=2)
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path), base_delay=0.01)
+    dispatcher.start()
+    dispatcher.send_notification('1', '2')
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+    assert len(notifier.calls) == 3
+    assert dispatcher.delivered == 1
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    notifier = RecordingNotifier(failures=10)
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path), base_delay=0.01, max_retries=2)
+    dispatcher.start()
+    dispatcher.send_notification('1', '2')
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+    assert len(notifier.calls) == 3
+    assert dispatcher.failed == 1
+    assert [f for f in os.listdir(tmp_path) if f.endswith('.failed')]
+
+
+def test_spooled_notifications_survive_restart(tmp_path):
+    # Never started: simulates a process that died before delivering
+    NotificationDispatcher(RecordingNotifier(), spool_dir=str(tmp_path)).send_error_notification("site down")
+
+    notifier = RecordingNotifier()
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path))
+    dispatcher.start()
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+    assert notifier.calls == [("site down",)]
+
+
+def test_overflow_stays_spooled_until_queue_drains(tmp_path):
+    notifier = RecordingNotifier(delay=0.05)
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path), maxsize=1)
+    dispatcher.start()
+    for i in range(4):
+        assert dispatcher.send_notification(str(i), str(i + 1))
+    assert dispatcher.join(timeout=10)
+    dispatcher.stop()
+    assert sorted(notifier.calls) == [(str(i), str(i + 1)) for i in range(4)]
+
+
+def test_queued_notifications_share_one_smtp_batch(tmp_path, email_env):
+    from email_notifier import EmailNotifier
+
+    spool = str(tmp_path / 'spool')
+    for i in range(3):
+        NotificationDispatcher(RecordingNotifier(), spool_dir=spool).send_notification(str(i), str(i + 1))
+    notifier = EmailNotifier()
+    flushes = []
+    flush = notifier.smtp.flush
+    notifier.smtp.flush = lambda: flushes.append(notifier.smtp.pending) or flush()
+    dispatcher = NotificationDispatcher(notifier, spool_dir=spool)
+    dispatcher.start()
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+    notifier.close()
+
+    assert flushes == [3]
+    assert len(email_env.messages) == 3
+    assert email_env.handshakes == 1
+
+
+def test_undelivered_batch_jobs_are_retried(tmp_path):
+    class BatchNotifier(RecordingNotifier):
+        outcome = None
+        batched = []
+
+        @contextmanager
+        def batch(self):
+            self.outcome = BatchOutcome()
+            yield self.outcome
+            # The session dropped after the first message
+            self.outcome.sent = 1
+            self.outcome = None
+
+        def send_notification(self, previous_sb, current_sb, target_name=None, url=None):
+            if self.outcome is None:
+                return super().send_notification(previous_sb, current_sb)
+            self.batched.append(previous_sb)
+            self.outcome.queued += 1
+            return True
+
+    for i in range(3):
+        NotificationDispatcher(RecordingNotifier(), spool_dir=str(tmp_path)).send_notification(str(i), str(i + 1))
+    notifier = BatchNotifier()
+    dispatcher = NotificationDispatcher(notifier, spool_dir=str(tmp_path))
+    dispatcher.start()
+    assert dispatcher.join(timeout=5)
+    dispatcher.stop()
+
+    assert notifier.batched == ['0', '1', '2']
+    assert notifier.calls == [('1', '2'), ('2', '3')]
+    assert dispatcher.delivered == 3
+
+
+def test_check_latency_independent_of_smtp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('NOTIFY_SPOOL_DIR', str(tmp_path / 'spool'))
+    import main
+
+    class ChangedScraper:
+        def check_for_updates(self):
+            return True, '10574', '10573'
+
+    monitor = main.PMSVMonitor()
+    monitor.scraper = ChangedScraper()
+    notifier = RecordingNotifier(delay=1.0)
+    monitor.notifications.notifier = notifier
+
+    start = time.perf_counter()
+    monitor.run_check()
+    assert time.perf_counter() - start < 0.5
+
+    assert monitor.notifications.join(timeout=5)
+    monitor.shutdown()
+    assert notifier.calls == [('10573', '10574')]
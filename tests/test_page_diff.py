@@ -0,0 +1,80 @@
+import os
+
+import cli
+import page_diff
+from page_diff import PageTracker, diff_records, extract_records, fingerprint
+from scraper import PMSVScraper
+
+FSCA_OLD = b'(FSCA 1.1 PDF form)'
+FSCA_NEW = b'(FSCA 1.2 PDF form)'
+
+
+def edited(page: bytes) -> bytes:
+    """The fixture with a new FSCA version, a removed NCAR form and a new PSR help text."""
+    page = page.replace(FSCA_OLD, FSCA_NEW)
+    start = page.index(b'<li><a', page.index(b'id="section-national-competent-authority-report"'))
+    page = page[:start] + page[page.index(b'</li>', start) + 5:]
+    marker = b'<li><a href="https://health.ec.europa.eu/document/download/7c8d9e0f'
+    return page.replace(marker, b'<li><a href="/psr_help.pdf">Help text for the PSR form (version 1.0)</a></li>' + marker)
+
+
+def test_extract_records(pmsv_page):
+    records = extract_records(pmsv_page, 'https://health.ec.europa.eu/page')
+
+    assert len(records) == 10
+    assert records[0].section == 'Manufacturer incident report'
+    assert records[0].version == '7.3.1'
+    assert records[0].link.endswith('md_mir_form_en.pdf')
+
+
+def test_diff_only_touches_changed_sections(pmsv_page):
+    old = extract_records(pmsv_page, 'https://health.ec.europa.eu/page')
+    new = extract_records(edited(pmsv_page), 'https://health.ec.europa.eu/page')
+
+    changed = fingerprint(new).changed_sections(fingerprint(old))
+    assert changed == {'Field safety corrective action', 'Periodic summary report',
+                       'National competent authority report'}
+    diff = diff_records(old, new, changed)
+    assert [(o.version, n.version) for o, n in diff.changed] == [('1.1', '1.2')]
+    assert [r.link for r in diff.added] == ['https://health.ec.europa.eu/psr_help.pdf']
+    assert [r.title for r in diff.removed] == ['National competent authority report (NCAR 2.0 PDF form)']
+    assert diff.summary_lines()[0] == ("Changed in Field safety corrective action: "
+                                      "Manufacturer's field safety corrective action report (FSCA 1.1 PDF form) -> "
+                                      "Manufacturer's field safety corrective action report (FSCA 1.2 PDF form)")
+
+
+def test_unchanged_page_is_a_hash_compare(tmp_path, pmsv_page, monkeypatch):
+    tracker = PageTracker(str(tmp_path / 'page.json'), 'https://example.org/')
+    assert tracker.check(pmsv_page, 'hash-1') is None
+
+    def fail(*args, **kwargs):
+        raise AssertionError("page was parsed")
+
+    monkeypatch.setattr(page_diff, 'extract_records', fail)
+    reloaded = PageTracker(str(tmp_path / 'page.json'), 'https://example.org/')
+    diff = reloaded.check(pmsv_page, 'hash-1')
+    assert diff is not None and not diff
+
+
+def test_check_once_reports_page_changes(tmp_path, monkeypatch, stub_server, pmsv_page, email_env, capsys):
+    pages = {'body': pmsv_page}
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html; charset=utf-8'}, pages['body'])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('NOTIFY_SPOOL_DIR', str(tmp_path / 'spool'))
+    monkeypatch.setenv('TRACK_PAGE_CHANGES', 'true')
+    args = ['check', '--once', '--url', stub_server.url('/pmsv'), '--data-file', str(tmp_path / 'sb.json')]
+    assert cli.main(args) == 0
+    assert os.path.exists(tmp_path / 'sb_page.json')
+
+    pages['body'] = pmsv_page.replace(FSCA_OLD, FSCA_NEW)
+    assert cli.main(args) == 0
+
+    assert 'FSCA 1.2 PDF form' in capsys.readouterr().out.splitlines()[-1]
+    assert len(email_env.messages) == 1
+    assert b'PMSV Page Change Alert' in email_env.messages[0]
+    assert b'(FSCA 1.1 PDF form) -> ' in email_env.messages[0]
+
+
+def test_tracking_reads_the_whole_page(tmp_path):
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), track_page_changes=True, stop_at_match=True)
+    assert scraper.stop_at_match is False
@@ -0,0 +1,54 @@
+import itertools
+
+import scraper
+from parse_cache import ParseCache, create_parse_cache
+from scraper import PMSVScraper
+
+
+def test_lru_eviction_and_ttl():
+    now = [0.0]
+    cache = ParseCache(2, ttl=60, clock=lambda: now[0])
+    cache.put('mir', 'v1', 'a', {'value': '1'})
+    cache.put('mir', 'v1', 'b', {'value': '2'})
+    assert cache.get('mir', 'v1', 'a') == {'value': '1'}
+    cache.put('mir', 'v1', 'c', {'value': '3'})
+
+    # b was the least recently used
+    assert cache.get('mir', 'v1', 'b') is None
+    assert cache.get('mir', 'v2', 'a') is None
+    now[0] = 61
+    assert cache.get('mir', 'v1', 'c') is None
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'hit_ratio': 0.25, 'entries': 1}
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'parse_cache.db')
+    ParseCache(4, disk_path=path).put('mir', 'v1', 'a', {'value': '10573', 'documents': None})
+
+    restarted = ParseCache(4, disk_path=path)
+    assert restarted.get('mir', 'v1', 'a') == {'value': '10573', 'documents': None}
+    assert restarted.get('mir', 'v1', 'b') is None
+
+
+def test_cache_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('PARSE_CACHE_SIZE', raising=False)
+    assert create_parse_cache() is None
+
+
+def test_identical_body_is_not_parsed_again(tmp_path, stub_server, pmsv_page, monkeypatch):
+    # The server hands out a new ETag every time, so only the body hash can tell the pages apart
+    etags = itertools.count()
+    bodies = [pmsv_page, pmsv_page.replace(b'SB 10573', b'SB 10574'), pmsv_page]
+    stub_server.routes['/pmsv'] = lambda h: (200, {'ETag': f'"{next(etags)}"',
+                                                   'Content-Type': 'text/html; charset=utf-8'}, bodies.pop(0))
+    monkeypatch.setenv('PARSE_CACHE_SIZE', '8')
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    parses = []
+    extract_value = scraper.PMSVScraper.extract_value
+    monkeypatch.setattr(scraper.PMSVScraper, 'extract_value',
+                        lambda self, *a, **k: parses.append(1) or extract_value(self, *a, **k))
+
+    assert [s.scrape_webpage() for _ in range(3)] == ['10573', '10574', '10573']
+    assert len(parses) == 2
+    assert s.parse_cache.stats()['hits'] == 1
+    assert s.stop_at_match is False
@@ -0,0 +1,72 @@
+import os
+import re
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from monitor_engine import AsyncMonitorEngine, MonitorTarget
+from parse_pool import ParsePool
+from scraper import MIR_PATTERN, MIR_SELECTOR, PMSVScraper
+
+MIR = re.compile(MIR_PATTERN, re.IGNORECASE)
+
+
+@pytest.fixture
+def parse_pool():
+    with ParsePool(workers=2, max_pending=1) as pool:
+        yield pool
+
+
+def test_extract_in_worker(parse_pool, pmsv_page):
+    timings = {}
+    assert parse_pool.extract(pmsv_page, MIR, MIR_SELECTOR, 'utf-8', timings) == '10573'
+    assert parse_pool.extract(b'<html><body>nothing</body></html>', MIR) is None
+    assert 'regex' in timings
+
+
+def test_full_pool_blocks_the_fetch_stage(parse_pool, pmsv_page):
+    results = []
+    # Take the only slot, as a body being parsed would
+    parse_pool._slots.acquire()
+    fetcher = threading.Thread(target=lambda: results.append(parse_pool.extract(pmsv_page, MIR)))
+    fetcher.start()
+    fetcher.join(0.5)
+    assert fetcher.is_alive() and results == []
+
+    parse_pool._slots.release()
+    fetcher.join(30)
+    assert results == ['10573']
+
+
+def test_pool_is_restarted_after_a_worker_dies(parse_pool, pmsv_page):
+    broken = parse_pool.executor
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    with pytest.raises(BrokenProcessPool):
+        parse_pool.extract(pmsv_page, MIR)
+    assert parse_pool.executor is not broken
+    assert parse_pool.extract(pmsv_page, MIR) == '10573'
+
+
+def test_engine_parses_in_worker_processes(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html; charset=utf-8'}, pmsv_page)
+    targets = [MonitorTarget(f'target-{i}', stub_server.url('/pmsv')) for i in range(4)]
+    engine = AsyncMonitorEngine(targets, data_dir=str(tmp_path), parse_workers=2)
+    try:
+        assert all(scraper.parse_pool is engine.parse_pool for scraper in engine.scrapers.values())
+        results = engine.run_check()
+    finally:
+        engine.close()
+
+    assert [result.current for result in results] == ['10573'] * 4
+
+
+def test_scraper_parses_in_thread_if_the_pool_fails(tmp_path, pmsv_page):
+    class BrokenPool:
+        def extract(self, *args, **kwargs):
+            raise RuntimeError("A process in the process pool was terminated abruptly")
+
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), parse_pool=BrokenPool())
+    assert scraper.extract_value(pmsv_page, 'utf-8') == '10573'
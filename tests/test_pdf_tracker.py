@@ -0,0 +1,95 @@
+import pytest
+
+from history_store import HistoryStore
+from lite_http import LiteSession
+from pdf_tracker import BandwidthLimiter, DocumentTracker, document_links
+from scraper import PMSVScraper
+from transport import create_session
+
+PDF = b'%PDF-1.7\n' + b'0' * 200000
+
+
+class DocumentRoute:
+    """A PDF with an ETag; HEAD can be rejected to force the range request fallback."""
+
+    def __init__(self, body: bytes = PDF, etag: str = '"v1"', allow_head: bool = True):
+        self.body = body
+        self.etag = etag
+        self.allow_head = allow_head
+
+    def __call__(self, handler):
+        if handler.command == 'HEAD' and not self.allow_head:
+            return 405, {}, b''
+        headers = {'Content-Type': 'application/pdf', 'ETag': self.etag}
+        if handler.headers.get('Range') == 'bytes=0-0':
+            headers['Content-Range'] = f'bytes 0-0/{len(self.body)}'
+            return 206, headers, self.body[:1]
+        return 200, headers, self.body
+
+
+def full_downloads(stub_server):
+    return sum(1 for method, path, headers in stub_server.requests
+               if method == 'GET' and path == '/form.pdf' and 'Range' not in headers)
+
+
+@pytest.mark.parametrize('make_session', [LiteSession, create_session], ids=['lite', 'requests'])
+@pytest.mark.parametrize('allow_head', [True, False], ids=['head', 'range'])
+def test_download_only_when_validators_change(tmp_path, stub_server, make_session, allow_head):
+    route = stub_server.routes['/form.pdf'] = DocumentRoute(allow_head=allow_head)
+    history = HistoryStore(str(tmp_path / 'history.db'))
+    tracker = DocumentTracker(history, 'pmsv-mir', bytes_per_second=0)
+    session = make_session()
+    url = stub_server.url('/form.pdf')
+
+    first, = tracker.check(session, [url])
+    second, = tracker.check(session, [url])
+    route.body, route.etag = PDF + b'%%EOF', '"v2"'
+    third, = tracker.check(session, [url])
+
+    assert (first.status, first.downloaded, first.bytes_read) == ('initial', True, len(PDF))
+    assert (second.status, second.downloaded, second.sha256) == ('unchanged', False, first.sha256)
+    assert (third.status, third.previous_sha256) == ('updated', first.sha256)
+    assert full_downloads(stub_server) == 2
+    assert [row['status'] for row in history.document_changes('pmsv-mir')] == ['initial', 'updated']
+
+
+def test_bandwidth_limiter_spreads_bytes_over_time():
+    now = [0.0]
+    sleeps = []
+    limiter = BandwidthLimiter(1000, clock=lambda: now[0], sleep=sleeps.append)
+
+    assert limiter.consume(1000) == 0.0
+    assert limiter.consume(500) == pytest.approx(0.5)
+    now[0] = 2.0
+    assert limiter.consume(1000) == 0.0
+    assert sleeps == [pytest.approx(0.5)]
+
+
+def test_document_links_in_selected_block(pmsv_page):
+    links = document_links(pmsv_page, 'https://health.ec.europa.eu/page', '#section-manufacturer-incident-report a')
+
+    assert [link.rsplit('=', 1)[1] for link in links] == [
+        'md_mir_form_en.pdf', 'md_mir_helptext_en.pdf', 'md_mir_guidance_en.pdf']
+
+
+def test_scraper_reports_changed_form_pdf(tmp_path, stub_server, pmsv_page):
+    page = pmsv_page.replace(
+        b'https://health.ec.europa.eu/document/download/9a0b7b8f-2b1e-4c6a-9c52-7a6c4f8d0e1a_en?filename=md_mir_form_en.pdf',
+        stub_server.url('/form.pdf?filename=md_mir_form_en.pdf').encode())
+    stub_server.routes['/pmsv'] = lambda h: (
+        (304, {'ETag': '"page"'}, b'') if h.headers.get('If-None-Match') == '"page"'
+        else (200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"page"'}, page))
+    route = stub_server.routes['/form.pdf'] = DocumentRoute()
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'),
+                          session=LiteSession(), track_documents=True,
+                          selector="//div[@id='section-manufacturer-incident-report']//a[contains(@href, '/form.pdf')]")
+
+    scraper.check_for_updates()
+    route.body, route.etag = PDF + b'%%EOF', '"v2"'
+    updated, current, previous = scraper.check_for_updates()
+
+    # The page itself was answered with 304; its document links came from the HTTP cache
+    assert stub_server.requests[-3][2].get('If-None-Match') == '"page"'
+    assert (updated, current) == (False, '10573')
+    assert len(scraper.change_summary()) == 1
+    assert scraper.change_summary()[0].startswith(f"Document changed: {stub_server.url('/form.pdf')}")
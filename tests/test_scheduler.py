@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from scheduler import CronTrigger, IntervalTrigger, Job, Scheduler
+
+
+def ts(text):
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.parametrize('expression, after, expected', [
+    ('*/15 * * * *', '2024-01-15 10:07:30', '2024-01-15 10:15:00'),
+    ('0 9 * * 1-5', '2024-01-19 09:00:00', '2024-01-22 09:00:00'),  # Friday -> Monday
+    ('30 6 1 * *', '2024-01-15 00:00:00', '2024-02-01 06:30:00'),
+    ('0 0 29 2 *', '2024-03-01 00:00:00', '2028-02-29 00:00:00'),
+    ('0 12 13 * 5', '2024-01-01 00:00:00', '2024-01-05 12:00:00'),  # day OR weekday
+    ('0 8 * * 0', '2024-01-15 00:00:00', '2024-01-21 08:00:00'),  # 0 = Sunday
+])
+def test_cron_next_run(expression, after, expected):
+    trigger = CronTrigger(expression, tz=timezone.utc)
+    assert trigger.next_run(ts(after)) == ts(expected)
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *'])
+def test_invalid_cron(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+
+def test_missed_runs_are_skipped_and_jitter_bounded():
+    job = Job(lambda: None, IntervalTrigger(10), jitter=3)
+    job.schedule_after(planned=100, now=135)
+    assert job.planned == 140
+    assert 140 <= job.next_run <= 143
+
+
+def test_sleeps_until_deadline_without_polling():
+    scheduler = Scheduler()
+    runs = []
+    scheduler.every(0.1, lambda: runs.append(time.monotonic()))
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    time.sleep(0.55)
+    scheduler.stop()
+    thread.join(1)
+
+    assert not thread.is_alive()
+    assert 4 <= len(runs) <= 6
+    # One wakeup per deadline, not a periodic poll
+    assert scheduler.wakeups <= len(runs) + 2
+
+
+def test_long_running_job_does_not_overlap():
+    scheduler = Scheduler()
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.25)
+        with lock:
+            active.pop()
+
+    job = scheduler.every(0.05, slow)
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    time.sleep(0.6)
+    scheduler.stop()
+    thread.join(1)
+
+    assert max(peak) == 1
+    assert job.skipped > 0
+
+
+def test_stop_wakes_idle_scheduler():
+    scheduler = Scheduler()
+    scheduler.every(3600, lambda: None)
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    scheduler.stop()
+    thread.join(1)
+    assert time.perf_counter() - start < 0.5
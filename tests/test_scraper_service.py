@@ -0,0 +1,61 @@
+import threading
+import time
+
+from scraper import PMSVScraper
+from scraper_service import ScraperService
+
+
+def make_service(tmp_path, stub_server, pmsv_page, **kwargs):
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html'}, pmsv_page)
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    return ScraperService(scraper, **kwargs)
+
+
+def test_concurrent_sessions_share_one_check(tmp_path, stub_server, pmsv_page):
+    service = make_service(tmp_path, stub_server, pmsv_page)
+    results = []
+    sessions = [threading.Thread(target=lambda: results.append(service.check_now(max_age=30)))
+                for _ in range(10)]
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+
+    assert len(stub_server.requests) == 1
+    assert {r['sb_number'] for r in results} == {'10573'}
+    snapshot = service.snapshot()
+    assert snapshot['checks'] == 1
+    assert snapshot['last_result']['status'] == 'initial'
+
+
+def test_check_without_max_age_fetches_again(tmp_path, stub_server, pmsv_page):
+    service = make_service(tmp_path, stub_server, pmsv_page)
+    service.check_now()
+    assert service.check_now()['status'] == 'unchanged'
+    assert len(stub_server.requests) == 2
+    assert [r['status'] for r in service.snapshot()['recent']] == ['initial', 'unchanged']
+
+
+def test_single_monitoring_thread(tmp_path, stub_server, pmsv_page):
+    messages = []
+    service = make_service(tmp_path, stub_server, pmsv_page, next_interval=lambda: 0.05,
+                           log=lambda message, level: messages.append(level))
+    assert service.start()
+    # Every other session finds monitoring already running
+    assert not service.start()
+    time.sleep(0.3)
+    service.stop()
+
+    assert not service.monitoring
+    threads = [t for t in threading.enumerate() if t.name == 'dashboard-monitor']
+    assert threads == []
+    assert 3 <= service.snapshot()['checks'] <= 8
+    assert 'ERROR' not in messages
+
+
+def test_failed_check_is_reported(tmp_path, stub_server, pmsv_page):
+    service = make_service(tmp_path, stub_server, pmsv_page)
+    stub_server.routes['/pmsv'] = lambda h: (500, {}, b'')
+    result = service.check_now()
+    assert result['status'] == 'error'
+    assert service.snapshot()['recent'] == []
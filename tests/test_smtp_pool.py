@@ -0,0 +1,122 @@
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from email_notifier import EmailNotifier
+from metrics import EMAIL_SEND_SECONDS
+from smtp_pool import SMTPConnectionManager
+
+
+def make_message(n):
+    msg = MIMEText(f"body {n}")
+    msg['From'] = 'monitor@example.org'
+    msg['To'] = 'team@example.org'
+    msg['Subject'] = f"message {n}"
+    return msg
+
+
+def test_session_reused_across_sends(email_env):
+    notifier = EmailNotifier()
+    for i in range(5):
+        assert notifier.send_notification(str(i), str(i + 1))
+    assert notifier.send_error_notification("boom")
+    notifier.close()
+
+    assert len(email_env.messages) == 6
+    assert email_env.connections == 1
+    assert email_env.handshakes == 1
+
+
+def test_batch_flushes_over_one_session(email_env):
+    notifier = EmailNotifier()
+    with notifier.batch():
+        for i in range(3):
+            notifier.send_notification(str(i), str(i + 1), target_name=f"t{i}")
+        assert email_env.messages == []
+    notifier.close()
+
+    assert len(email_env.messages) == 3
+    assert email_env.handshakes == 1
+
+
+def test_batch_that_drops_messages_is_an_error(email_env):
+    ok = EMAIL_SEND_SECONDS.count(kind='batch', result='ok')
+    errors = EMAIL_SEND_SECONDS.count(kind='batch', result='error')
+    notifier = EmailNotifier()
+    email_env.stop()
+    with notifier.batch() as outcome:
+        notifier.send_notification('1', '2')
+        notifier.send_notification('2', '3')
+    notifier.close()
+
+    assert (outcome.queued, outcome.sent) == (2, 0)
+    assert EMAIL_SEND_SECONDS.count(kind='batch', result='ok') == ok
+    assert EMAIL_SEND_SECONDS.count(kind='batch', result='error') == errors + 1
+
+
+def test_reconnects_after_server_drops_session(smtp_server):
+    manager = SMTPConnectionManager(smtp_server.host, smtp_server.port, use_tls=False)
+    manager.send(make_message(1))
+    smtp_server.fail_next_data = True
+    manager.send(make_message(2))
+    manager.send(make_message(3))
+    manager.close()
+
+    # The interrupted message is retried once on a fresh session
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.handshakes == 2
+
+
+def test_noop_keepalive_while_idle(smtp_server):
+    manager = SMTPConnectionManager(smtp_server.host, smtp_server.port, use_tls=False,
+                                    keepalive_interval=0.05, max_idle=10)
+    manager.send(make_message(1))
+    time.sleep(0.3)
+    manager.send(make_message(2))
+    manager.close()
+
+    assert smtp_server.noops >= 2
+    assert smtp_server.handshakes == 1
+
+
+def test_idle_session_is_closed(smtp_server):
+    manager = SMTPConnectionManager(smtp_server.host, smtp_server.port, use_tls=False,
+                                    keepalive_interval=0.05, max_idle=0.1)
+    manager.send(make_message(1))
+    time.sleep(0.4)
+    assert manager._server is None
+    manager.send(make_message(2))
+    manager.close()
+    assert smtp_server.handshakes == 2
+
+
+def test_failed_keepalive_closes_the_socket(smtp_server):
+    class DeadSession:
+        closed = False
+
+        def noop(self):
+            raise smtplib.SMTPServerDisconnected("gone")
+
+        def close(self):
+            self.closed = True
+
+    manager = SMTPConnectionManager(smtp_server.host, smtp_server.port, use_tls=False,
+                                    keepalive_interval=0.05, max_idle=10)
+    manager.send(make_message(1))
+    with manager._lock:
+        manager._server.close()
+        dead = manager._server = DeadSession()
+    time.sleep(0.3)
+
+    assert dead.closed and manager._server is None
+    manager.close()
+
+
+def test_failed_flush_drops_the_unsent_messages(smtp_server):
+    smtp_server.stop()
+    manager = SMTPConnectionManager(smtp_server.host, smtp_server.port, use_tls=False, timeout=1)
+    manager.queue(make_message(1))
+    manager.queue(make_message(2))
+
+    assert manager.flush() == 0
+    assert manager.pending == 0
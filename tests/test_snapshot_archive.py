@@ -0,0 +1,120 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import cli
+from scraper import PMSVScraper
+from snapshot_archive import SnapshotArchive
+
+PAGE_A = b'<html><body>MIR 7.3.1 SB 10573</body></html>' * 100
+PAGE_B = b'<html><body>MIR 7.3.1 SB 10574</body></html>' * 100
+
+
+def blob_files(directory):
+    return [name for _, _, names in os.walk(os.path.join(directory, 'blobs')) for name in names]
+
+
+def test_each_version_is_stored_once(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    for timestamp, page in ((100, PAGE_A), (200, PAGE_A), (300, PAGE_B), (400, PAGE_A)):
+        archive.store('mir', 'https://example.org/', page, timestamp=timestamp)
+    archive.store('other', 'https://example.org/', PAGE_B, timestamp=150)
+
+    assert archive.page_as_of('mir', 50) is None
+    assert archive.page_as_of('mir', 250) == PAGE_A
+    assert archive.page_as_of('mir', 300) == PAGE_B
+    assert archive.page_as_of('mir', 1000) == PAGE_A
+    assert [(row['first_seen'], row['last_seen'], row['checks']) for row in archive.versions('mir')] == [
+        (100, 200, 2), (300, 300, 1), (400, 400, 1)]
+    stats = archive.stats()
+    assert (stats['blobs'], stats['snapshots']) == (2, 4)
+    assert stats['stored_bytes'] < stats['bytes'] / 10
+    assert len(blob_files(str(tmp_path))) == 2
+
+
+def test_compact_keeps_the_latest_version_of_each_target(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    archive.store('mir', 'https://example.org/', PAGE_A, timestamp=100)
+    archive.store('mir', 'https://example.org/', PAGE_B, timestamp=200)
+    archive.store('other', 'https://example.org/', PAGE_A, timestamp=150)
+
+    assert archive.compact(keep_seconds=100, now=1000) == {
+        'snapshots_removed': 1, 'blobs_removed': 0, 'bytes_freed': 0}
+    archive.store('other', 'https://example.org/', PAGE_B, timestamp=1100)
+    result = archive.compact(keep_seconds=100, now=1150)
+
+    assert (result['snapshots_removed'], result['blobs_removed']) == (1, 1)
+    assert archive.page_as_of('mir', 1150) == PAGE_B
+    assert len(blob_files(str(tmp_path))) == 1
+
+
+def test_compact_deletes_blobs_under_the_write_lock(tmp_path, monkeypatch):
+    archive = SnapshotArchive(str(tmp_path))
+    archive.store('mir', 'https://example.org/', PAGE_A, timestamp=100)
+    archive.store('mir', 'https://example.org/', PAGE_B, timestamp=200)
+    locked = []
+    unlink = os.unlink
+
+    def checking_unlink(path):
+        # A store() of the deleted body must wait until the blob file is gone
+        conn = sqlite3.connect(archive.db_path, timeout=0, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+            locked.append(False)
+        except sqlite3.OperationalError:
+            locked.append(True)
+        finally:
+            conn.close()
+        unlink(path)
+
+    monkeypatch.setattr('snapshot_archive.os.unlink', checking_unlink)
+    assert archive.compact(keep_seconds=0, now=1000)['blobs_removed'] == 1
+    assert locked == [True]
+
+
+def test_zstd_blobs(tmp_path):
+    pytest.importorskip('zstandard')
+    archive = SnapshotArchive(str(tmp_path), codec='zstd')
+    content_hash = archive.store('mir', 'https://example.org/', PAGE_A)
+    assert archive.blob_path(content_hash, 'zstd').endswith('.zst')
+    assert archive.read_blob(content_hash) == PAGE_A
+
+
+def test_checks_are_archived_and_shown_as_of(tmp_path, stub_server, pmsv_page, monkeypatch, capsys):
+    pages = {'body': pmsv_page, 'etag': '"v1"'}
+
+    def route(handler):
+        if handler.headers.get('If-None-Match') == pages['etag']:
+            return 304, {'ETag': pages['etag']}, b''
+        return 200, {'ETag': pages['etag'], 'Content-Type': 'text/html; charset=utf-8'}, pages['body']
+
+    stub_server.routes['/pmsv'] = route
+    monkeypatch.setenv('SNAPSHOT_ARCHIVE_DIR', str(tmp_path / 'archive'))
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'))
+    scraper.check_for_updates()
+    scraper.check_for_updates()
+    first = scraper.archive.versions()[0]
+    pages['body'], pages['etag'] = pmsv_page.replace(b'SB 10573', b'SB 10574'), '"v2"'
+    assert scraper.check_for_updates()[:2] == (True, '10574')
+
+    # The second check was answered with 304 and only extended the first version
+    assert [row['checks'] for row in scraper.archive.versions()] == [2, 1]
+    output = tmp_path / 'page.html'
+    as_of = datetime.fromtimestamp(first['last_seen']).isoformat()
+    assert cli.main(['archive', 'show', '--as-of', as_of, '-o', str(output)]) == 0
+    assert output.read_bytes() == pmsv_page
+    assert cli.main(['archive', 'show', '--as-of', 'yesterday']) == 1
+    assert "error: invalid --as-of 'yesterday'" in capsys.readouterr().out
+    assert cli.main(['archive', 'compact', '--keep-days', '0']) == 0
+    assert 'removed 1 version(s) and 1 blob(s)' in capsys.readouterr().out
+
+
+def test_date_only_as_of_means_end_of_day():
+    day = datetime(2024, 1, 15)
+    assert cli.parse_as_of('2024-01-15') == pytest.approx(datetime(2024, 1, 16).timestamp(), abs=1e-3)
+    assert cli.parse_as_of('2024-01-15T10:30:00') == day.replace(hour=10, minute=30).timestamp()
+    with pytest.raises(ValueError):
+        cli.parse_as_of('15.01.2024')
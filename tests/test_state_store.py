@@ -0,0 +1,104 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from state_store import DURABILITY_MODES, StateFile, _checksum, _directory_lock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('durability', DURABILITY_MODES)
+def test_write_and_read(tmp_path, durability):
+    state = StateFile(str(tmp_path / 'state.json'), durability=durability)
+    assert state.read() is None
+    state.write({'sb_number': '10573'})
+    assert state.read() == {'sb_number': '10573'}
+    assert sorted(os.listdir(tmp_path)) == ['state.json']
+
+
+def test_failed_write_keeps_previous_state(tmp_path, monkeypatch):
+    state = StateFile(str(tmp_path / 'state.json'))
+    state.write({'sb_number': '1'})
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        state.write({'sb_number': '2'})
+    monkeypatch.undo()
+    assert state.read() == {'sb_number': '1'}
+    assert sorted(os.listdir(tmp_path)) == ['state.json']
+
+
+def test_journal_replayed_on_startup(tmp_path):
+    path = tmp_path / 'state.json'
+    StateFile(str(path)).write({'sb_number': '1'})
+    payload = json.dumps({'sb_number': '2'}, indent=2)
+    (tmp_path / 'state.json.journal').write_text(json.dumps({'checksum': _checksum(payload), 'payload': payload}))
+    (tmp_path / 'state.json.abc123.tmp').write_text('{"sb_n')
+
+    state = StateFile(str(path), durability='journal')
+    assert state.read() == {'sb_number': '2'}
+    assert sorted(os.listdir(tmp_path)) == ['state.json']
+
+
+def test_torn_journal_is_discarded(tmp_path):
+    path = tmp_path / 'state.json'
+    StateFile(str(path)).write({'sb_number': '1'})
+    (tmp_path / 'state.json.journal').write_text('{"checksum": "ab')
+
+    state = StateFile(str(path), durability='journal')
+    assert not state.recover()
+    assert state.read() == {'sb_number': '1'}
+    assert not (tmp_path / 'state.json.journal').exists()
+
+
+@pytest.mark.parametrize('durability', DURABILITY_MODES)
+def test_process_killed_mid_writes(tmp_path, durability):
+    path = tmp_path / 'state.json'
+    writer = subprocess.Popen([sys.executable, '-c', (
+        "import sys; from state_store import StateFile\n"
+        "state = StateFile(sys.argv[1], durability=sys.argv[2])\n"
+        "i = 0\n"
+        "while True:\n"
+        "    state.write({'sb_number': str(i), 'padding': 'x' * 4096}); i += 1\n"
+    ), str(path), durability], cwd=ROOT)
+    deadline = time.time() + 5
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    writer.send_signal(signal.SIGKILL)
+    writer.wait()
+
+    data = StateFile(str(path), durability=durability).read()
+    assert int(data['sb_number']) >= 0
+
+
+def test_recovery_waits_for_a_live_writer(tmp_path):
+    path = tmp_path / 'state.json'
+    tmp_file = tmp_path / 'state.json.live.tmp'
+    started = threading.Event()
+
+    def start_other_process():
+        started.set()
+        StateFile(str(path))
+
+    with _directory_lock(str(tmp_path)):
+        # A writer mid-write: its temporary file exists and it holds the lock
+        tmp_file.write_text('{"sb_number": "10574"}')
+        other = threading.Thread(target=start_other_process)
+        other.start()
+        started.wait()
+        other.join(0.3)
+        assert other.is_alive() and tmp_file.exists()
+        os.replace(tmp_file, path)
+    other.join(5)
+
+    assert StateFile(str(path)).read() == {'sb_number': '10574'}
@@ -0,0 +1,72 @@
+import gzip
+
+import pytest
+
+from lite_http import LiteSession
+from metrics import FETCH_ERRORS, RESPONSE_DECODED_BYTES, RESPONSE_WIRE_BYTES
+from scraper import PMSVScraper, ResponseTooLarge, StreamedBody
+
+
+def gzip_route(body: bytes, etag: str = None):
+    compressed = gzip.compress(body)
+
+    def route(handler):
+        headers = {'Content-Type': 'text/html; charset=utf-8', 'Content-Encoding': 'gzip'}
+        if etag:
+            headers['ETag'] = etag
+        return 200, headers, compressed
+    return route
+
+
+def test_gzip_transfer_records_wire_and_decoded_bytes(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = gzip_route(pmsv_page)
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'),
+                    target_name='gzip-test', stop_at_match=False)
+
+    assert s.scrape_webpage() == '10573'
+
+    assert 'gzip' in stub_server.requests[-1][2]['Accept-Encoding']
+    assert RESPONSE_DECODED_BYTES.value(target='gzip-test') == len(pmsv_page)
+    assert RESPONSE_WIRE_BYTES.value(target='gzip-test') == len(gzip.compress(pmsv_page))
+
+
+def test_download_stops_after_match(tmp_path, stub_server, pmsv_page):
+    page = pmsv_page.replace(b'</body>', b'<p>filler paragraph</p>' * 100000 + b'</body>')
+    stub_server.routes['/pmsv'] = gzip_route(page, etag='"big"')
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'), target_name='early-exit')
+
+    assert s.scrape_webpage() == '10573'
+
+    assert RESPONSE_DECODED_BYTES.value(target='early-exit') < len(page) / 10
+    # A hash of the page up to the match would differ with where the read stopped
+    assert s.last_content_hash is None
+    assert s.load_http_cache()['content_hash'] is None
+
+
+def test_oversized_body_is_rejected(tmp_path, stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = lambda h: (200, {'Content-Type': 'text/html'}, pmsv_page)
+    s = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=stub_server.url('/pmsv'),
+                    target_name='too-large', max_body_bytes=1000)
+
+    assert s.scrape_webpage() is None
+    assert FETCH_ERRORS.value(target='too-large') == 1
+
+
+def test_streamed_body_cap_without_content_length():
+    class Response:
+        def iter_content(self, chunk_size):
+            yield from (b'x' * 600, b'y' * 600)
+
+    body = StreamedBody(Response(), max_bytes=1000)
+    with pytest.raises(ResponseTooLarge):
+        body.read()
+    assert body.size == 1200 and body.chunks == [b'x' * 600]
+
+
+def test_lite_session_streams_and_decodes_gzip(stub_server, pmsv_page):
+    stub_server.routes['/pmsv'] = gzip_route(pmsv_page)
+
+    response = LiteSession().get(stub_server.url('/pmsv'), stream=True)
+
+    assert b''.join(response.iter_content(1024)) == pmsv_page
+    assert response.raw.tell() == len(gzip.compress(pmsv_page))
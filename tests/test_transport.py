@@ -0,0 +1,91 @@
+import time
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from metrics import HTTP_RETRIES
+from scraper import PMSVScraper
+from transport import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, TransportConfig, create_session
+
+
+def fast_config(**overrides) -> TransportConfig:
+    return TransportConfig(**{'retries': 2, 'backoff_factor': 0, 'connect_timeout': 1, 'read_timeout': 2,
+                              **overrides})
+
+
+def test_retries_5xx_then_succeeds(flaky_page):
+    flaky_page.failures.extend([503, 502])
+    session = create_session(fast_config())
+
+    response = session.get(flaky_page.url)
+
+    assert response.status_code == 200
+    assert flaky_page.calls == 3
+
+
+def test_only_actual_retries_are_counted(flaky_page):
+    flaky_page.failures.extend([503] * 5)
+    host = urlsplit(flaky_page.url).hostname
+    before = HTTP_RETRIES.value(host=host)
+    session = create_session(fast_config())
+
+    # The third 503 exhausts the retries and is returned, not retried
+    assert session.get(flaky_page.url).status_code == 503
+    assert flaky_page.calls == 3
+    assert HTTP_RETRIES.value(host=host) - before == 2
+
+
+def test_read_timeout_is_separate_from_connect_timeout(flaky_page):
+    flaky_page.latency = 1.0
+    session = create_session(fast_config(retries=0, connect_timeout=1, read_timeout=0.2))
+
+    start = time.perf_counter()
+    with pytest.raises(requests.ReadTimeout):
+        session.get(flaky_page.url)
+    assert time.perf_counter() - start < 0.9
+
+
+def test_circuit_opens_and_probes_half_open(flaky_page):
+    flaky_page.failures.extend([500] * 4)
+    session = create_session(fast_config(retries=0, failure_threshold=2, reset_timeout=0.3))
+
+    assert session.get(flaky_page.url).status_code == 500
+    assert session.get(flaky_page.url).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        session.get(flaky_page.url)
+    assert flaky_page.calls == 2
+
+    time.sleep(0.35)
+    # The half-open probe fails, so the circuit opens again without further requests
+    assert session.get(flaky_page.url).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        session.get(flaky_page.url)
+
+    flaky_page.failures.clear()
+    time.sleep(0.35)
+    assert session.get(flaky_page.url).status_code == 200
+    assert session.get(flaky_page.url).status_code == 200
+    assert flaky_page.calls == 5
+
+
+def test_half_open_allows_one_probe_at_a_time():
+    now = [0.0]
+    breaker = CircuitBreaker('example.org', failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_scraper_rides_out_transient_errors(tmp_path, flaky_page):
+    flaky_page.failures.extend([503, 504])
+    scraper = PMSVScraper(data_file=str(tmp_path / 'sb.json'), url=flaky_page.url,
+                          session=create_session(fast_config()))
+
+    assert scraper.check_for_updates() == (False, '10573', None)
@@ -0,0 +1,225 @@
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from metrics import CIRCUIT_STATE, HTTP_RETRIES
+
+# Responses worth retrying, and that count against a host's circuit breaker
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+CIRCUIT_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+@dataclass
+class TransportConfig:
+    """Timeouts, retry, pool and circuit breaker settings for create_session."""
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    retries: int = 3
+    backoff_factor: float = 1.0
+    backoff_max: float = 30.0
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    failure_threshold: int = 5
+    reset_timeout: float = 60.0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'TransportConfig':
+        """Read the HTTP_* and CIRCUIT_* environment variables; keyword arguments take precedence."""
+        config = cls(
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '30')),
+            retries=int(os.getenv('HTTP_RETRIES', '3')),
+            backoff_factor=float(os.getenv('HTTP_BACKOFF_FACTOR', '1')),
+            backoff_max=float(os.getenv('HTTP_BACKOFF_MAX_SECONDS', '30')),
+            pool_maxsize=int(os.getenv('HTTP_POOL_MAXSIZE', '10')),
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('CIRCUIT_RESET_SECONDS', '60'))
+        )
+        return replace(config, **overrides)
+
+
+class JitteredRetry(Retry):
+    """
+    urllib3 Retry with "full jitter": each wait is uniform between zero and the
+    exponential backoff, so replicas that failed together do not retry together.
+    """
+
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        # Raises instead when retries are exhausted or the error is not retryable; only a retry is counted
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if _pool is not None:
+            HTTP_RETRIES.inc(host=_pool.host)
+        return retry
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the host's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after repeated failures.
+
+    After failure_threshold consecutive failures the circuit opens and requests
+    fail immediately. Once reset_timeout has passed a single probe request is
+    let through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(CIRCUIT_STATE_VALUES[state], host=self.name)
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 if requests are allowed now)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - self.clock(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._probing = False
+            self.failures = 0
+            if self.state != CLOSED:
+                logging.info(f"Circuit for {self.name} closed again")
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._probing = False
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(f"Circuit for {self.name} opened after {self.failures} failure(s); "
+                                    f"next probe in {self.reset_timeout:.0f}s")
+                self._set_state(OPEN)
+                self.opened_at = self.clock()
+
+
+class ResilientAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with jittered retries, default (connect, read) timeouts and a
+    circuit breaker per host.
+
+    Retries happen inside one send() call, so a request that still fails after
+    all retries (or ends with a retryable 5xx/429) counts as one failure.
+    """
+
+    def __init__(self, config: Optional[TransportConfig] = None):
+        # HTTPAdapter uses self.config for its own state
+        self.transport_config = config = config or TransportConfig()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        retry = JitteredRetry(
+            total=config.retries,
+            backoff_factor=config.backoff_factor,
+            backoff_max=config.backoff_max,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            raise_on_status=False
+        )
+        super().__init__(pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize,
+                         max_retries=retry)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(
+                    host, self.transport_config.failure_threshold, self.transport_config.reset_timeout)
+            return breaker
+
+    def send(self, request, timeout=None, **kwargs):
+        breaker = self.breaker(urlsplit(request.url).netloc)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {breaker.name}, next probe in {breaker.retry_in():.0f}s",
+                                   request=request)
+        if timeout is None:
+            timeout = self.transport_config.timeout
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        except requests.ConnectionError as e:
+            breaker.record_failure()
+            # requests reports a read timeout that used up the retries as a ConnectionError
+            if isinstance(getattr(e.args[0] if e.args else None, 'reason', None), ReadTimeoutError):
+                raise requests.ReadTimeout(e, request=request) from e
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+def create_session(config: Optional[TransportConfig] = None,
+                   user_agent: Optional[str] = None) -> requests.Session:
+    """
+    Create a requests.Session with the resilient adapter mounted for http and https.
+
+    Args:
+        config (Optional[TransportConfig]): Transport settings, from the environment by default
+        user_agent (Optional[str]): User-Agent header for every request
+
+    Returns:
+        requests.Session: The configured session
+    """
+    session = requests.Session()
+    # gzip and deflate, plus br / zstd when brotli or zstandard is installed
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    if user_agent:
+        session.headers.update({'User-Agent': user_agent})
+    adapter = ResilientAdapter(config or TransportConfig.from_env())
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session